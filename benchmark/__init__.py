@@ -0,0 +1 @@
+# Make this a package so that benchmarks can be run with "python -m".
@@ -0,0 +1,89 @@
+"""
+Benchmarks lexing and parsing many small spec files, where the overhead of
+starting on each file matters most.
+
+    $ python -m benchmark.bench_parse [-n NUMBER]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import itertools
+
+from benchmark.helpers import report
+from stone.lang.lexer import StoneLexer
+from stone.lang.parser import StoneParser
+
+small_spec = """\
+namespace bench_parse{i}
+
+import common
+
+struct Arg{i}
+    "An argument."
+    path String
+    limit UInt32 = 100
+
+union Error{i}
+    not_found
+    other common.Error
+
+route get{i}(Arg{i}, Void, Error{i})
+"""
+
+nested_def = """\
+struct Photo{i}
+    "A photo."
+    dimensions Dimensions{i}
+        "Dimensions of the photo."
+        struct
+            height UInt64
+                "Height of the photo."
+            width UInt64
+                "Width of the photo."
+
+            example default
+                height = 5
+                width = 10
+union Status{i}
+    active
+    other
+"""
+
+
+def lex_all(lexer, text):
+    lexer.input(text)
+    while lexer.token() is not None:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=1000,
+                        help='Number of spec files to process per run.')
+    args = parser.parse_args()
+
+    # Each file is different, like the files of a large spec tree.
+    specs = itertools.cycle([small_spec.format(i=i) for i in range(100)])
+    lexer = StoneLexer()
+    stone_parser = StoneParser()
+
+    report('lex with a new StoneLexer per file',
+           lambda: lex_all(StoneLexer(), next(specs)), args.number, 'files')
+    report('lex with one StoneLexer',
+           lambda: lex_all(lexer, next(specs)), args.number, 'files')
+    report('parse with one StoneParser',
+           lambda: stone_parser.parse(next(specs)), args.number, 'files')
+
+    # A single large spec, with nested definitions whose ends are bursts of
+    # dedents.
+    large_spec = 'namespace bench_parse\n\n' + ''.join(
+        nested_def.format(i=i) for i in range(max(args.number // 10, 1)))
+    lexer.input(large_spec)
+    token_count = len(list(iter(lexer.token, None)))
+    report('lex a %d line spec' % large_spec.count('\n'),
+           lambda: lex_all(lexer, large_spec), 1, 'tokens', token_count)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmarks constructing large numbers of objects from classes generated by
+the python_types generator.
+
+    $ python -m benchmark.bench_python_types [-n NUMBER]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import datetime
+
+from benchmark.helpers import generated_python_types, report
+
+spec = """\
+namespace bench_types
+
+struct Base
+    id String
+    size UInt64
+
+struct Middle extends Base
+    name String
+    rev String?
+
+struct Leaf extends Middle
+    modified Timestamp("%Y-%m-%dT%H:%M:%SZ")
+    tags List(String)
+    shared Boolean = false
+    parent Base?
+
+struct Entry
+    union
+        file FileEntry
+        folder FolderEntry
+
+    name String
+
+struct FileEntry extends Entry
+    size UInt64
+
+struct FolderEntry extends Entry
+    "A folder."
+
+union Status
+    active
+    deleted
+    moved String
+    conflict Entry?
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=100000,
+                        help='Number of objects to construct per run.')
+    args = parser.parse_args()
+
+    with generated_python_types(spec):
+        import bench_types as ns
+
+        now = datetime.datetime.utcnow()
+        base = ns.Base(id='id:0', size=1)
+
+        report('Base(2 fields)',
+               lambda: ns.Base(id='id:1', size=1024),
+               args.number, 'objects')
+        report('Middle(4 fields)',
+               lambda: ns.Middle(id='id:1', size=1024, name='a.txt', rev='0a1'),
+               args.number, 'objects')
+        report('Leaf(8 fields)',
+               lambda: ns.Leaf(id='id:1', size=1024, name='a.txt', rev='0a1',
+                               modified=now, tags=['x', 'y'], shared=True,
+                               parent=base),
+               args.number, 'objects')
+        report('Leaf(required fields only)',
+               lambda: ns.Leaf(id='id:1', size=1024, name='a.txt',
+                               modified=now, tags=[]),
+               args.number, 'objects')
+
+        batch = 1000
+        fields = ['id', 'size', 'name', 'rev', 'modified', 'tags']
+        rows = [('id:%d' % i, i, 'a.txt', '0a1', now, ['x'])
+                for i in range(batch)]
+        report('Leaf.from_rows(%d rows)' % batch,
+               lambda: ns.Leaf.from_rows(fields, rows),
+               max(args.number // batch, 1), 'batches')
+
+        import stone_serializers as ss
+        leaf_list = ss.bv.List(ns.Leaf_validator)
+        encoded = ss.json_compat_obj_encode(
+            leaf_list,
+            [ns.Leaf(id='id:%d' % i, size=i, name='a.txt', modified=now,
+                     tags=['x']) for i in range(batch)])
+        entry_list = ss.bv.List(ns.Entry_validator)
+        files = [ns.FileEntry(name='a.txt', size=i) for i in range(batch)]
+        entries = [ns.FileEntry(name='a.txt', size=i) if i % 2 else
+                   ns.FolderEntry(name='a') for i in range(batch)]
+        report('encode List(Entry) of %d FileEntry' % batch,
+               lambda: ss.json_compat_obj_encode(entry_list, files),
+               max(args.number // batch, 1), 'batches')
+        report('encode List(Entry) of %d mixed' % batch,
+               lambda: ss.json_compat_obj_encode(entry_list, entries),
+               max(args.number // batch, 1), 'batches')
+        status_list = ss.bv.List(ns.Status_validator)
+        statuses = ss.json_compat_obj_encode(
+            status_list,
+            [ns.Status.active, ns.Status.moved('a.txt'),
+             ns.Status.conflict(ns.FileEntry(name='a.txt', size=1)),
+             ns.Status.conflict(None)] * (batch // 4))
+        report('decode List(Status) of %d items' % batch,
+               lambda: ss.json_compat_obj_decode(status_list, statuses),
+               max(args.number // batch, 1), 'batches')
+        report('decode List(Leaf) of %d items' % batch,
+               lambda: ss.json_compat_obj_decode(leaf_list, encoded),
+               max(args.number // batch, 1), 'batches')
+        report('decode List(Leaf) of %d items lazily' % batch,
+               lambda: [leaf.id for leaf in ss.json_compat_obj_decode(
+                   leaf_list, encoded, lazy=True)],
+               max(args.number // batch, 1), 'batches')
+        report('decode List(Leaf) of %d items to columns' % batch,
+               lambda: ss.json_compat_obj_decode_columns(leaf_list, encoded),
+               max(args.number // batch, 1), 'batches')
+
+
+if __name__ == '__main__':
+    main()
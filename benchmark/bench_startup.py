@@ -0,0 +1,67 @@
+"""
+Benchmarks the time Stone takes to start: constructing its parsers, with and
+without their prebuilt parse tables, and running the stone command on a small
+spec.
+
+    $ python -m benchmark.bench_startup [-n NUMBER]
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from benchmark.helpers import report
+from stone.cli_helpers import FilterExprParser
+from stone.lang.parser import StoneParser
+
+spec = """\
+namespace bench_startup
+
+struct S
+    a String
+
+route r(S, S, Void)
+"""
+
+
+class StoneParserWithoutTables(StoneParser):
+    tabmodule = str('benchmark.no_such_parsetab')
+
+
+class FilterExprParserWithoutTables(FilterExprParser):
+    tabmodule = str('benchmark.no_such_parsetab')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=100,
+                        help='Number of parsers to construct per run.')
+    args = parser.parse_args()
+
+    report('StoneParser()', StoneParser, args.number, 'parsers')
+    report('StoneParser() without tables', StoneParserWithoutTables,
+           args.number, 'parsers')
+    report('FilterExprParser()', FilterExprParser, args.number, 'parsers')
+    report('FilterExprParser() without tables', FilterExprParserWithoutTables,
+           args.number, 'parsers')
+
+    tmp = tempfile.mkdtemp(prefix='stone_bench_')
+    try:
+        spec_path = os.path.join(tmp, 'bench_startup.stone')
+        with open(spec_path, 'w') as f:
+            f.write(spec)
+        command = [sys.executable, '-m', 'stone.cli', '-f', 'r!=null',
+                   'python_types', os.path.join(tmp, 'out'), spec_path]
+        report('stone python_types', lambda: subprocess.check_call(command),
+               max(args.number // 20, 1), 'runs')
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Helpers shared by the benchmarks. Run benchmarks from the root of the
+repository, for example::
+
+    $ python -m benchmark.bench_python_types
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import contextlib
+import shutil
+import sys
+import tempfile
+import timeit
+
+from stone.compiler import Compiler
+from stone.lang.tower import TowerOfStone
+
+
+@contextlib.contextmanager
+def generated_python_types(spec):
+    """
+    Runs the python_types generator on a spec and makes the output importable
+    for the duration of the context manager.
+
+    Args:
+        spec (str): Text of a spec with a single namespace.
+
+    Yields:
+        str: Path to the folder with the generated modules.
+    """
+    from stone.target import python_types
+    api = TowerOfStone([('bench.stone', spec)]).parse()
+    build_path = tempfile.mkdtemp(prefix='stone_bench_')
+    try:
+        Compiler(api, python_types, [], build_path).build()
+        sys.path.insert(0, build_path)
+        try:
+            yield build_path
+        finally:
+            sys.path.remove(build_path)
+    finally:
+        shutil.rmtree(build_path)
+
+
+def report(label, func, number, unit='ops', units_per_call=1):
+    """
+    Times func and prints how many units per second it processed, taking the
+    best of three runs.
+
+    Args:
+        label (str): Description of what is being timed.
+        func: Function that takes no arguments.
+        number (int): Number of calls to func per run.
+        unit (str): What func processes.
+        units_per_call (int): Number of units a single call to func
+            processes.
+
+    Returns:
+        float: Units per second.
+    """
+    best = min(timeit.repeat(func, number=number, repeat=3))
+    rate = number * units_per_call / best
+    print('%-40s %12.0f %s/sec' % (label, rate, unit))
+    return rate
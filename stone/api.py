@@ -78,6 +78,9 @@ class ApiNamespace(object):
         self.alias_by_name = {}
         # Dict[Namespace, _ImportReason]
         self._imported_namespaces = {}
+        # SHA-1 hex digests of the text of the specs that define this
+        # namespace. Empty if it wasn't parsed from specs.
+        self.spec_digests = []
 
     def add_doc(self, docstring):
         """Adds a docstring for this namespace.
@@ -10,13 +10,17 @@ import imp
 import io
 import logging
 import os
+import shlex
 import six
 import sys
+import time
 import traceback
 
 from .cli_helpers import parse_route_attr_filter
 from .compiler import Compiler, GeneratorException
+from .forking import WorkerError
 from .lang.exception import InvalidSpec
+from .lang.parse_cache import MemoryParseCache, ParseCache
 from .lang.tower import TowerOfStone
 
 # These generators come by default
@@ -24,6 +28,8 @@ _builtin_generators = (
     'js_client',
     'python_types',
     'python_client',
+    'python_async_client',
+    'python_server',
     'swift_types',
     'swift_client',
 )
@@ -83,6 +89,57 @@ _cmdline_parser.add_argument(
           'combine multiple expressions with "and"/"or" and use parentheses '
           'to enforce precedence.'),
 )
+_cmdline_parser.add_argument(
+    '-j',
+    '--jobs',
+    type=int,
+    default=1,
+    help=('Number of processes to parse specs and generate with. Specs are '
+          'parsed in parallel, generators run in parallel, as do namespaces '
+          'for generators that support it. Output is the same as with a '
+          'single process.'),
+)
+_cmdline_parser.add_argument(
+    '--incremental',
+    action='store_true',
+    help=('Only generates the namespaces whose specs, imported namespaces, or '
+          'generator changed since the last incremental build into the same '
+          'folder. Generators that can\'t generate namespaces separately are '
+          'skipped if nothing changed. A manifest of what was generated is '
+          'kept in the output folder.'),
+)
+_cmdline_parser.add_argument(
+    '-g',
+    '--extra-generator',
+    action='append',
+    type=six.text_type,
+    default=[],
+    help=('Also runs a generator on the same parsed spec. The value is the '
+          'generator, the folder to save its files to and its arguments, '
+          'separated by spaces, for example: "python_client out -m client -c '
+          'Client". Can be repeated.'),
+)
+_cmdline_parser.add_argument(
+    '--parse-cache',
+    type=six.text_type,
+    help=('A folder to cache parsed specs in, for example ".stone_cache". '
+          'Specs that are unchanged since they were cached are loaded from it '
+          'rather than parsed again.'),
+)
+_cmdline_parser.add_argument(
+    '--watch',
+    action='store_true',
+    help=('Keeps running and generates output again whenever a spec changes. '
+          'Only changed specs are parsed again, and only the namespaces whose '
+          'inputs changed are generated again, as with --incremental. Specs '
+          'must be given as files.'),
+)
+_cmdline_parser.add_argument(
+    '--watch-interval',
+    type=float,
+    default=0.25,
+    help='Seconds between checks for changed specs with --watch.',
+)
 _cmdline_parser.add_argument(
     '-a',
     '--attribute',
@@ -139,6 +196,26 @@ def main():
 
     logging.basicConfig(level=logging_level)
 
+    generators = _load_generators(args, generator_args)
+    parse_cache = ParseCache(args.parse_cache) if args.parse_cache else None
+    if args.watch:
+        _watch(args, generators, debug, parse_cache)
+        return
+
+    api = _load_api(args, debug, parse_cache)
+    _generate(api, generators, args.clean_build, args.jobs, args.incremental)
+
+    if not sys.argv[0].endswith('stone'):
+        # If we aren't running from an entry_point, then return api to make it
+        # easier to do debugging.
+        return api
+
+
+def _load_api(args, debug, parse_cache=None):
+    """
+    Returns the API described by the specs in args, with the namespace, route
+    and attribute filters of args applied. Exits if there's an error.
+    """
     if args.spec and args.spec[0].startswith('+') and args.spec[0].endswith('.py'):
         # Hack: Special case for defining a spec in Python for testing purposes
         # Use this if you want to define a Stone spec using a Python module.
@@ -209,7 +286,8 @@ def main():
             route_filter = None
 
         # TODO: Needs version
-        tower = TowerOfStone(specs, debug=debug)
+        tower = TowerOfStone(specs, debug=debug, parse_cache=parse_cache,
+                             jobs=args.jobs)
 
         try:
             api = tower.parse()
@@ -219,6 +297,10 @@ def main():
                 print('A traceback is included below in case this is a bug in '
                       'Stone.\n', traceback.format_exc(), file=sys.stderr)
             sys.exit(1)
+        except WorkerError as e:
+            print('error: A process parsing specs failed:\n%s' % e,
+                  file=sys.stderr)
+            sys.exit(1)
         if api is None:
             print('You must fix the above parsing errors for generation to '
                   'continue.', file=sys.stderr)
@@ -283,55 +365,139 @@ def main():
                   attr, file=sys.stderr)
             sys.exit(1)
 
-    if args.generator in _builtin_generators:
-        generator_module = __import__(
-            'stone.target.%s' % args.generator, fromlist=[''])
-    elif not os.path.exists(args.generator):
-        print("error: Generator '%s' cannot be found." % args.generator,
+    return api
+
+def _load_generators(args, generator_args):
+    """
+    Returns a list of (generator module, generator args, output folder)
+    tuples of the generator in args and of each extra generator. Exits if one
+    can't be loaded.
+    """
+    generators = [(_load_generator_module(args.generator), generator_args,
+                   args.output)]
+    for i, extra_generator in enumerate(args.extra_generator):
+        extra_args = shlex.split(extra_generator)
+        if len(extra_args) < 2:
+            print("error: Extra generator '%s' must specify a generator and "
+                  "an output folder." % extra_generator, file=sys.stderr)
+            sys.exit(1)
+        generator_module = _load_generator_module(
+            extra_args[0], 'user_generator_%d' % i)
+        generators.append((generator_module, extra_args[2:], extra_args[1]))
+    return generators
+
+
+def _generate(api, generators, clean_build, jobs, incremental):
+    """
+    Runs the generators returned by _load_generators() on api. Exits if one
+    raises an exception.
+    """
+    (generator_module, generator_args, output), extra_generators = \
+        generators[0], generators[1:]
+    c = Compiler(
+        api,
+        generator_module,
+        generator_args,
+        output,
+        clean_build=clean_build,
+        jobs=jobs,
+        incremental=incremental,
+    )
+    for extra_module, extra_args, extra_output in extra_generators:
+        c.add_generator_module(extra_module, extra_args, extra_output,
+                               clean_build=clean_build)
+    try:
+        c.build()
+    except GeneratorException as e:
+        print('error: %s raised an exception:\n%s' %
+              (e.generator_name, e.traceback),
+              file=sys.stderr)
+        sys.exit(1)
+
+
+def _watch(args, generators, debug, parse_cache):
+    """
+    Generates output whenever a spec changes, until interrupted. Specs are
+    only parsed again if they changed, and only the namespaces whose inputs
+    changed are generated again.
+    """
+    if not args.spec or '-' in args.spec or args.spec[0].startswith('+'):
+        print('error: --watch requires specification files.', file=sys.stderr)
+        sys.exit(1)
+
+    parse_cache = MemoryParseCache(parse_cache)
+    clean_build = args.clean_build
+    last_spec_stats = None
+    try:
+        while True:
+            spec_stats = _get_spec_stats(args.spec)
+            if spec_stats != last_spec_stats:
+                last_spec_stats = spec_stats
+                start = time.time()
+                try:
+                    api = _load_api(args, debug, parse_cache)
+                    _generate(api, generators, clean_build, args.jobs, True)
+                except SystemExit:
+                    # The error was printed. Keep watching for it to be fixed.
+                    print('Watching for changes...', file=sys.stderr)
+                else:
+                    clean_build = False
+                    print('Generated output in %.2f seconds. Watching for '
+                          'changes...' % (time.time() - start), file=sys.stderr)
+            time.sleep(args.watch_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def _get_spec_stats(spec_paths):
+    """
+    Returns a list of the modification time and size of each spec, or None
+    for a spec that doesn't exist.
+    """
+    spec_stats = []
+    for spec_path in spec_paths:
+        try:
+            st = os.stat(spec_path)
+        except OSError:
+            spec_stats.append(None)
+        else:
+            spec_stats.append((st.st_mtime, st.st_size))
+    return spec_stats
+
+
+def _load_generator_module(generator, module_name='user_generator'):
+    """
+    Returns the module of a built-in generator or of a generator module at a
+    path, which is loaded as module_name. Exits if it can't be loaded.
+    """
+    if generator in _builtin_generators:
+        return __import__('stone.target.%s' % generator, fromlist=[''])
+    elif not os.path.exists(generator):
+        print("error: Generator '%s' cannot be found." % generator,
               file=sys.stderr)
         sys.exit(1)
-    elif not os.path.isfile(args.generator):
-        print("error: Generator '%s' must be a file." % args.generator,
+    elif not os.path.isfile(generator):
+        print("error: Generator '%s' must be a file." % generator,
               file=sys.stderr)
         sys.exit(1)
-    elif not Compiler.is_stone_generator(args.generator):
+    elif not Compiler.is_stone_generator(generator):
         print("error: Generator '%s' must have a .stoneg.py extension." %
-              args.generator, file=sys.stderr)
+              generator, file=sys.stderr)
         sys.exit(1)
     else:
         # A bit hacky, but we add the folder that the generator is in to our
         # python path to support the case where the generator imports other
         # files in its local directory.
-        new_python_path = os.path.dirname(args.generator)
+        new_python_path = os.path.dirname(generator)
         if new_python_path not in sys.path:
             sys.path.append(new_python_path)
         try:
-            generator_module = imp.load_source('user_generator', args.generator)
+            return imp.load_source(module_name, generator)
         except:
             print("error: Importing generator '%s' module raised an exception:" %
-                  args.generator, file=sys.stderr)
+                  generator, file=sys.stderr)
             raise
 
-    c = Compiler(
-        api,
-        generator_module,
-        generator_args,
-        args.output,
-        clean_build=args.clean_build,
-    )
-    try:
-        c.build()
-    except GeneratorException as e:
-        print('%s: error: %s raised an exception:\n%s' %
-              (args.generator, e.generator_name, e.traceback),
-              file=sys.stderr)
-        sys.exit(1)
-
-    if not sys.argv[0].endswith('stone'):
-        # If we aren't running from an entry_point, then return api to make it
-        # easier to do debugging.
-        return api
-
 
 if __name__ == '__main__':
     # Assign api variable for easy debugging from a Python console
@@ -117,9 +117,13 @@ class FilterExprParser(object):
         ('left', 'AND'),
     )
 
+    # Module with the prebuilt parse tables of the grammar. See StoneParser.
+    tabmodule = str('stone.filter_expr_parsetab')
+
     def __init__(self, debug=False):
         self.debug = debug
-        self.yacc = yacc.yacc(module=self, debug=debug, write_tables=debug)
+        self.yacc = yacc.yacc(module=self, debug=debug, write_tables=debug,
+                              tabmodule=self.tabmodule)
         self.lexer = FilterExprLexer(debug)
         self.errors = []
 
@@ -6,10 +6,24 @@ import os
 import shutil
 import traceback
 
+from six.moves import queue
+
+from stone.forking import (
+    WorkerError,
+    fork_context,
+    map_in_forked_processes,
+)
 from stone.generator import (
     Generator,
     remove_aliases_from_api,
 )
+from stone.manifest import (
+    ALL_NAMESPACES,
+    BuildManifest,
+    combined_fingerprint,
+    generator_fingerprint,
+    namespace_fingerprints,
+)
 
 
 class GeneratorException(Exception):
@@ -24,10 +38,32 @@ class GeneratorException(Exception):
         self.traceback = traceback
 
 
+# The generator and API that worker processes generate namespaces with. Set
+# before the worker processes are started so that forked workers inherit them.
+_worker_generator = None
+_worker_api = None
+
+
+def _generate_namespace_in_worker(namespace_name):
+    """
+    Runs in a worker process. Returns a tuple of the files generated for a
+    namespace, and the traceback of the exception raised by the generator or
+    None.
+    """
+    generator = _worker_generator
+    generator.captured_files = []
+    try:
+        generator.generate_namespace(
+            _worker_api, _worker_api.namespaces[namespace_name])
+    except:
+        return None, traceback.format_exc()[:-1]
+    return generator.captured_files, None
+
+
 class Compiler(object):
     """
-    Applies a collection of generators found in a single generator module to an
-    API specification.
+    Applies the generators found in one or more generator modules to an API
+    specification.
     """
 
     generator_extension = '.stoneg'
@@ -37,7 +73,9 @@ class Compiler(object):
                  generator_module,
                  generator_args,
                  build_path,
-                 clean_build=False):
+                 clean_build=False,
+                 jobs=1,
+                 incremental=False):
         """
         Creates a Compiler.
 
@@ -51,26 +89,63 @@ class Compiler(object):
             source files are compiled into the same directories.
         :param bool clean_build: If True, the build_path is removed before
             source files are compiled into them.
+        :param int jobs: Number of processes to generate with. Generators that
+            implement generate_namespace() generate namespaces in parallel,
+            and the generators of different modules run in parallel. Requires
+            os.fork(), otherwise everything is generated serially.
+        :param bool incremental: If True, only the namespaces whose specs,
+            imported namespaces, or generator changed since the last build
+            are generated again. A manifest of what was generated is kept in
+            each build path. Generators that don't implement
+            generate_namespace() are skipped if nothing changed.
         """
         self._logger = logging.getLogger('stone.compiler')
 
         self.api = api
-        self.generator_module = generator_module
-        self.generator_args = generator_args
-        self.build_path = build_path
+        self.jobs = jobs
+        self.incremental = incremental
+        # List of (generator module, generator args, build path) tuples.
+        self.targets = []
+        self.add_generator_module(
+            generator_module, generator_args, build_path, clean_build)
 
+    def add_generator_module(self,
+                             generator_module,
+                             generator_args,
+                             build_path,
+                             clean_build=False):
+        """
+        Adds another generator module to apply to the same API specification
+        when build() is called. See __init__() for the arguments.
+        """
         # Remove existing build directory if it's a clean build
-        if clean_build and os.path.exists(self.build_path):
+        if clean_build and os.path.exists(build_path):
             logging.info('Cleaning existing build directory %s...',
-                         self.build_path)
-            shutil.rmtree(self.build_path)
+                         build_path)
+            shutil.rmtree(build_path)
+        self.targets.append((generator_module, generator_args, build_path))
+
+    @property
+    def generator_module(self):
+        return self.targets[0][0]
+
+    @property
+    def generator_args(self):
+        return self.targets[0][1]
+
+    @property
+    def build_path(self):
+        return self.targets[0][2]
 
     def build(self):
         """Creates outputs. Outputs are files made by a generator."""
-        if os.path.exists(self.build_path) and not os.path.isdir(self.build_path):
-            self._logger.error('Output path must be a folder if it already exists')
-            return
-        Compiler._mkdir(self.build_path)
+        for _, _, build_path in self.targets:
+            if os.path.exists(build_path) and not os.path.isdir(build_path):
+                self._logger.error(
+                    'Output path must be a folder if it already exists')
+                return
+        for _, _, build_path in self.targets:
+            Compiler._mkdir(build_path)
         self._execute_generator_on_spec()
 
     @staticmethod
@@ -96,30 +171,207 @@ class Compiler(object):
         _, second_ext = os.path.splitext(path_without_ext)
         return second_ext == cls.generator_extension
 
+    def _create_generators(self):
+        """
+        Returns a list of (name, generator) tuples with an instance of each
+        generator class in each generator module. Generators that preserve
+        aliases come first, so that aliases only need to be removed from the
+        API once, after they have run.
+        """
+        generators = []
+        for generator_module, generator_args, build_path in self.targets:
+            for attr_key in dir(generator_module):
+                attr_value = getattr(generator_module, attr_key)
+                if (inspect.isclass(attr_value) and
+                        issubclass(attr_value, Generator) and
+                        not inspect.isabstract(attr_value)):
+                    generators.append((
+                        attr_value.__name__,
+                        attr_value(build_path, generator_args)))
+        return ([g for g in generators if g[1].preserve_aliases] +
+                [g for g in generators if not g[1].preserve_aliases])
+
     def _execute_generator_on_spec(self):
         """Renders a source file into its final form."""
+        generators = self._create_generators()
+        if self.jobs > 1 and hasattr(os, 'fork') and len(generators) > 1:
+            self._run_generators_in_parallel(generators)
+            return
+
+        aliases_removed = False
+        for name, generator in generators:
+            if not generator.preserve_aliases and not aliases_removed:
+                remove_aliases_from_api(self.api)
+                aliases_removed = True
+            self._run_generator(name, generator, self.jobs)
 
-        api_no_aliases_cache = None
-        for attr_key in dir(self.generator_module):
-            attr_value = getattr(self.generator_module, attr_key)
-            if (inspect.isclass(attr_value) and
-                    issubclass(attr_value, Generator) and
-                    not inspect.isabstract(attr_value)):
-                self._logger.info('Running generator: %s', attr_value.__name__)
-                generator = attr_value(self.build_path, self.generator_args)
-
-                if generator.preserve_aliases:
-                    api = self.api
-                else:
-                    if not api_no_aliases_cache:
-                        api_no_aliases_cache = remove_aliases_from_api(self.api)
-                    api = api_no_aliases_cache
+    def _run_generator(self, name, generator, jobs):
+        self._logger.info('Running generator: %s', name)
+        try:
+            if self.incremental:
+                self._generate_incrementally(name, generator, jobs)
+            elif (jobs > 1 and hasattr(os, 'fork') and
+                    generator.has_namespace_units()):
+                self._generate_in_parallel(name, generator, jobs)
+            else:
+                generator.generate(self.api)
+        except GeneratorException:
+            raise
+        except:
+            # Wrap this exception so that it isn't thought of as a bug
+            # in the stone parser, but rather a bug in the generator.
+            # Remove the last char of the traceback b/c it's a newline.
+            raise GeneratorException(name, traceback.format_exc()[:-1])
+        self._logger.info('%s: wrote %d files, skipped %d unchanged files',
+                          name, generator.files_written,
+                          generator.files_unchanged)
+
+    def _run_generators_in_parallel(self, generators):
+        """
+        Runs each generator in a forked process, splitting the jobs between
+        them for generating namespaces. Aliases are removed from the API in
+        this process once the generators that preserve them have started.
+        """
+        context = fork_context()
+        results = context.Queue()
+        jobs_per_generator = max(1, self.jobs // len(generators))
+
+        def run(index, name, generator):
+            try:
+                self._run_generator(name, generator, jobs_per_generator)
+            except GeneratorException as e:
+                results.put((index, (e.generator_name, e.traceback)))
+            else:
+                results.put((index, None))
+
+        processes = []
+        aliases_removed = False
+        for index, (name, generator) in enumerate(generators):
+            if not generator.preserve_aliases and not aliases_removed:
+                remove_aliases_from_api(self.api)
+                aliases_removed = True
+            process = context.Process(target=run, args=(index, name, generator))
+            process.start()
+            processes.append(process)
+
+        # Maps the index of each process that has finished to the name and
+        # traceback of its generator's exception, or None.
+        reported = {}
+        while len(reported) < len(processes):
+            exited = [index for index, process in enumerate(processes)
+                      if index not in reported and not process.is_alive()]
+            try:
+                index, result = results.get(timeout=0.1)
+            except queue.Empty:
+                # A process reports before it exits, so one that had exited
+                # before the queue was found empty never will, for example
+                # because it was killed.
+                for index in exited:
+                    reported[index] = (
+                        generators[index][0],
+                        'Exited with code %d without reporting a result.' %
+                        processes[index].exitcode)
+                continue
+            reported[index] = result
+
+        for process in processes:
+            process.join()
+        for index in range(len(processes)):
+            if reported[index] is not None:
+                raise GeneratorException(*reported[index])
+        for process in processes:
+            if process.exitcode != 0:
+                raise GeneratorException(
+                    'process %d' % process.pid,
+                    'Exited with code %d.' % process.exitcode)
+
+    def _generate_in_parallel(self, generator_name, generator, jobs):
+        """
+        Runs generate_common() and then generate_namespace() for each
+        namespace in forked processes. The files generated for each
+        namespace are written in the order of api.namespaces, so the output
+        is the same as that of generate().
+        """
+        generator.generate_common(self.api)
+        results = self._generate_namespaces(
+            generator_name, generator, list(self.api.namespaces), jobs)
+        for files in results:
+            for full_path, contents in files:
+                generator.write_file(full_path, contents)
+
+    def _generate_namespaces(self, generator_name, generator, namespace_names,
+                             jobs):
+        """
+        Runs generate_namespace() for each namespace, in forked
+        processes if jobs > 1. Returns a list of the (path, contents) tuples
+        of the files generated for each namespace, in the same order.
+        """
+        global _worker_generator, _worker_api
+
+        if not namespace_names:
+            return []
+        _worker_generator, _worker_api = generator, self.api
+        if jobs > 1 and hasattr(os, 'fork'):
+            try:
+                results = map_in_forked_processes(
+                    _generate_namespace_in_worker, namespace_names, jobs)
+            except WorkerError as e:
+                raise GeneratorException(generator_name, str(e))
+            finally:
+                _worker_generator = _worker_api = None
+        else:
+            try:
+                results = [_generate_namespace_in_worker(namespace_name)
+                           for namespace_name in namespace_names]
+            finally:
+                generator.captured_files = None
+                _worker_generator = _worker_api = None
 
+        for _, tb in results:
+            if tb is not None:
+                raise GeneratorException(generator_name, tb)
+        return [files for files, _ in results]
+
+    def _generate_incrementally(self, generator_name, generator, jobs):
+        """
+        Generates the namespaces whose fingerprint differs from the one in the
+        manifest of the generator's output folder, and updates the manifest.
+        Files of namespaces that were removed from the API are deleted. A
+        generator that doesn't implement generate_namespace() has all
+        namespaces as a single unit.
+        """
+        manifest = BuildManifest(generator)
+        fingerprints = namespace_fingerprints(
+            self.api, generator_fingerprint(generator))
+
+        if generator.has_namespace_units():
+            generator.generate_common(self.api)
+            units = list(self.api.namespaces)
+            stale = [namespace_name for namespace_name in units
+                     if not manifest.is_current(
+                         namespace_name, fingerprints[namespace_name])]
+            results = self._generate_namespaces(
+                generator_name, generator, stale, jobs)
+        else:
+            units = [ALL_NAMESPACES]
+            fingerprints = {ALL_NAMESPACES: combined_fingerprint(fingerprints)}
+            stale = [] if manifest.is_current(
+                ALL_NAMESPACES, fingerprints[ALL_NAMESPACES]) else units
+            results = []
+            if stale:
+                generator.captured_files = []
                 try:
-                    generator.generate(api)
-                except:
-                    # Wrap this exception so that it isn't thought of as a bug
-                    # in the stone parser, but rather a bug in the generator.
-                    # Remove the last char of the traceback b/c it's a newline.
-                    raise GeneratorException(attr_value.__name__,
-                                             traceback.format_exc()[:-1])
+                    generator.generate(self.api)
+                    results.append(generator.captured_files)
+                finally:
+                    generator.captured_files = None
+        self._logger.info('%s: generating %d of %d units, the rest are '
+                          'unchanged', generator_name, len(stale), len(units))
+
+        for unit, files in zip(stale, results):
+            for full_path, contents in files:
+                generator.write_file(full_path, contents)
+            manifest.update(unit, fingerprints[unit],
+                            [full_path for full_path, _ in files])
+        manifest.remove_units_except(units)
+        manifest.save()
@@ -0,0 +1,42 @@
+
+# filter_expr_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'exprleftORleftANDAND BOOLEAN EQ FLOAT ID INTEGER LPAR NEQ NULL OR RPAR STRINGexpr : predexpr : LPAR expr RPARexpr : expr OR expr\n                | expr AND exprpred : ID op primitiveop : NEQ\n              | EQprimitive : BOOLEAN\n                     | FLOAT\n                     | INTEGER\n                     | NULL\n                     | STRING'
+    
+_lr_action_items = {'AND':([2,3,5,11,12,13,14,15,16,17,18,19,],[6,-1,6,-2,-4,6,-5,-12,-9,-8,-10,-11,]),'LPAR':([0,1,6,7,],[1,1,1,1,]),'NULL':([8,9,10,],[-6,-7,19,]),'STRING':([8,9,10,],[-6,-7,15,]),'FLOAT':([8,9,10,],[-6,-7,16,]),'OR':([2,3,5,11,12,13,14,15,16,17,18,19,],[7,-1,7,-2,-4,-3,-5,-12,-9,-8,-10,-11,]),'RPAR':([3,5,11,12,13,14,15,16,17,18,19,],[-1,11,-2,-4,-3,-5,-12,-9,-8,-10,-11,]),'BOOLEAN':([8,9,10,],[-6,-7,17,]),'INTEGER':([8,9,10,],[-6,-7,18,]),'NEQ':([4,],[8,]),'EQ':([4,],[9,]),'ID':([0,1,6,7,],[4,4,4,4,]),'$end':([2,3,11,12,13,14,15,16,17,18,19,],[0,-1,-2,-4,-3,-5,-12,-9,-8,-10,-11,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'expr':([0,1,6,7,],[2,5,12,13,]),'primitive':([10,],[14,]),'op':([4,],[10,]),'pred':([0,1,6,7,],[3,3,3,3,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> expr","S'",1,None,None,None),
+  ('expr -> pred','expr',1,'p_expr','cli_helpers.py',141),
+  ('expr -> LPAR expr RPAR','expr',3,'p_expr_parens','cli_helpers.py',145),
+  ('expr -> expr OR expr','expr',3,'p_expr_group','cli_helpers.py',149),
+  ('expr -> expr AND expr','expr',3,'p_expr_group','cli_helpers.py',150),
+  ('pred -> ID op primitive','pred',3,'p_pred','cli_helpers.py',154),
+  ('op -> NEQ','op',1,'p_op','cli_helpers.py',158),
+  ('op -> EQ','op',1,'p_op','cli_helpers.py',159),
+  ('primitive -> BOOLEAN','primitive',1,'p_primitive','cli_helpers.py',163),
+  ('primitive -> FLOAT','primitive',1,'p_primitive','cli_helpers.py',164),
+  ('primitive -> INTEGER','primitive',1,'p_primitive','cli_helpers.py',165),
+  ('primitive -> NULL','primitive',1,'p_primitive','cli_helpers.py',166),
+  ('primitive -> STRING','primitive',1,'p_primitive','cli_helpers.py',167),
+]
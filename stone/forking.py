@@ -0,0 +1,94 @@
+"""
+Helpers for doing work in forked processes, which inherit the state of the
+process that forks them, such as a parsed API.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import multiprocessing
+import traceback
+
+from six.moves import queue
+
+
+class WorkerError(Exception):
+    """
+    A worker process raised an exception, or exited without returning its
+    results, for example because it was killed.
+    """
+
+
+def fork_context():
+    """
+    Returns the multiprocessing context that starts processes with os.fork(),
+    which workers rely on to inherit the state of the parent.
+    """
+    if hasattr(multiprocessing, 'get_context'):
+        return multiprocessing.get_context('fork')
+    return multiprocessing  # Python 2 always forks.
+
+
+def map_in_forked_processes(func, items, processes):
+    """
+    Returns a list of func(item) for each item in items, in order. func is
+    called in up to processes forked processes, so it and items don't need to
+    be picklable, but its return values do.
+
+    Unlike multiprocessing.Pool.map(), this doesn't wait forever for the
+    results of a process that exited without returning them.
+
+    Raises:
+        WorkerError: If func raised an exception, or a process exited
+            abnormally.
+    """
+    if not items:
+        return []
+    context = fork_context()
+    tasks = context.Queue()
+    results = context.Queue()
+    for index in range(len(items)):
+        tasks.put(index)
+    processes = min(processes, len(items))
+    for _ in range(processes):
+        tasks.put(None)
+
+    def run():
+        for index in iter(tasks.get, None):
+            try:
+                results.put((index, True, func(items[index])))
+            except:  # pylint: disable=bare-except
+                results.put((index, False, traceback.format_exc()[:-1]))
+
+    workers = [context.Process(target=run) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+
+    values = [None] * len(items)
+    pending = set(range(len(items)))
+    try:
+        while pending:
+            try:
+                index, ok, value = results.get(timeout=0.1)
+            except queue.Empty:
+                # Workers catch exceptions raised by func, so one that exited
+                # with an error was killed, and the items it took are lost.
+                for worker in workers:
+                    if worker.exitcode:
+                        raise WorkerError(
+                            'Process %d exited with code %d.' %
+                            (worker.pid, worker.exitcode))
+                if not any(worker.is_alive() for worker in workers):
+                    raise WorkerError(
+                        'Processes exited without returning all results.')
+                continue
+            if not ok:
+                raise WorkerError(value)
+            values[index] = value
+            pending.discard(index)
+    finally:
+        if pending:
+            for worker in workers:
+                worker.terminate()
+        for worker in workers:
+            worker.join()
+    return values
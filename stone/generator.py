@@ -6,6 +6,7 @@ from contextlib import contextmanager
 import logging
 import os
 import six
+import tempfile
 import textwrap
 
 from stone.lang.tower import doc_ref_re
@@ -60,6 +61,19 @@ def remove_aliases_from_api(api):
     return api
 
 
+def _file_mode(path):
+    """
+    Returns the permissions of the file at path, or those that a new file
+    would get if it doesn't exist.
+    """
+    try:
+        return os.stat(path).st_mode & 0o777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
 @six.add_metaclass(ABCMeta)
 class Generator(object):
     """
@@ -79,6 +93,13 @@ class Generator(object):
 
     The target_folder_path attribute is the path to the folder where all
     generated files should be created.
+
+    A generator whose output for each namespace is independent of the others
+    can declare each namespace a unit of work by implementing
+    generate_namespace() and, for files that don't belong to a namespace,
+    generate_common(). When asked to run with multiple jobs, the compiler
+    calls those instead of generate(), so that namespaces are generated in
+    parallel.
     """
 
     # Can be overridden by a subclass
@@ -107,6 +128,13 @@ class Generator(object):
         self.output = []
         self.lineno = 1
         self.cur_indent = 0
+        # If not None, output_to_relative_path() appends a tuple of the path
+        # and contents of each file to this list rather than writing it.
+        self.captured_files = None
+        # Counts of the files write_file() wrote, and of those it skipped
+        # because their contents were unchanged.
+        self.files_written = 0
+        self.files_unchanged = 0
 
         if self.cmdline_parser:
             assert isinstance(self.cmdline_parser, argparse.ArgumentParser), (
@@ -132,6 +160,40 @@ class Generator(object):
         """
         raise NotImplementedError
 
+    def generate_common(self, api):
+        """
+        Can be overridden by a subclass that implements generate_namespace()
+        to generate the files that don't belong to a single namespace. It
+        must not depend on generate_namespace() having been called.
+
+        Args:
+            api (stone.api.Api): The API specification.
+        """
+        pass
+
+    def generate_namespace(self, api, namespace):
+        """
+        Can be overridden by a subclass to generate the files of one namespace
+        as a separate unit of work, which may run in another process than the
+        other units. Its output must not depend on the order that namespaces
+        are generated in, and no two units may write to the same file.
+
+        A subclass that overrides this should implement generate() as a call
+        to generate_common() followed by a call to this for each namespace.
+
+        Args:
+            api (stone.api.Api): The API specification.
+            namespace (stone.api.ApiNamespace): The namespace to generate.
+        """
+        raise NotImplementedError
+
+    def has_namespace_units(self):
+        """
+        Returns whether this generator implements generate_namespace().
+        """
+        return (six.get_unbound_function(type(self).generate_namespace) is not
+                six.get_unbound_function(Generator.generate_namespace))
+
     @contextmanager
     def output_to_relative_path(self, relative_path):
         """
@@ -141,18 +203,68 @@ class Generator(object):
         Clears the output buffer on enter and exit.
         """
         full_path = os.path.join(self.target_folder_path, relative_path)
-        directory = os.path.dirname(full_path)
-        if not os.path.exists(directory):
-            self.logger.info('Creating %s', directory)
-            os.makedirs(directory)
-
         self.logger.info('Generating %s', full_path)
         self.output = []
         yield
-        with open(full_path, 'wb') as f:
-            f.write(''.join(self.output).encode('utf-8'))
+        self._output_file(full_path, ''.join(self.output).encode('utf-8'))
         self.output = []
 
+    def copy_file(self, source_path, relative_path=None):
+        """
+        Copies the file at source_path to relative_path in the target folder,
+        which defaults to the same file name. Use this rather than
+        shutil.copy() so that an unchanged file isn't written again.
+        """
+        if relative_path is None:
+            relative_path = os.path.basename(source_path)
+        full_path = os.path.join(self.target_folder_path, relative_path)
+        self.logger.info('Copying %s to %s', source_path, full_path)
+        with open(source_path, 'rb') as f:
+            self._output_file(full_path, f.read())
+
+    def _output_file(self, full_path, contents):
+        if self.captured_files is None:
+            self.write_file(full_path, contents)
+        else:
+            self.captured_files.append((full_path, contents))
+
+    def write_file(self, full_path, contents):
+        """
+        Writes contents, which are bytes, to the file at full_path, creating
+        its folder if needed. If the file already has the same contents, it
+        isn't written, so its modification time is kept for build tools that
+        rely on it. Otherwise, contents are written to a temporary file that
+        then replaces it, so that the file is never partially written.
+        """
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            self.logger.info('Creating %s', directory)
+            os.makedirs(directory)
+        elif os.path.isfile(full_path) and \
+                os.path.getsize(full_path) == len(contents):
+            with open(full_path, 'rb') as f:
+                if f.read() == contents:
+                    self.logger.debug('Unchanged %s', full_path)
+                    self.files_unchanged += 1
+                    return
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix='.' + os.path.basename(full_path) + '.',
+            suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(contents)
+            # mkstemp() creates files only readable by the current user.
+            os.chmod(tmp_path, _file_mode(full_path))
+            if os.name == 'nt' and os.path.exists(full_path):
+                os.remove(full_path)
+            os.rename(tmp_path, full_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.files_written += 1
+
     def output_buffer_to_string(self):
         """Returns the contents of the output buffer as a string."""
         return ''.join(self.output)
@@ -1,7 +1,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+from collections import deque
 import logging
-import os
 
 import ply.lex as lex
 
@@ -25,6 +25,8 @@ class StoneLexer(object):
 
     def __init__(self):
         self.lex = None
+        # The keyword arguments self.lex was built with.
+        self._lex_kwargs = None
         self.tokens_queue = None
         self.cur_indent = None
         self._logger = logging.getLogger('stone.stone.lexer')
@@ -38,9 +40,17 @@ class StoneLexer(object):
 
         :param str file_data: Contents of the file to lex.
         """
-        self.lex = lex.lex(module=self, **kwargs)
-        self.tokens_queue = []
+        if self.lex is None or kwargs != self._lex_kwargs:
+            # Building a ply lexer compiles the regexes of all the tokens, so
+            # it's reused for each input.
+            self.lex = lex.lex(module=self, **kwargs)
+            self._lex_kwargs = kwargs
+        else:
+            # The only state that ply.lex.Lexer.input() doesn't reset.
+            self.lex.lineno = 1
+        self.tokens_queue = deque()
         self.cur_indent = 0
+        self.last_token = None
         # Hack to avoid tokenization bugs caused by files that do not end in a
         # new line.
         self.lex.input(file_data + '\n')
@@ -52,12 +62,12 @@ class StoneLexer(object):
         """
 
         if self.tokens_queue:
-            self.last_token = self.tokens_queue.pop(0)
+            self.last_token = self.tokens_queue.popleft()
         else:
             r = self.lex.token()
             if isinstance(r, MultiToken):
                 self.tokens_queue.extend(r.tokens)
-                self.last_token = self.tokens_queue.pop(0)
+                self.last_token = self.tokens_queue.popleft()
             else:
                 if r is None and self.cur_indent > 0:
                     if self.last_token and self.last_token.type not in ('NEWLINE', 'LINE'):
@@ -70,7 +80,7 @@ class StoneLexer(object):
                     self.tokens_queue.extend([dedent_token] * dedent_count)
 
                     self.cur_indent = 0
-                    self.last_token = self.tokens_queue.pop(0)
+                    self.last_token = self.tokens_queue.popleft()
                 else:
                     self.last_token = r
         return self.last_token
@@ -293,12 +303,15 @@ class StoneLexer(object):
         """
         assert newline_token.type == 'NEWLINE', \
             'Can only search for a dent starting from a newline.'
+        lexdata = newline_token.lexer.lexdata
         next_line_pos = newline_token.lexpos + len(newline_token.value)
-        if next_line_pos == len(newline_token.lexer.lexdata):
+        if next_line_pos == len(lexdata):
             # Reached end of file
             return None
 
-        line = newline_token.lexer.lexdata[next_line_pos:].split(os.linesep, 1)[0]
+        # Only copy the next line, rather than the rest of the file.
+        line_end = lexdata.find('\n', next_line_pos)
+        line = lexdata[next_line_pos:line_end if line_end != -1 else None]
         if not line:
             return None
         lstripped_line = line.lstrip()
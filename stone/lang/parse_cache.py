@@ -0,0 +1,140 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+from . import lexer, parser
+
+# Bump this when the format of cached entries changes in a way that isn't
+# caught by the fingerprint of the parser's source.
+_CACHE_FORMAT_VERSION = 1
+
+def _source_fingerprint():
+    """
+    Returns a hash of the source of the lexer and parser, so that entries
+    written by a different version of either are never loaded.
+    """
+    h = hashlib.sha1()
+    h.update(str(_CACHE_FORMAT_VERSION).encode('ascii'))
+    for module in (lexer, parser):
+        path = os.path.splitext(module.__file__)[0] + '.py'
+        if not os.path.exists(path):
+            # Only compiled files are available, so use those instead.
+            path = module.__file__
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+class ParseCache(object):
+    """
+    An on-disk cache of the output of StoneParser.parse(), keyed by a hash of
+    the text and path of a spec. Entries are pickled to one file each, and
+    files that can't be loaded are treated as misses.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Args:
+            cache_dir (str): Folder to store entries in. It's created if it
+                doesn't exist.
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._fingerprint = _source_fingerprint()
+        self._logger = logging.getLogger('stone.idl.parse_cache')
+
+    def _entry_path(self, text, path):
+        h = hashlib.sha1()
+        h.update(self._fingerprint.encode('ascii'))
+        # The path is part of the key because it's stored in every element.
+        h.update(repr(path).encode('utf-8'))
+        h.update(b'\0')
+        h.update(text.encode('utf-8'))
+        return os.path.join(self.cache_dir, h.hexdigest() + '.pickle')
+
+    def get(self, text, path=None):
+        """
+        Returns the parsed elements of a spec, or None if they're not cached.
+        """
+        entry_path = self._entry_path(text, path)
+        try:
+            with open(entry_path, 'rb') as f:
+                parsed_data = pickle.load(f)
+        except Exception:  # pylint: disable=broad-except
+            # A missing, partial, or otherwise unreadable entry.
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._logger.debug('Loaded parsed spec %s from %s', path, entry_path)
+        return parsed_data
+
+    def put(self, text, path, parsed_data):
+        """
+        Stores the parsed elements of a spec. Only output without errors should
+        be stored, since errors aren't cached.
+        """
+        if not os.path.exists(self.cache_dir):
+            try:
+                os.makedirs(self.cache_dir)
+            except OSError:
+                # Created by another process in the meantime.
+                if not os.path.isdir(self.cache_dir):
+                    raise
+        entry_path = self._entry_path(text, path)
+        # Write to a temporary file first so that concurrent runs never read a
+        # partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(parsed_data, f, pickle.HIGHEST_PROTOCOL)
+            if os.name == 'nt' and os.path.exists(entry_path):
+                os.remove(entry_path)
+            os.rename(tmp_path, entry_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+class MemoryParseCache(object):
+    """
+    Keeps the output of StoneParser.parse() for the latest text of each spec
+    path in memory, for a process that parses the same specs repeatedly.
+    Entries are kept pickled, since parsed elements may be modified by
+    TowerOfStone. Has the same interface as ParseCache.
+    """
+
+    def __init__(self, backing_cache=None):
+        """
+        Args:
+            backing_cache (Optional[ParseCache]): A cache to look up specs in
+                that aren't in memory, and to store new ones in as well.
+        """
+        self.backing_cache = backing_cache
+        self.hits = 0
+        self.misses = 0
+        # Maps the path of each spec to a tuple of its text and its pickled
+        # parsed elements.
+        self._entries = {}
+
+    def get(self, text, path=None):
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == text:
+            self.hits += 1
+            return pickle.loads(entry[1])
+        self.misses += 1
+        if self.backing_cache is not None:
+            parsed_data = self.backing_cache.get(text, path)
+            if parsed_data is not None:
+                self._entries[path] = (
+                    text, pickle.dumps(parsed_data, pickle.HIGHEST_PROTOCOL))
+            return parsed_data
+        return None
+
+    def put(self, text, path, parsed_data):
+        self._entries[path] = (
+            text, pickle.dumps(parsed_data, pickle.HIGHEST_PROTOCOL))
+        if self.backing_cache is not None:
+            self.backing_cache.put(text, path, parsed_data)
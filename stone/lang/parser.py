@@ -343,9 +343,15 @@ class StoneParser(object):
     # Ply feature: Starting grammar rule
     start = str('spec')  # PLY wants a 'str' instance; this makes it work in Python 2 and 3
 
+    # Module with the prebuilt parse tables of the grammar. If they're out of
+    # date, the tables are built from the grammar. Update them by running
+    # "python -m stone.parse_tables".
+    tabmodule = str('stone.lang.parsetab')
+
     def __init__(self, debug=False):
         self.debug = debug
-        self.yacc = yacc.yacc(module=self, debug=self.debug, write_tables=self.debug)
+        self.yacc = yacc.yacc(module=self, debug=self.debug,
+                              write_tables=self.debug, tabmodule=self.tabmodule)
         self.lexer = StoneLexer()
         self._logger = logging.getLogger('stone.stone.parser')
         # [(token type, token value, line number), ...]
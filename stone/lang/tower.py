@@ -1,8 +1,10 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import copy
+import hashlib
 import inspect
 import logging
+import os
 import re
 
 from ..api import (
@@ -37,6 +39,7 @@ from ..data_type import (
     unwrap_aliases,
 )
 
+from ..forking import map_in_forked_processes
 from .exception import InvalidSpec
 from .parser import (
     StoneAlias,
@@ -62,6 +65,20 @@ doc_ref_re = re.compile(r':(?P<tag>[A-z]+):`(?P<val>.*?)`')
 doc_ref_val_re = re.compile(
     r'^(null|true|false|-?\d+(\.\d*)?(e-?\d+)?|"[^\\"]*")$')
 
+def _parse_spec_in_worker(tower, index):
+    """
+    Runs in a worker process. Returns a tuple of the parsed elements of the
+    spec at index, and the errors found in it.
+    """
+    path, text = tower._specs[index]
+    if tower._debug:
+        tower.parser.test_lexing(text)
+    # The parser and lexer keep the errors of every spec they parsed.
+    tower.parser.errors = []
+    tower.parser.lexer.errors = []
+    res = tower.parser.parse(text, path)
+    return res, tower.parser.get_errors()
+
 class Environment(dict):
     # The default environment won't have a name set since it applies to all
     # namespaces. But, every time it's copied to represent the environment
@@ -89,17 +106,25 @@ class TowerOfStone(object):
         **{data_type.__name__: data_type for data_type in data_types})
 
     # FIXME: Version should not have a default.
-    def __init__(self, specs, version='0.1b1', debug=False):
+    def __init__(self, specs, version='0.1b1', debug=False, parse_cache=None,
+                 jobs=1):
         """Creates a new tower of stone.
 
         :type specs: List[Tuple[path: str, text: str]]
         :param specs: `path` is never accessed and is only used to report the
             location of a bad spec to the user. `spec` is the text contents of
             a spec (.stone) file.
+        :type parse_cache: Optional[stone.lang.parse_cache.ParseCache]
+        :param parse_cache: If set, specs that were parsed before are loaded
+            from it rather than parsed again.
+        :param int jobs: Number of processes to parse specs with. Requires
+            os.fork(), otherwise specs are parsed serially.
         """
 
         self._specs = specs
         self._debug = debug
+        self._parse_cache = parse_cache
+        self._jobs = jobs
         self._logger = logging.getLogger('stone.idl')
 
         self.api = Api(version=version)
@@ -116,20 +141,16 @@ class TowerOfStone(object):
         """Parses the text of each spec and returns an API description. Returns
         None if an error was encountered during parsing."""
         raw_api = []
-        for path, text in self._specs:
-            self._logger.info('Parsing spec %s', path)
-            res = self.parse_spec(text, path)
-            if self.parser.got_errors_parsing():
-                # TODO(kelkabany): Show more than one error at a time.
-                msg, lineno, path = self.parser.get_errors()[0]
-                raise InvalidSpec(msg, lineno, path)
-            elif res:
+        for path, text, res in self._parse_specs():
+            if res:
                 namespace_token = self._extract_namespace_token(res)
                 namespace = self.api.ensure_namespace(namespace_token.name)
                 base_name = self._get_base_name(namespace.name, namespace.name)
                 self._item_by_canonical_name[base_name] = namespace_token
                 if namespace_token.doc is not None:
                     namespace.add_doc(namespace_token.doc)
+                namespace.spec_digests.append(
+                    hashlib.sha1(text.encode('utf-8')).hexdigest())
                 raw_api.append((namespace, res))
                 self._add_data_types_and_routes_to_api(namespace, res)
             else:
@@ -152,7 +173,71 @@ class TowerOfStone(object):
         if self._debug:
             self.parser.test_lexing(spec)
 
-        return self.parser.parse(spec, path)
+        if self._parse_cache is not None:
+            res = self._parse_cache.get(spec, path)
+            if res is not None:
+                return res
+
+        res = self.parser.parse(spec, path)
+        if self._parse_cache is not None and not self.parser.got_errors_parsing():
+            self._parse_cache.put(spec, path, res)
+        return res
+
+    def _parse_specs(self):
+        """
+        Yields a tuple of the path, text and parsed elements of each spec, in
+        order. Raises InvalidSpec for the first error of the first spec that
+        has errors.
+        """
+        results = None
+        if self._jobs > 1 and hasattr(os, 'fork') and len(self._specs) > 1:
+            results = self._parse_specs_in_parallel()
+
+        for i, (path, text) in enumerate(self._specs):
+            if results is None:
+                self._logger.info('Parsing spec %s', path)
+                res = self.parse_spec(text, path)
+                errors = self.parser.get_errors()
+            else:
+                res, errors = results[i]
+            if errors:
+                # TODO(kelkabany): Show more than one error at a time.
+                msg, lineno, path = errors[0]
+                raise InvalidSpec(msg, lineno, path)
+            yield path, text, res
+
+    def _parse_specs_in_parallel(self):
+        """
+        Parses the specs that aren't in the parse cache in forked processes.
+        Returns a list of a tuple of the parsed elements and the
+        errors of each spec, in order.
+        """
+        results = [None] * len(self._specs)
+        pending = []
+        for i, (path, text) in enumerate(self._specs):
+            res = None
+            if self._parse_cache is not None:
+                res = self._parse_cache.get(text, path)
+            if res is None:
+                pending.append(i)
+            else:
+                results[i] = (res, [])
+
+        if len(pending) > 1:
+            processes = min(self._jobs, len(pending))
+            self._logger.info('Parsing %d specs with %d processes',
+                              len(pending), processes)
+            parsed = map_in_forked_processes(
+                lambda i: _parse_spec_in_worker(self, i), pending, processes)
+        else:
+            parsed = [_parse_spec_in_worker(self, i) for i in pending]
+
+        for i, (res, errors) in zip(pending, parsed):
+            results[i] = (res, errors)
+            if self._parse_cache is not None and not errors:
+                path, text = self._specs[i]
+                self._parse_cache.put(text, path, res)
+        return results
 
     def _extract_namespace_token(self, desc):
         """
@@ -0,0 +1,232 @@
+"""
+Fingerprints of the inputs of each unit of generated output, and a manifest
+that records them in the output folder, so that incremental builds only
+regenerate the units whose inputs changed.
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+
+# Bump this when the way fingerprints are computed changes, so that existing
+# manifests are ignored.
+MANIFEST_VERSION = 2
+
+# The name of the unit of a generator that doesn't generate namespaces
+# separately. Its output is all generated at once.
+ALL_NAMESPACES = '*'
+
+_stone_folder = os.path.dirname(os.path.abspath(__file__))
+
+
+def _source_path(module):
+    path = getattr(module, '__file__', None)
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    if path.endswith(('.pyc', '.pyo')) and os.path.exists(path[:-1]):
+        path = path[:-1]
+    return path
+
+
+def generator_fingerprint(generator):
+    """
+    Returns a hash of what a generator's output depends on besides the API:
+    its class, its arguments, the source of its module and of the modules it
+    imports from Stone or from the folder of its module, and the files in the
+    *_rsrc folders next to its module, which it may copy to the output.
+    """
+    module = sys.modules[type(generator).__module__]
+    module_path = _source_path(module)
+    folders = {_stone_folder}
+    if module_path:
+        folders.add(os.path.dirname(module_path))
+
+    modules = {module}
+    for value in vars(module).values():
+        if inspect.ismodule(value):
+            modules.add(value)
+        elif inspect.isclass(value) or inspect.isfunction(value):
+            imported_module = sys.modules.get(value.__module__)
+            if imported_module is not None:
+                modules.add(imported_module)
+
+    h = hashlib.sha1()
+    h.update(json.dumps([
+        MANIFEST_VERSION,
+        type(generator).__name__,
+        sorted(vars(generator.args).items()) if generator.args else None,
+    ]).encode('utf-8'))
+    source_paths = set()
+    for imported_module in modules:
+        path = _source_path(imported_module)
+        if path and os.path.dirname(path) in folders:
+            source_paths.add(path)
+    for path in sorted(source_paths):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    if module_path:
+        module_folder = os.path.dirname(module_path)
+        for path in _resource_paths(module_folder):
+            h.update(os.path.relpath(path, module_folder).encode('utf-8'))
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    return h.hexdigest()
+
+
+def _resource_paths(folder):
+    """
+    Returns the sorted paths of the files in the *_rsrc folders in folder,
+    besides compiled Python files.
+    """
+    paths = []
+    for name in os.listdir(folder):
+        rsrc_folder = os.path.join(folder, name)
+        if not name.endswith('_rsrc') or not os.path.isdir(rsrc_folder):
+            continue
+        for dirpath, dirnames, filenames in os.walk(rsrc_folder):
+            dirnames[:] = [d for d in dirnames if d != '__pycache__']
+            paths.extend(os.path.join(dirpath, filename)
+                         for filename in filenames
+                         if not filename.endswith(('.pyc', '.pyo')))
+    return sorted(paths)
+
+
+def _namespace_closure(namespace):
+    """
+    Returns the namespace and the namespaces it imports, directly or
+    indirectly.
+    """
+    closure = {}
+    pending = [namespace]
+    while pending:
+        ns = pending.pop()
+        if ns.name not in closure:
+            closure[ns.name] = ns
+            pending.extend(ns.get_imported_namespaces())
+    return [closure[name] for name in sorted(closure)]
+
+
+def namespace_fingerprints(api, generator_fp):
+    """
+    Returns a dict that maps the name of each namespace to a hash of the
+    inputs of its generated output: the specs of the namespace and of the
+    namespaces it imports, their routes and route attributes, which may have
+    been filtered after parsing, the route schema and generator_fp. The hash
+    is None if a namespace wasn't parsed from specs.
+    """
+    route_schema = None
+    if api.route_schema is not None:
+        route_schema = [repr(field) for field in api.route_schema.all_fields]
+
+    fingerprints = {}
+    for name, namespace in api.namespaces.items():
+        inputs = [generator_fp, route_schema]
+        for ns in _namespace_closure(namespace):
+            if not ns.spec_digests:
+                inputs = None
+                break
+            inputs.append([
+                ns.name,
+                sorted(ns.spec_digests),
+                [(route.name, repr(sorted(route.attrs.items())))
+                 for route in ns.routes],
+            ])
+        if inputs is None:
+            fingerprints[name] = None
+        else:
+            fingerprints[name] = hashlib.sha1(
+                json.dumps(inputs).encode('utf-8')).hexdigest()
+    return fingerprints
+
+
+def combined_fingerprint(fingerprints):
+    """
+    Returns a hash of the fingerprints of all namespaces, or None if any of
+    them is None.
+    """
+    if any(fp is None for fp in fingerprints.values()):
+        return None
+    return hashlib.sha1(
+        json.dumps(sorted(fingerprints.items())).encode('utf-8')).hexdigest()
+
+
+class BuildManifest(object):
+    """
+    Records the fingerprint of each unit of a generator's output, and the
+    files it generated, in a JSON file in the generator's output folder.
+    """
+
+    def __init__(self, generator):
+        self.target_folder_path = generator.target_folder_path
+        self.path = os.path.join(
+            generator.target_folder_path,
+            '.stone_manifest.%s.json' % type(generator).__name__)
+        self._logger = logging.getLogger('stone.manifest')
+        # Maps the name of each unit to a dict with its fingerprint and
+        # the paths of its files relative to the output folder.
+        self.units = {}
+
+        try:
+            with open(self.path, 'rb') as f:
+                manifest = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            return
+        if manifest.get('version') == MANIFEST_VERSION:
+            self.units = manifest['units']
+
+    def is_current(self, unit, fingerprint):
+        """
+        Returns whether unit was generated with the same fingerprint, and its
+        files still exist.
+        """
+        entry = self.units.get(unit)
+        if fingerprint is None or entry is None:
+            return False
+        return entry['fingerprint'] == fingerprint and all(
+            os.path.exists(os.path.join(self.target_folder_path, path))
+            for path in entry['files'])
+
+    def update(self, unit, fingerprint, full_paths):
+        """
+        Records the fingerprint of unit and the files that were generated for
+        it. A unit without a fingerprint is forgotten, since it always has to
+        be regenerated.
+        """
+        if fingerprint is None:
+            self.units.pop(unit, None)
+            return
+        self.units[unit] = {
+            'fingerprint': fingerprint,
+            'files': sorted(os.path.relpath(path, self.target_folder_path)
+                            for path in full_paths),
+        }
+
+    def remove_units_except(self, units):
+        """
+        Forgets the units that aren't in units, and removes their files
+        unless another unit generated them as well.
+        """
+        removed = [unit for unit in self.units if unit not in units]
+        kept_files = set()
+        for unit, entry in self.units.items():
+            if unit not in removed:
+                kept_files.update(entry['files'])
+        for unit in removed:
+            for path in self.units.pop(unit)['files']:
+                full_path = os.path.join(self.target_folder_path, path)
+                if path not in kept_files and os.path.exists(full_path):
+                    self._logger.info('Removing %s', full_path)
+                    os.remove(full_path)
+
+    def save(self):
+        with open(self.path, 'wb') as f:
+            f.write(json.dumps({
+                'version': MANIFEST_VERSION,
+                'units': self.units,
+            }, indent=2, sort_keys=True).encode('utf-8'))
@@ -0,0 +1,50 @@
+"""
+Writes the parse tables of the grammars of specs and of route filter
+expressions to the modules that the parsers load them from, so that they
+aren't built from the grammars every time Stone starts. Run this after
+changing either grammar:
+
+    $ python -m stone.parse_tables
+"""
+
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import importlib
+
+import ply.yacc as yacc
+
+from stone.cli_helpers import FilterExprParser
+from stone.lang.parser import StoneParser
+
+_parser_classes = (StoneParser, FilterExprParser)
+
+
+def parse_tables_are_current(parser_class):
+    """
+    Returns whether the prebuilt parse tables of parser_class were built from
+    its current grammar, and by the installed version of PLY.
+    """
+    try:
+        parsetab = importlib.import_module(parser_class.tabmodule)
+    except ImportError:
+        return False
+    pinfo = yacc.ParserReflect(
+        dict((k, getattr(parser_class, k)) for k in dir(parser_class)))
+    pinfo.get_all()
+    return (getattr(parsetab, '_tabversion', None) == yacc.__tabversion__ and
+            getattr(parsetab, '_lr_signature', None) == pinfo.signature())
+
+
+def write_parse_tables():
+    for parser_class in _parser_classes:
+        if parse_tables_are_current(parser_class):
+            print('%s is up to date.' % parser_class.tabmodule)
+            continue
+        parser = parser_class()
+        yacc.yacc(module=parser, tabmodule=parser_class.tabmodule,
+                  write_tables=True, debug=False)
+        print('Wrote %s.' % parser_class.tabmodule)
+
+
+if __name__ == '__main__':
+    write_parse_tables()
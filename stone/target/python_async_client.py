@@ -0,0 +1,72 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+
+# Import the module rather than the class so that the compiler doesn't also run
+# the synchronous generator when it runs this one.
+from stone.target import python_client
+
+_cmdline_parser = argparse.ArgumentParser(
+    prog='python-async-client-generator',
+    description=(
+        'Generates a Python class with a coroutine method for each route, for '
+        'use with asyncio. Extend the generated class and implement the '
+        'abstract coroutine request(). The generated module requires Python '
+        '3.5+. This class assumes that the python_types generator was used '
+        'with the same output directory.'),
+)
+_cmdline_parser.add_argument(
+    '-m',
+    '--module-name',
+    required=True,
+    type=str,
+    help=('The name of the Python module to generate. Please exclude the .py '
+          'file extension.'),
+)
+_cmdline_parser.add_argument(
+    '-c',
+    '--class-name',
+    required=True,
+    type=str,
+    help='The name of the Python class that contains each route as a method.',
+)
+
+
+class PythonAsyncClientGenerator(python_client.PythonClientGenerator):
+    """
+    Generates the same class as the python_client generator, except that the
+    route methods and request() are coroutines. Route methods await request(),
+    and the "_to_file" variants of download-style routes also await
+    _save_body_to_file(). The "_stream" variants of download-style routes
+    return the iterator made by _iter_body_chunks(), which subclasses must
+    implement since how to iterate over a response depends on the HTTP
+    library.
+    """
+
+    cmdline_parser = _cmdline_parser
+
+    def_keyword = 'async def'
+    await_keyword = 'await '
+
+    # The reference transport is synchronous.
+    transport_module = None
+
+    single_flight_class = 'AsyncSingleFlight'
+
+    def _generate_class_decl(self):
+        self.emit('class %s(metaclass=ABCMeta):' % self.args.class_name)
+        self.emit()
+
+    def _generate_iter_body_chunks(self):
+        self.emit('@abstractmethod')
+        self.emit('def _iter_body_chunks(self, response, chunk_size):')
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Returns an async iterator over the body of a response '
+                'returned by request() in chunks of at most chunk_size bytes. '
+                'It should close the response once the body has been '
+                'consumed.')
+            self.emit('"""')
+            self.emit('pass')
+        self.emit()
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import argparse
+import os
 import re
 
 from stone.data_type import (
@@ -14,9 +15,10 @@ from stone.data_type import (
 from stone.generator import CodeGenerator
 from stone.target.python_helpers import (
     fmt_class,
+    fmt_doc_ref,
+    fmt_doc_type,
     fmt_func,
     fmt_obj,
-    fmt_type,
     fmt_var,
 )
 from stone.target.python_types import (
@@ -33,6 +35,16 @@ from abc import ABCMeta, abstractmethod
 # Matches format of Babel doc tags
 doc_sub_tag_re = re.compile(':(?P<tag>[A-z]*):`(?P<val>.*?)`')
 
+DOCSTRING_REQUEST = """\
+Makes a request to a route. For upload-style routes, arg_binary is the request
+body, which can be bytes, a file-like object or an iterable of bytes. For
+download-style routes, returns a tuple of the route's result and the response,
+whose body should not have been read yet."""
+
+DOCSTRING_STREAM_RESPONSE = """\
+The body is closed once the iterator is exhausted. If you stop iterating
+early, call close() on the iterator to close the response."""
+
 DOCSTRING_CLOSE_RESPONSE = """\
 If you do not consume the entire response body, then you must call close on the
 response object, otherwise you will max out your available connections. We
@@ -69,12 +81,39 @@ class PythonClientGenerator(CodeGenerator):
 
     cmdline_parser = _cmdline_parser
 
+    # Keywords that route methods are declared and call request() with.
+    # Overridden to generate coroutines instead.
+    def_keyword = 'def'
+    await_keyword = ''
+
+    # Drop-in module from python_rsrc that implements request() and
+    # request_batch() of the generated class, or None.
+    transport_module = 'stone_transport.py'
+
+    # Class in stone_singleflight.py that coalesces calls to routes.
+    single_flight_class = 'SingleFlight'
+
     def generate(self, api):
         """Generates a module called "base".
 
         The module will contain a "DropboxBase" class that will have a method
         for each route across all namespaces.
         """
+        rsrc_folder = os.path.join(os.path.dirname(__file__), 'python_rsrc')
+        if self.transport_module:
+            self.copy_file(os.path.join(rsrc_folder, self.transport_module))
+        has_cached_routes = any(
+            self._is_cached_route(route)
+            for namespace in api.namespaces.values()
+            for route in namespace.routes)
+        has_coalesced_routes = any(
+            self._is_coalesced_route(route)
+            for namespace in api.namespaces.values()
+            for route in namespace.routes)
+        if has_cached_routes or has_coalesced_routes:
+            self.copy_file(os.path.join(rsrc_folder, 'stone_cache.py'))
+        if has_coalesced_routes:
+            self.copy_file(os.path.join(rsrc_folder, 'stone_singleflight.py'))
         with self.output_to_relative_path('%s.py' % self.args.module_name):
             self.emit_raw(base)
             # Import "warnings" if any of the routes are deprecated.
@@ -88,30 +127,233 @@ class PythonClientGenerator(CodeGenerator):
                 if found_deprecated:
                     break
             self.emit()
-            self._generate_imports(api.namespaces.values())
+            has_batch_routes = any(
+                self._is_batch_route(route)
+                for namespace in api.namespaces.values()
+                for route in namespace.routes)
+            has_download_routes = any(
+                route.attrs.get('style') == 'download'
+                for namespace in api.namespaces.values()
+                for route in namespace.routes)
+            rsrc_modules = []
+            if has_cached_routes or has_coalesced_routes:
+                rsrc_modules.append('stone_cache')
+            if has_coalesced_routes:
+                rsrc_modules.append('stone_singleflight')
+            if has_batch_routes:
+                rsrc_modules.append('stone_serializers')
+            self._generate_imports(api.namespaces.values(), rsrc_modules)
             self.emit()
             self.emit()  # PEP-8 expects two-blank lines before class def
-            self.emit('class %s(object):' % self.args.class_name)
+            self._generate_class_decl()
             with self.indent():
-                self.emit('__metaclass__ = ABCMeta')
-                self.emit()
                 self.emit('@abstractmethod')
                 self.emit(
-                    'def request(self, route, namespace, arg, arg_binary=None):')
+                    '{} request(self, route, namespace, arg, arg_binary=None):'
+                    .format(self.def_keyword))
                 with self.indent():
+                    self.emit('"""')
+                    self.emit_wrapped_text(DOCSTRING_REQUEST)
+                    self.emit('"""')
                     self.emit('pass')
                 self.emit()
+                if has_download_routes:
+                    self._generate_iter_body_chunks()
+                if has_batch_routes:
+                    self._generate_request_batch_methods()
+                if has_cached_routes:
+                    self._generate_route_cache_methods()
+                if has_coalesced_routes:
+                    self._generate_single_flight_methods()
                 self._generate_route_methods(api.namespaces.values())
 
-    def _generate_imports(self, namespaces):
+    def _generate_class_decl(self):
+        self.emit('class %s(object):' % self.args.class_name)
+        with self.indent():
+            self.emit('__metaclass__ = ABCMeta')
+            self.emit()
+
+    def _generate_iter_body_chunks(self):
+        """
+        Generates the method that _stream variants of download-style routes
+        use to iterate over the body of a response.
+        """
+        self.emit('def _iter_body_chunks(self, response, chunk_size):')
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Yields the body of a response returned by request() in chunks '
+                'of at most chunk_size bytes, and closes the response once the '
+                'body has been consumed. Override this if request() returns '
+                'something other than a requests.models.Response.')
+            self.emit('"""')
+            self.emit('try:')
+            with self.indent():
+                self.emit('for chunk in response.iter_content(chunk_size):')
+                with self.indent():
+                    self.emit('yield chunk')
+            self.emit('finally:')
+            with self.indent():
+                self.emit('response.close()')
+        self.emit()
+
+    def _generate_imports(self, namespaces, rsrc_modules=()):
         # Only import namespaces that have user-defined types defined.
         ns_names_to_import = [ns.name for ns in namespaces if ns.data_types]
+        ns_names_to_import.extend(rsrc_modules)
         self.emit('from . import (')
         with self.indent():
             for ns in ns_names_to_import:
                 self.emit(ns + ',')
         self.emit(')')
 
+    def _is_batch_route(self, route):
+        """
+        Whether a batch method should be generated for the route. Routes with
+        binary bodies or without an argument are never batched.
+        """
+        return (route.attrs.get('batchable') and
+                route.attrs.get('style') not in ('upload', 'download') and
+                not is_void_type(route.arg_data_type))
+
+    def _is_cached_route(self, route):
+        """
+        Whether results of the route should be cached. Routes with binary
+        bodies or without a result are never cached.
+        """
+        return (route.attrs.get('cache_ttl') and
+                route.attrs.get('style') not in ('upload', 'download') and
+                not is_void_type(route.result_data_type))
+
+    def _is_coalesced_route(self, route):
+        """
+        Whether identical calls to the route that are in flight at the same
+        time may share one request. Routes whose results may be cached are
+        coalesced too. Routes with binary bodies are never coalesced.
+        """
+        return ((route.attrs.get('coalesce') or route.attrs.get('cache_ttl')) and
+                route.attrs.get('style') not in ('upload', 'download'))
+
+    def _generate_single_flight_methods(self):
+        """
+        Generates the methods that enable and disable coalescing of calls to
+        routes with a coalesce or cache_ttl attribute.
+        """
+        self.emit('_single_flight = None')
+        self.emit()
+        self.emit('def enable_single_flight(self, window=None):')
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Makes calls to routes with a coalesce or cache_ttl attribute '
+                'that have the same argument as a call that is in flight wait '
+                'for that call and share its result or exception, rather than '
+                'make another request. If window is set, calls only join a '
+                'call that started less than that many seconds ago. Shared '
+                'results should not be modified.')
+            self.emit('"""')
+            self.emit('self._single_flight = stone_singleflight.{}(window)'
+                      .format(self.single_flight_class))
+        self.emit()
+        self.emit('def disable_single_flight(self):')
+        with self.indent():
+            self.emit('self._single_flight = None')
+        self.emit()
+
+    def _generate_route_cache_methods(self):
+        """
+        Generates the methods that enable, disable and invalidate the cache of
+        results of routes with a cache_ttl attribute.
+        """
+        self.emit('_route_cache = None')
+        self.emit()
+        self.emit('def enable_route_cache(self, max_size=1024):')
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Caches the results of routes with a cache_ttl attribute for '
+                'that many seconds, keyed on the route and its argument. Up '
+                'to max_size results are kept, and the least recently used '
+                'is evicted first. Cached results are shared between calls, '
+                'so they should not be modified.')
+            self.emit('"""')
+            self.emit('self._route_cache = stone_cache.LruCache(max_size)')
+        self.emit()
+        self.emit('def disable_route_cache(self):')
+        with self.indent():
+            self.emit('self._route_cache = None')
+        self.emit()
+        self.emit('def invalidate_route_cache(self, route=None, arg=None):')
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Removes cached results. If route is given, only its results '
+                'are removed, and if arg is also given, only its result for '
+                'that argument.')
+            self.emit('"""')
+            self.emit('if self._route_cache is None:')
+            with self.indent():
+                self.emit('return')
+            self.emit('if route is None:')
+            with self.indent():
+                self.emit('self._route_cache.clear()')
+            self.emit('elif arg is None:')
+            with self.indent():
+                self.emit('self._route_cache.discard_matching(')
+                with self.indent():
+                    self.emit('lambda key: key[0] is route)')
+            self.emit('else:')
+            with self.indent():
+                self.emit('self._route_cache.discard('
+                          'stone_cache.route_cache_key(route, arg))')
+        self.emit()
+
+    def _generate_request_batch_methods(self):
+        """
+        Generates the abstract request_batch() method and a helper that batch
+        route methods use to encode their arguments and decode the response
+        to each one.
+        """
+        self.emit('@abstractmethod')
+        self.emit('{} request_batch(self, route, namespace, args):'.format(
+            self.def_keyword))
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Calls a route once for each argument in args, which are '
+                'JSON-compatible objects. Returns a list with a (success, obj) '
+                'tuple for each call, where obj is the JSON-compatible result '
+                'if success is True and the error otherwise.')
+            self.emit('"""')
+            self.emit('pass')
+        self.emit()
+        self.emit('{} _request_batch_and_decode(self, route, namespace, args):'
+                  .format(self.def_keyword))
+        with self.indent():
+            self.emit('encoded_args = [')
+            with self.indent():
+                self.emit('stone_serializers.json_compat_obj_encode('
+                          'route.arg_type, arg)')
+                self.emit('for arg in args]')
+            self.emit('responses = {}self.request_batch('
+                      'route, namespace, encoded_args)'.format(
+                          self.await_keyword))
+            self.emit('results = []')
+            self.emit('for success, obj in responses:')
+            with self.indent():
+                self.emit('if success:')
+                with self.indent():
+                    self.emit('data_type = route.result_type')
+                self.emit('else:')
+                with self.indent():
+                    self.emit('data_type = route.error_type')
+                self.emit('value = stone_serializers.json_compat_obj_decode(')
+                with self.indent():
+                    self.emit('data_type, obj, strict=False)')
+                self.emit('results.append((success, value))')
+            self.emit('return results')
+        self.emit()
+
     def _generate_route_methods(self, namespaces):
         """Creates methods for the routes in each namespace. All data types
         and routes are represented as Python classes."""
@@ -127,15 +369,58 @@ class PythonClientGenerator(CodeGenerator):
         """Generates Python methods that correspond to a route."""
         self._generate_route_helper(namespace, route)
         if route.attrs.get('style') == 'download':
-            self._generate_route_helper(namespace, route, True)
+            self._generate_route_helper(namespace, route, download_to_file=True)
+            self._generate_route_helper(namespace, route, stream=True)
+        if self._is_batch_route(route):
+            self._generate_route_batch(namespace, route)
+
+    def _generate_route_batch(self, namespace, route):
+        """Generates a Python method that calls a route for a list of
+        arguments with a single call to request_batch()."""
+        self.emit('{} {}_{}_batch(self, args):'.format(
+            self.def_keyword, fmt_func(namespace.name), fmt_func(route.name)))
+        with self.indent():
+            self.emit('"""')
+            self.emit_wrapped_text(
+                'Calls :meth:`{}_{}` once for each argument in args with a '
+                'single call to request_batch().'.format(
+                    fmt_func(namespace.name), fmt_func(route.name)))
+            self.emit()
+            self.emit_wrapped_text(
+                ':param list args: Each a {}.'.format(
+                    self._format_type_in_doc(namespace, route.arg_data_type)),
+                subsequent_prefix='    ')
+            self.emit_wrapped_text(
+                ':return: A (success, value) tuple for each argument, where '
+                'value is a {} if success is True and a {} otherwise.'.format(
+                    self._format_type_in_doc(
+                        namespace, route.result_data_type),
+                    self._format_type_in_doc(
+                        namespace, route.error_data_type)),
+                subsequent_prefix='    ')
+            self.emit(':rtype: list')
+            self.emit('"""')
+            self._maybe_generate_deprecation_warning(route)
+            self.emit('return {}self._request_batch_and_decode('.format(
+                self.await_keyword))
+            with self.indent():
+                self.emit('{}.{},'.format(namespace.name, fmt_var(route.name)))
+                self.emit("'{}',".format(namespace.name))
+                self.emit('args,')
+            self.emit(')')
+        self.emit()
 
-    def _generate_route_helper(self, namespace, route, download_to_file=False):
+    def _generate_route_helper(self, namespace, route, download_to_file=False,
+                               stream=False):
         """Generate a Python method that corresponds to a route.
 
         :param namespace: Namespace that the route belongs to.
         :param bool download_to_file: Whether a special version of the route
             that downloads the response body to a file should be generated.
             This can only be used for download-style routes.
+        :param bool stream: Whether a special version of the route that
+            returns an iterator over the chunks of the response body should be
+            generated. This can only be used for download-style routes.
         """
         arg_data_type = route.arg_data_type
         result_data_type = route.result_data_type
@@ -152,6 +437,15 @@ class PythonClientGenerator(CodeGenerator):
                                              request_binary_body,
                                              method_name_suffix='_to_file',
                                              extra_args=['download_path'])
+        elif stream:
+            assert response_binary_body, 'stream can only be set for ' \
+                'download-style routes.'
+            self._generate_route_method_decl(namespace,
+                                             route,
+                                             arg_data_type,
+                                             request_binary_body,
+                                             method_name_suffix='_stream',
+                                             extra_kwargs=['chunk_size=65536'])
         else:
             self._generate_route_method_decl(namespace,
                                              route,
@@ -165,18 +459,28 @@ class PythonClientGenerator(CodeGenerator):
             if request_binary_body:
                 extra_request_args = [('f',
                                        None,
-                                       'A string or file-like obj of data.')]
+                                       'Bytes, a file-like object or an '
+                                       'iterable of bytes to stream the '
+                                       'data from.')]
             elif download_to_file:
                 extra_request_args = [('download_path',
                                        'str',
                                        'Path on local machine to save file.')]
-            if response_binary_body:
+            elif stream:
+                extra_request_args = [('chunk_size',
+                                       'int',
+                                       'Maximum size in bytes of each chunk '
+                                       'of the body.')]
+            if stream:
+                extra_return_arg = 'iterator of bytes'
+                footer = DOCSTRING_STREAM_RESPONSE
+            elif response_binary_body:
                 extra_return_arg = ':class:`requests.models.Response`'
                 if not download_to_file:
                     footer = DOCSTRING_CLOSE_RESPONSE
 
             if route.doc:
-                func_docstring = self.process_doc(route.doc, self._docf)
+                func_docstring = self.process_doc(route.doc, fmt_doc_ref)
             else:
                 func_docstring = None
 
@@ -207,6 +511,20 @@ class PythonClientGenerator(CodeGenerator):
                 raise AssertionError('Unhandled request type %r' %
                                      arg_data_type)
 
+            cached = (self._is_cached_route(route) and
+                      not download_to_file and not stream)
+            if cached:
+                self.emit('cache_key = None')
+                self.emit('if self._route_cache is not None:')
+                with self.indent():
+                    self.emit('cache_key = stone_cache.route_cache_key('
+                              '{}.{}, arg)'.format(
+                                  namespace.name, fmt_var(route.name)))
+                    self.emit('hit, r = self._route_cache.get(cache_key)')
+                    self.emit('if hit:')
+                    with self.indent():
+                        self.emit('return r')
+
             # Code to make the request
             args = [
                 '{}.{}'.format(namespace.name, fmt_var(route.name)),
@@ -216,14 +534,45 @@ class PythonClientGenerator(CodeGenerator):
                 args.append('f')
             else:
                 args.append('None')
-            self.generate_multiline_list(args, 'r = self.request', compact=False)
+            if self._is_coalesced_route(route) and not (
+                    download_to_file or stream):
+                self.emit('if self._single_flight is not None:')
+                with self.indent():
+                    self.emit('r = {}self._single_flight.call('.format(
+                        self.await_keyword))
+                    with self.indent():
+                        self.emit('stone_cache.route_cache_key({}.{}, arg),'
+                                  .format(namespace.name, fmt_var(route.name)))
+                        self.generate_multiline_list(
+                            args, 'lambda: self.request', after=')',
+                            compact=False)
+                self.emit('else:')
+                with self.indent():
+                    self.generate_multiline_list(
+                        args, 'r = {}self.request'.format(self.await_keyword),
+                        compact=False)
+            else:
+                self.generate_multiline_list(
+                    args, 'r = {}self.request'.format(self.await_keyword),
+                    compact=False)
+            if cached:
+                self.emit('if cache_key is not None:')
+                with self.indent():
+                    self.emit("self._route_cache.put(cache_key, r, {}.{}.attrs["
+                              "'cache_ttl'])".format(
+                                  namespace.name, fmt_var(route.name)))
 
             if download_to_file:
-                self.emit('self._save_body_to_file(download_path, r[1])')
+                self.emit('{}self._save_body_to_file(download_path, r[1])'
+                          .format(self.await_keyword))
                 if is_void_type(result_data_type):
                     self.emit('return None')
                 else:
                     self.emit('return r[0]')
+            elif stream:
+                self.emit('return {}, self._iter_body_chunks(r[1], chunk_size)'
+                          .format('None' if is_void_type(result_data_type)
+                                  else 'r[0]'))
             else:
                 if is_void_type(result_data_type):
                     self.emit('return None')
@@ -233,8 +582,9 @@ class PythonClientGenerator(CodeGenerator):
 
     def _generate_route_method_decl(
             self, namespace, route, arg_data_type, request_binary_body,
-            method_name_suffix=None, extra_args=None):
-        """Generates the method prototype for a route."""
+            method_name_suffix=None, extra_args=None, extra_kwargs=None):
+        """Generates the method prototype for a route. extra_args come
+        before the route's arguments and extra_kwargs after them."""
         method_name = fmt_func(route.name)
         namespace_name = fmt_func(namespace.name)
         if method_name_suffix:
@@ -268,8 +618,11 @@ class PythonClientGenerator(CodeGenerator):
         elif not is_void_type(arg_data_type):
             raise AssertionError('Unhandled request type: %r' %
                                  arg_data_type)
+        if extra_kwargs:
+            args += extra_kwargs
         self.generate_multiline_list(
-            args, 'def {}_{}'.format(namespace_name, method_name), ':')
+            args, '{} {}_{}'.format(self.def_keyword, namespace_name, method_name),
+            ':')
 
     def _maybe_generate_deprecation_warning(self, route):
         if route.deprecated:
@@ -338,12 +691,12 @@ class PythonClientGenerator(CodeGenerator):
                     if field.doc:
                         if is_user_defined_type(field.data_type):
                             field_doc = ':param {}: {}'.format(
-                                field.name, self.process_doc(field.doc, self._docf))
+                                field.name, self.process_doc(field.doc, fmt_doc_ref))
                         else:
                             field_doc = ':param {} {}: {}'.format(
                                 self._format_type_in_doc(namespace, field.data_type),
                                 field.name,
-                                self.process_doc(field.doc, self._docf),
+                                self.process_doc(field.doc, fmt_doc_ref),
                             )
                         self.emit_wrapped_text(
                             field_doc, subsequent_prefix='    ')
@@ -367,7 +720,7 @@ class PythonClientGenerator(CodeGenerator):
             elif is_union_type(arg_data_type):
                 if arg_data_type.doc:
                     self.emit_wrapped_text(':param arg: {}'.format(
-                        self.process_doc(arg_data_type.doc, self._docf)),
+                        self.process_doc(arg_data_type.doc, fmt_doc_ref)),
                         subsequent_prefix='    ')
                 self.emit(':type arg: {}'.format(
                     self._format_type_in_doc(namespace, arg_data_type)))
@@ -412,42 +765,12 @@ class PythonClientGenerator(CodeGenerator):
             self.emit_wrapped_text(footer)
         self.emit('"""')
 
-    def _docf(self, tag, val):
-        """
-        Callback used as the handler argument to process_docs(). This converts
-        Babel doc references to Sphinx-friendly annotations.
-        """
-        if tag == 'type':
-            return ':class:`{}`'.format(val)
-        elif tag == 'route':
-            return ':meth:`{}`'.format(fmt_func(val))
-        elif tag == 'link':
-            anchor, link = val.rsplit(' ', 1)
-            return '`{} <{}>`_'.format(anchor, link)
-        elif tag == 'val':
-            if val == 'null':
-                return 'None'
-            elif val == 'true' or val == 'false':
-                return '``{}``'.format(val.capitalize())
-            else:
-                return val
-        elif tag == 'field':
-            return '``{}``'.format(val)
-        else:
-            raise RuntimeError('Unknown doc ref tag %r' % tag)
-
     def _format_type_in_doc(self, namespace, data_type):
         """
         Returns a string that can be recognized by Sphinx as a type reference
         in a docstring.
         """
-        if is_void_type(data_type):
-            return 'None'
-        elif is_user_defined_type(data_type):
-            return ':class:`dropbox.{}.{}`'.format(
-                namespace.name, fmt_type(data_type))
-        else:
-            return fmt_type(data_type)
+        return fmt_doc_type(data_type, 'dropbox.{}'.format(namespace.name))
 
     def _generate_python_value(self, namespace, value):
         if is_tag_ref(value):
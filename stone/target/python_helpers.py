@@ -14,6 +14,8 @@ from stone.data_type import (
     Timestamp,
     UInt32,
     UInt64,
+    is_user_defined_type,
+    is_void_type,
 )
 from stone.target.helpers import (
     fmt_pascal,
@@ -72,3 +74,43 @@ def fmt_type(data_type):
 def fmt_var(name, check_reserved=False):
     s = fmt_underscores(name)
     return _rename_if_reserved(s) if check_reserved else s
+
+
+def fmt_doc_ref(tag, val):
+    """
+    Callback used as the handler argument to process_doc(). This converts
+    Stone doc references to Sphinx-friendly annotations.
+    """
+    if tag == 'type':
+        return ':class:`{}`'.format(val)
+    elif tag == 'route':
+        return ':meth:`{}`'.format(fmt_func(val))
+    elif tag == 'link':
+        anchor, link = val.rsplit(' ', 1)
+        return '`{} <{}>`_'.format(anchor, link)
+    elif tag == 'val':
+        if val == 'null':
+            return 'None'
+        elif val == 'true' or val == 'false':
+            return '``{}``'.format(val.capitalize())
+        else:
+            return val
+    elif tag == 'field':
+        return '``{}``'.format(val)
+    else:
+        raise RuntimeError('Unknown doc ref tag %r' % tag)
+
+
+def fmt_doc_type(data_type, module=None):
+    """
+    Returns a string that can be recognized by Sphinx as a type reference in a
+    docstring. User-defined types are referenced in module, which defaults to
+    the name of their namespace.
+    """
+    if is_void_type(data_type):
+        return 'None'
+    elif is_user_defined_type(data_type):
+        return ':class:`{}.{}`'.format(
+            module or data_type.namespace.name, fmt_type(data_type))
+    else:
+        return fmt_type(data_type)
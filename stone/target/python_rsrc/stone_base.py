@@ -8,6 +8,10 @@ than being added to a project.
 
 from __future__ import absolute_import, unicode_literals
 
+import operator
+
+import six
+
 try:
     from . import stone_validators as bv
 except (SystemError, ValueError):
@@ -16,6 +20,166 @@ except (SystemError, ValueError):
     import stone_validators as bv  # type: ignore
 
 
+class Struct(object):
+
+    # _lazy_ holds the raw values of fields that have not been decoded yet if
+    # the instance was decoded lazily, and None otherwise.
+    __slots__ = ['_lazy_']
+
+    # Pooling is opt-in per class with enable_pool(). The pool is looked up in
+    # the class's own __dict__ so that subclasses do not share their parent's.
+    _pool_ = None
+    _pool_max_size_ = 0
+
+    @classmethod
+    def from_rows(cls, fields, rows):
+        """
+        Constructs an instance for each row. If pooling is enabled, released
+        instances are reused before new ones are allocated.
+
+        Args:
+            fields (list[str]): Names of the fields that each row has values
+                for, in order.
+            rows: Iterable of sequences of field values. As with the
+                constructor, a value of None leaves the field unset.
+
+        Returns:
+            list: Instances of cls in the same order as rows.
+        """
+        arg_names = _constructor_arg_names(cls)
+        for name in fields:
+            if name not in arg_names:
+                raise AssertionError('%s has no field %r.' % (cls.__name__, name))
+        # Map the constructor's arguments to columns once for all rows.
+        # Arguments after the last one with a column are left out, since they
+        # default to None.
+        positions = [fields.index(name) if name in fields else None
+                     for name in arg_names]
+        while positions and positions[-1] is None:
+            positions.pop()
+        if positions == list(range(len(positions))):
+            # Rows are already in the order of the constructor's arguments.
+            reorder = None
+        elif None not in positions and len(positions) > 1:
+            reorder = operator.itemgetter(*positions)
+        else:
+            def reorder(row):
+                return [None if i is None else row[i] for i in positions]
+
+        pool = cls.__dict__.get('_pool_')
+        init = cls.__init__
+        instances = []
+        for row in rows:
+            if reorder is not None:
+                row = reorder(row)
+            try:
+                ins = None
+                if pool:
+                    try:
+                        ins = pool.pop()
+                    except IndexError:
+                        pass
+                if ins is None:
+                    ins = cls(*row)
+                else:
+                    init(ins, *row)
+            except bv.ValidationError as e:
+                _add_failed_field_parent(cls, arg_names, row, e)
+                raise
+            instances.append(ins)
+        return instances
+
+    def validate(self):
+        """
+        Decodes any fields that have not been decoded yet, including those of
+        nested structs, and checks that all required fields are set.
+
+        Raises:
+            bv.ValidationError
+        """
+        if self._lazy_ is not None:
+            self._lazy_.load_all(self)
+        bv.Struct(type(self)).validate_fields_only(self)
+        for name, _ in self._all_fields_:
+            try:
+                _validate_nested(getattr(self, name))
+            except bv.ValidationError as e:
+                e.add_parent(name)
+                raise
+
+    @classmethod
+    def enable_pool(cls, max_size=1024):
+        """
+        Keeps up to max_size released instances of this class (but not of its
+        subclasses) for reuse by from_rows().
+        """
+        cls._pool_ = []
+        cls._pool_max_size_ = max_size
+
+    @classmethod
+    def disable_pool(cls):
+        cls._pool_ = None
+        cls._pool_max_size_ = 0
+
+    def release(self):
+        """
+        Returns this instance to its class's pool if pooling is enabled. The
+        instance must not be used after it has been released.
+        """
+        cls = type(self)
+        pool = cls.__dict__.get('_pool_')
+        if pool is None or len(pool) >= cls._pool_max_size_:
+            return
+        # Drop references to field values so that pooled instances don't keep
+        # them alive.
+        for name, _ in cls._all_fields_:
+            setattr(self, '_%s_value' % name, None)
+            setattr(self, '_%s_present' % name, False)
+        self._lazy_ = None
+        pool.append(self)
+
+
+def _validate_nested(val):
+    """
+    Validates the structs in val, which may have been decoded lazily.
+    """
+    if isinstance(val, Struct):
+        val.validate()
+    elif isinstance(val, list):
+        for item in val:
+            _validate_nested(item)
+
+
+def _constructor_arg_names(cls):
+    """
+    Returns the names of the arguments of a generated struct's constructor in
+    order. These are the names of all fields, but required fields come first.
+    """
+    code = six.get_function_code(six.get_unbound_function(cls.__init__))
+    return list(code.co_varnames[1:code.co_argcount])
+
+
+def _add_failed_field_parent(cls, arg_names, args, e):
+    """
+    The constructor doesn't report which field failed validation, so find it
+    by validating each argument on its own and add it as the parent of e.
+    """
+    for name, val in zip(arg_names, args):
+        if val is None:
+            continue
+        validator = cls._all_fields_[cls._all_field_indices_[name]][1]
+        if isinstance(validator, bv.Nullable):
+            validator = validator.validator
+        try:
+            if isinstance(validator, (bv.Struct, bv.Union)):
+                validator.validate_type_only(val)
+            else:
+                validator.validate(val)
+        except bv.ValidationError:
+            e.add_parent(name)
+            return
+
+
 class Union(object):
 
     # TODO(kelkabany): Possible optimization is to remove _value if a
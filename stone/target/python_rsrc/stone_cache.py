@@ -0,0 +1,107 @@
+"""
+A cache for the results of routes, used by clients made by the python_client
+generator for routes with a cache_ttl attribute.
+
+This module should be dropped into a project that requires the use of Stone. In
+the future, this could be imported from a pre-installed Python package, rather
+than being added to a project.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import collections
+import json
+import threading
+import time
+
+try:
+    from . import stone_serializers as ss
+    from . import stone_validators as bv
+except (SystemError, ValueError):
+    # Catch errors raised when importing a relative module when not in a package.
+    # This makes testing this file directly (outside of a package) easier.
+    import stone_serializers as ss  # type: ignore
+    import stone_validators as bv  # type: ignore
+
+
+def route_cache_key(route, arg):
+    """
+    Returns a key for the result of a route for an argument. An unset field of
+    a struct argument gets the same key as the field set to its default.
+    """
+    if type(route.arg_type) is bv.Struct:
+        # Raise the same error for a missing required field as encoding the
+        # argument for the request would.
+        route.arg_type.validate(arg)
+        values = []
+        for name, validator in arg._all_fields_:
+            val = getattr(arg, name)
+            values.append(None if val is None else
+                          ss.json_compat_obj_encode(validator, val))
+        return route, json.dumps(values)
+    return route, ss.json_encode(route.arg_type, arg)
+
+
+class LruCache(object):
+    """
+    Maps keys to values that expire after a time-to-live. Once it holds
+    max_size entries, adding another evicts the least recently used one. Safe
+    to use from multiple threads.
+    """
+
+    def __init__(self, max_size=1024, clock=time.time):
+        """
+        Args:
+            max_size (int): Maximum number of entries.
+            clock: Function that returns the current time in seconds.
+        """
+        self.max_size = max_size
+        self._clock = clock
+        # Maps each key to a tuple of the time it expires at and its value,
+        # from least to most recently used.
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns a tuple of whether key has a value that hasn't expired, and
+        the value.
+        """
+        with self._lock:
+            try:
+                expires_at, value = self._entries.pop(key)
+            except KeyError:
+                return False, None
+            if expires_at <= self._clock():
+                return False, None
+            self._entries[key] = expires_at, value
+            return True, value
+
+    def put(self, key, value, ttl):
+        """
+        Sets the value of key for ttl seconds.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = self._clock() + ttl, value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_matching(self, predicate):
+        """
+        Removes the entries whose keys predicate returns true for.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -12,6 +12,7 @@ than being added to a project.
 
 from __future__ import absolute_import, unicode_literals
 
+import array
 import base64
 import collections
 import datetime
@@ -20,10 +21,12 @@ import json
 import six
 
 try:
+    from . import stone_base as bb
     from . import stone_validators as bv
 except (SystemError, ValueError):
     # Catch errors raised when importing a relative module when not in a package.
     # This makes testing this file directly (outside of a package) easier.
+    import stone_base as bb  # type: ignore
     import stone_validators as bv  # type: ignore
 
 
@@ -274,14 +277,10 @@ def _encode_struct_tree(
 
     See json_encode() for other argument descriptions.
     """
-    assert type(obj) in data_type.definition._pytype_to_tag_and_subtype_, (
-        '%r is not a serializable subtype of %r.' %
-        (type(obj), data_type.definition))
-    tags, subtype = data_type.definition._pytype_to_tag_and_subtype_[type(obj)]
-    assert len(tags) == 1, tags
-    assert not isinstance(subtype, bv.StructTree), (
-        'Cannot serialize type %r because it enumerates subtypes.' %
-        subtype.definition)
+    try:
+        tags, subtype = data_type.pytype_to_tag_and_subtype_cache[type(obj)]
+    except KeyError:
+        tags, subtype = _resolve_struct_tree_subtype(data_type, type(obj))
     if old_style:
         return {
             tags[0]:
@@ -295,6 +294,28 @@ def _encode_struct_tree(
     return d
 
 
+def _resolve_struct_tree_subtype(data_type, pytype):
+    """
+    Finds the entry of the nearest generated class in the MRO of pytype in
+    the _pytype_to_tag_and_subtype_ of the StructTree data_type, and caches
+    it for pytype.
+    """
+    pytype_to_tag_and_subtype = data_type.definition._pytype_to_tag_and_subtype_
+    for cls in pytype.__mro__:
+        if cls in pytype_to_tag_and_subtype:
+            break
+    else:
+        raise AssertionError('%r is not a serializable subtype of %r.' %
+                             (pytype, data_type.definition))
+    tags, subtype = pytype_to_tag_and_subtype[cls]
+    assert len(tags) == 1, tags
+    assert not isinstance(subtype, bv.StructTree), (
+        'Cannot serialize type %r because it enumerates subtypes.' %
+        subtype.definition)
+    data_type.pytype_to_tag_and_subtype_cache[pytype] = (tags, subtype)
+    return tags, subtype
+
+
 def _make_json_friendly(data_type, val, alias_validators, for_msgpack):
     """
     Convert a primitive type to a Python type that can be serialized by the
@@ -324,7 +345,7 @@ def _make_json_friendly(data_type, val, alias_validators, for_msgpack):
 
 def json_decode(
         data_type, serialized_obj, alias_validators=None, strict=True,
-        old_style=False):
+        old_style=False, lazy=False):
     """Performs the reverse operation of json_encode.
 
     Args:
@@ -339,6 +360,11 @@ def json_decode(
             recipient of serialized JSON if it's guaranteed that its Stone
             specs are at least as recent as the senders it receives messages
             from.
+        lazy (bool): If true, the fields of structs are only decoded when they
+            are first accessed. Unknown fields and missing required fields
+            are still detected up front, but other validation errors are
+            raised on access. Call the validate() method of a struct to
+            decode and validate all of its fields.
 
     Returns:
         The returned object depends on the input data_type.
@@ -359,12 +385,13 @@ def json_decode(
         raise bv.ValidationError('could not decode input as JSON')
     else:
         return json_compat_obj_decode(
-            data_type, deserialized_obj, alias_validators, strict, old_style)
+            data_type, deserialized_obj, alias_validators, strict, old_style,
+            lazy=lazy)
 
 
 def json_compat_obj_decode(
         data_type, obj, alias_validators=None, strict=True, old_style=False,
-        for_msgpack=False):
+        for_msgpack=False, lazy=False):
     """
     Decodes a JSON-compatible object based on its data type into a
     representative Python object.
@@ -375,11 +402,16 @@ def json_compat_obj_decode(
         strict (bool): If strict, then unknown struct fields will raise an
             error, and unknown union variants will raise an error even if a
             catch all field is specified. See json_decode() for more.
+        lazy (bool): If true, the fields of structs are only decoded when they
+            are first accessed. See json_decode() for more.
 
     Returns:
         See json_decode().
     """
-    if isinstance(data_type, bv.Primitive):
+    if lazy:
+        return _decode_lazy(
+            data_type, obj, alias_validators, strict, old_style, for_msgpack)
+    elif isinstance(data_type, bv.Primitive):
         return _make_stone_friendly(
             data_type, obj, alias_validators, strict, True, for_msgpack)
     else:
@@ -428,14 +460,7 @@ def _decode_struct(
     """
     if obj is None and data_type.has_default():
         return data_type.get_default()
-    elif not isinstance(obj, dict):
-        raise bv.ValidationError('expected object, got %s' %
-                                 bv.generic_type_name(obj))
-    if strict:
-        for key in obj:
-            if (key not in data_type.definition._all_field_names_ and
-                    not key.startswith('.tag')):
-                raise bv.ValidationError("unknown field '%s'" % key)
+    _check_struct_obj(data_type, obj, strict)
     ins = data_type.definition()
     _decode_struct_fields(
         ins, data_type.definition._all_fields_, obj, alias_validators, strict,
@@ -445,6 +470,21 @@ def _decode_struct(
     return ins
 
 
+def _check_struct_obj(data_type, obj, strict):
+    """
+    Checks that obj is a JSON-compatible dict that can be decoded as a struct
+    of the given data type. In strict mode, obj may not have unknown fields.
+    """
+    if not isinstance(obj, dict):
+        raise bv.ValidationError('expected object, got %s' %
+                                 bv.generic_type_name(obj))
+    if strict:
+        unknown_keys = six.viewkeys(obj) - data_type.definition._all_field_names_
+        for key in unknown_keys:
+            if not key.startswith('.tag'):
+                raise bv.ValidationError("unknown field '%s'" % key)
+
+
 def _decode_struct_fields(
         ins, fields, obj, alias_validators, strict, old_style, for_msgpack):
     """
@@ -512,66 +552,113 @@ def _decode_union_dict(data_type, obj, alias_validators, strict, for_msgpack):
         raise bv.ValidationError(
             'tag must be string, got %s' % bv.generic_type_name(tag))
 
-    if tag not in data_type.definition._tagmap:
+    handlers = data_type.decode_tag_handlers
+    if handlers is None:
+        handlers = _make_union_tag_handlers(data_type.definition)
+        data_type.decode_tag_handlers = handlers
+    try:
+        handler = handlers[tag]
+    except KeyError:
         if not strict and data_type.definition._catch_all:
             return data_type.definition._catch_all, None
         else:
             raise bv.ValidationError("unknown tag '%s'" % tag)
-    if tag == data_type.definition._catch_all:
-        raise bv.ValidationError(
-            "unexpected use of the catch-all tag '%s'" % tag)
+    return tag, handler(tag, obj, alias_validators, strict, for_msgpack)
 
-    val_data_type = data_type.definition._tagmap[tag]
-    if isinstance(val_data_type, bv.Nullable):
-        val_data_type = val_data_type.validator
-        nullable = True
-    else:
-        nullable = False
 
-    if isinstance(val_data_type, bv.Void):
-        if tag in obj:
-            if obj[tag] is not None:
-                raise bv.ValidationError('expected null, got %s' %
-                                         bv.generic_type_name(obj[tag]))
-        for key in obj:
-            if key != tag and key != '.tag':
-                raise bv.ValidationError("unexpected key '%s'" % key)
-        val = None
-    elif isinstance(val_data_type,
-                    (bv.Primitive, bv.List, bv.StructTree, bv.Union)):
-        if tag in obj:
-            raw_val = obj[tag]
-            try:
-                val = _json_compat_obj_decode_helper(
-                    val_data_type, raw_val, alias_validators, strict, False, for_msgpack)
-            except bv.ValidationError as e:
-                e.add_parent(tag)
-                raise
+def _make_union_tag_handlers(definition):
+    """
+    Returns a dict mapping each tag of a union to a function that decodes its
+    value from the JSON-compatible dict of the union. Each function takes the
+    tag, the dict, and the alias_validators, strict and for_msgpack arguments
+    of json_compat_obj_decode().
+    """
+    handlers = {}
+    for tag, val_data_type in definition._tagmap.items():
+        if isinstance(val_data_type, bv.Nullable):
+            val_data_type = val_data_type.validator
+            nullable = True
         else:
-            # Check no other keys
-            if nullable:
-                val = None
-            else:
-                raise bv.ValidationError("missing '%s' key" % tag)
+            nullable = False
+
+        if tag == definition._catch_all:
+            handler = _decode_union_catch_all
+        elif isinstance(val_data_type, bv.Void):
+            handler = _decode_union_void
+        elif isinstance(val_data_type,
+                        (bv.Primitive, bv.List, bv.StructTree, bv.Union)):
+            handler = functools.partial(
+                _decode_union_value, val_data_type, nullable)
+        elif isinstance(val_data_type, bv.Struct):
+            handler = functools.partial(
+                _decode_union_struct, val_data_type, nullable)
+        else:
+            assert False, type(val_data_type)
+        handlers[tag] = handler
+    return handlers
+
+
+def _check_union_dict_keys(tag, obj):
+    """
+    Checks that obj has no keys other than '.tag' and tag.
+    """
+    if len(obj) > (2 if tag in obj else 1):
         for key in obj:
             if key != tag and key != '.tag':
                 raise bv.ValidationError("unexpected key '%s'" % key)
-    elif isinstance(val_data_type, bv.Struct):
-        if nullable and len(obj) == 1:  # only has a .tag key
-            val = None
-        else:
-            # assume it's not null
-            raw_val = obj
-            try:
-                val = _json_compat_obj_decode_helper(
-                    val_data_type, raw_val, alias_validators, strict, False,
-                    for_msgpack)
-            except bv.ValidationError as e:
-                e.add_parent(tag)
-                raise
+
+
+def _decode_union_catch_all(tag, obj, alias_validators, strict, for_msgpack):
+    raise bv.ValidationError(
+        "unexpected use of the catch-all tag '%s'" % tag)
+
+
+def _decode_union_void(tag, obj, alias_validators, strict, for_msgpack):
+    if obj.get(tag) is not None:
+        raise bv.ValidationError('expected null, got %s' %
+                                 bv.generic_type_name(obj[tag]))
+    _check_union_dict_keys(tag, obj)
+    return None
+
+
+def _decode_union_value(
+        val_data_type, nullable, tag, obj, alias_validators, strict,
+        for_msgpack):
+    """
+    Decodes the value of a tag whose type is not a struct, which is stored
+    under the tag's key.
+    """
+    if tag in obj:
+        try:
+            val = _json_compat_obj_decode_helper(
+                val_data_type, obj[tag], alias_validators, strict, False,
+                for_msgpack)
+        except bv.ValidationError as e:
+            e.add_parent(tag)
+            raise
+    elif nullable:
+        val = None
     else:
-        assert False, type(val_data_type)
-    return tag, val
+        raise bv.ValidationError("missing '%s' key" % tag)
+    _check_union_dict_keys(tag, obj)
+    return val
+
+
+def _decode_union_struct(
+        val_data_type, nullable, tag, obj, alias_validators, strict,
+        for_msgpack):
+    """
+    Decodes the value of a tag whose type is a struct, which has its fields
+    inlined in the union's dict.
+    """
+    if nullable and len(obj) == 1:  # only has a .tag key
+        return None
+    try:
+        return _json_compat_obj_decode_helper(
+            val_data_type, obj, alias_validators, strict, False, for_msgpack)
+    except bv.ValidationError as e:
+        e.add_parent(tag)
+        raise
 
 
 def _decode_union_old(data_type, obj, alias_validators, strict, for_msgpack):
@@ -687,6 +774,12 @@ def _decode_list(
     if not isinstance(obj, list):
         raise bv.ValidationError(
             'expected list, got %s' % bv.generic_type_name(obj))
+    item_validator = data_type.item_validator
+    if (type(item_validator) is bv.Struct and
+            hasattr(item_validator.definition, 'from_rows')):
+        return _decode_struct_list(
+            item_validator, obj, alias_validators, strict, old_style,
+            for_msgpack)
     return [
         _json_compat_obj_decode_helper(
             data_type.item_validator, item, alias_validators, strict,
@@ -694,6 +787,165 @@ def _decode_list(
         for item in obj]
 
 
+def _decode_struct_list(
+        data_type, obj, alias_validators, strict, old_style, for_msgpack):
+    """
+    Decodes a list of JSON-compatible dicts into instances of the definition
+    of the data_type argument, which must be a Struct. The field values of
+    every item are decoded first so that all instances can be constructed
+    with a single call to the definition's from_rows().
+    See json_compat_obj_decode() for argument descriptions.
+    """
+    definition = data_type.definition
+    # Decode the values of each row in the order of the constructor's
+    # arguments, so that from_rows() doesn't need to reorder them.
+    arg_names = bb._constructor_arg_names(definition)
+    columns = [definition._all_fields_[definition._all_field_indices_[name]]
+               for name in arg_names]
+    rows = []
+    for item in obj:
+        if item is None and data_type.has_default():
+            # Equivalent to the default instance since no field is set.
+            rows.append([None] * len(columns))
+            continue
+        _check_struct_obj(data_type, item, strict)
+        row = []
+        for name, field_data_type in columns:
+            if name in item:
+                try:
+                    v = _json_compat_obj_decode_helper(
+                        field_data_type, item[name], alias_validators, strict,
+                        old_style, for_msgpack)
+                except bv.ValidationError as e:
+                    e.add_parent(name)
+                    raise
+            elif field_data_type.has_default():
+                v = field_data_type.get_default()
+            else:
+                v = None
+            row.append(v)
+        rows.append(row)
+    instances = definition.from_rows(arg_names, rows)
+    # Check that all required fields have been set.
+    for ins in instances:
+        data_type.validate_fields_only(ins)
+    return instances
+
+
+def _decode_lazy(
+        data_type, obj, alias_validators, strict, old_style, for_msgpack):
+    """
+    Decodes structs, including those in lists and nullables, lazily, and
+    everything else eagerly.
+    See json_compat_obj_decode() for argument descriptions.
+    """
+    if isinstance(data_type, bv.StructTree):
+        subtype = _determine_struct_tree_subtype(data_type, obj, strict)
+        return _decode_struct_lazy(
+            subtype, obj, alias_validators, strict, False, for_msgpack)
+    elif isinstance(data_type, bv.Struct):
+        return _decode_struct_lazy(
+            data_type, obj, alias_validators, strict, old_style, for_msgpack)
+    elif (isinstance(data_type, bv.List) and
+            isinstance(data_type.item_validator, bv.Struct)):
+        if not isinstance(obj, list):
+            raise bv.ValidationError(
+                'expected list, got %s' % bv.generic_type_name(obj))
+        return [
+            _decode_lazy(
+                data_type.item_validator, item, alias_validators, strict,
+                old_style, for_msgpack)
+            for item in obj]
+    elif (isinstance(data_type, bv.Nullable) and
+            isinstance(data_type.validator, bv.Struct)):
+        if obj is None:
+            return None
+        return _decode_lazy(
+            data_type.validator, obj, alias_validators, strict, old_style,
+            for_msgpack)
+    else:
+        return json_compat_obj_decode(
+            data_type, obj, alias_validators, strict, old_style, for_msgpack)
+
+
+def _decode_struct_lazy(
+        data_type, obj, alias_validators, strict, old_style, for_msgpack):
+    """
+    Like _decode_struct(), but only checks for unknown and missing required
+    fields. The raw values of the fields are decoded on first access.
+    """
+    if obj is None and data_type.has_default():
+        return data_type.get_default()
+    _check_struct_obj(data_type, obj, strict)
+    ins = data_type.definition()
+    raw = {}
+    for name, field_data_type in data_type.definition._all_fields_:
+        nullable = isinstance(field_data_type, bv.Nullable)
+        val = obj.get(name)
+        if val is not None or (name in obj and not nullable):
+            raw[name] = val
+        elif nullable:
+            continue
+        elif field_data_type.has_default():
+            setattr(ins, name, field_data_type.get_default())
+        elif not hasattr(ins, name):
+            raise bv.ValidationError("missing required field '%s'" % name)
+    if raw:
+        ins._lazy_ = _LazyFields(
+            data_type.definition, raw, alias_validators, strict, old_style,
+            for_msgpack)
+    return ins
+
+
+class _LazyFields(object):
+    """
+    The raw values of the fields of a lazily decoded struct that have not been
+    accessed yet, and the arguments to decode them with.
+    """
+
+    __slots__ = ['definition', 'raw', 'alias_validators', 'strict',
+                 'old_style', 'for_msgpack']
+
+    def __init__(self, definition, raw, alias_validators, strict, old_style,
+                 for_msgpack):
+        self.definition = definition
+        self.raw = raw
+        self.alias_validators = alias_validators
+        self.strict = strict
+        self.old_style = old_style
+        self.for_msgpack = for_msgpack
+
+    def load(self, ins, name):
+        """
+        Decodes the raw value of a field and assigns it to ins.
+
+        Returns:
+            bool: False if there is no raw value for the field.
+        """
+        if name not in self.raw:
+            return False
+        definition = self.definition
+        field_data_type = definition._all_fields_[
+            definition._all_field_indices_[name]][1]
+        try:
+            v = _decode_lazy(
+                field_data_type, self.raw[name], self.alias_validators,
+                self.strict, self.old_style, self.for_msgpack)
+            setattr(ins, name, v)
+        except bv.ValidationError as e:
+            e.add_parent(name)
+            raise
+        self.raw.pop(name, None)
+        return True
+
+    def load_all(self, ins):
+        for name in list(self.raw):
+            self.load(ins, name)
+
+    def discard(self, name):
+        self.raw.pop(name, None)
+
+
 def _decode_nullable(
         data_type, obj, alias_validators, strict, old_style, for_msgpack):
     """
@@ -745,6 +997,239 @@ def _make_stone_friendly(
         alias_validators[data_type](ret)
     return ret
 
+# --------------------------------------------------------------
+# Columnar Decoder
+
+class StructColumns(object):
+    """
+    The fields of a list of structs stored column by column.
+
+    Attributes:
+        definition (class): The class representing the struct.
+        fields (list[str]): The names of all fields of the struct.
+        values (dict): Maps each field name to a column with one value per
+            struct. Booleans and numbers are stored in an array.array, other
+            values in a list. If the field has no value, the column holds 0,
+            False or None.
+        present (dict): Maps the name of each field that may have no value
+            (nullable without a default) to an array.array of 1s and 0s
+            indicating whether the corresponding value is present.
+    """
+
+    __slots__ = ['definition', 'fields', 'values', 'present', '_size']
+
+    def __init__(self, definition, fields, values, present, size):
+        self.definition = definition
+        self.fields = fields
+        self.values = values
+        self.present = present
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def __repr__(self):
+        return 'StructColumns(%s, %d rows)' % (
+            self.definition.__name__, self._size)
+
+
+def json_decode_columns(
+        data_type, serialized_obj, alias_validators=None, strict=True,
+        old_style=False, use_numpy=False):
+    """Decodes a JSON array of structs into columns.
+
+    Args:
+        data_type (List): Validator for serialized_obj. Its item validator must
+            be a Struct without enumerated subtypes.
+        serialized_obj (str): The JSON string to deserialize.
+        use_numpy (bool): See json_compat_obj_decode_columns().
+        See json_decode() for the remaining arguments.
+
+    Returns:
+        StructColumns
+    """
+    try:
+        deserialized_obj = json.loads(serialized_obj)
+    except ValueError:
+        raise bv.ValidationError('could not decode input as JSON')
+    else:
+        return json_compat_obj_decode_columns(
+            data_type, deserialized_obj, alias_validators, strict, old_style,
+            use_numpy=use_numpy)
+
+
+def json_compat_obj_decode_columns(
+        data_type, obj, alias_validators=None, strict=True, old_style=False,
+        for_msgpack=False, use_numpy=False):
+    """
+    Decodes a JSON-compatible list of structs into one column per field rather
+    than an instance per struct. Values are validated as they would be by
+    json_compat_obj_decode().
+
+    Args:
+        data_type (List): Validator for obj. Its item validator must be a
+            Struct without enumerated subtypes.
+        obj: The JSON-compatible list to decode.
+        use_numpy (bool): If true, return NumPy arrays instead of array.array
+            for boolean, numeric and timestamp columns and presence masks.
+            Requires NumPy to be installed.
+        See json_compat_obj_decode() for the remaining arguments.
+
+    Returns:
+        StructColumns
+    """
+    assert isinstance(data_type, bv.List), \
+        'Columnar decoding requires a List, got %r.' % data_type
+    struct_type = data_type.item_validator
+    assert type(struct_type) is bv.Struct, \
+        'Columnar decoding requires a list of structs without enumerated ' \
+        'subtypes, got %r.' % struct_type
+    if not isinstance(obj, list):
+        raise bv.ValidationError(
+            'expected list, got %s' % bv.generic_type_name(obj))
+
+    definition = struct_type.definition
+    # A blank instance returns the default of each field, or raises
+    # AttributeError if the field is required.
+    blank = definition()
+    columns = []
+    for name, field_data_type in definition._all_fields_:
+        column = _ColumnDecoder(name, field_data_type)
+        try:
+            column.default = getattr(blank, name)
+        except AttributeError:
+            column.required = True
+        if column.default is None and not column.required:
+            column.present = array.array(str('b'))
+        columns.append(column)
+
+    for item in obj:
+        if item is None and struct_type.has_default():
+            item = {}
+        _check_struct_obj(struct_type, item, strict)
+        for column in columns:
+            column.decode(item, alias_validators, strict, old_style,
+                          for_msgpack)
+
+    values = {}
+    present = {}
+    for column in columns:
+        if use_numpy:
+            column.to_numpy()
+        values[column.name] = column.values
+        if column.present is not None:
+            present[column.name] = column.present
+    return StructColumns(
+        definition, [column.name for column in columns], values, present,
+        len(obj))
+
+
+def _array_typecode(data_type):
+    """
+    Returns the typecode of the smallest array.array that can hold every value
+    of data_type, or None if the values should be kept in a list.
+    """
+    if isinstance(data_type, bv.Boolean):
+        return 'b'
+    elif isinstance(data_type, bv.Float32):
+        return 'f'
+    elif isinstance(data_type, bv.Float64):
+        return 'd'
+    elif isinstance(data_type, bv.Integer):
+        signed = data_type.minimum < 0
+        for typecode in ('bhilq' if signed else 'BHILQ'):
+            try:
+                bits = array.array(str(typecode)).itemsize * 8
+            except ValueError:
+                # 'q' and 'Q' are only available in Python 3.3+.
+                continue
+            if signed:
+                fits = (-2**(bits - 1) <= data_type.minimum and
+                        data_type.maximum < 2**(bits - 1))
+            else:
+                fits = data_type.maximum < 2**bits
+            if fits:
+                return typecode
+    return None
+
+
+class _ColumnDecoder(object):
+    """
+    Decodes the values of one field of a list of structs into a column.
+    """
+
+    def __init__(self, name, data_type):
+        self.name = name
+        self.data_type = data_type
+        if isinstance(data_type, bv.Nullable):
+            data_type = data_type.validator
+        self.nullable = self.data_type is not data_type
+        self.value_type = data_type
+        # Struct fields that are not set but have no required fields of their
+        # own are given a blank instance, like json_compat_obj_decode() does.
+        self.struct_default = (
+            not self.nullable and isinstance(data_type, bv.Struct) and
+            data_type.has_default())
+        self.required = False
+        self.default = None
+        self.present = None
+        typecode = _array_typecode(data_type)
+        if typecode is None:
+            self.values = []
+            self.missing = None
+        else:
+            self.values = array.array(str(typecode))
+            self.missing = False if typecode == 'b' else 0
+
+    def decode(self, item, alias_validators, strict, old_style, for_msgpack):
+        name = self.name
+        val = item.get(name)
+        if val is not None or (name in item and not self.nullable):
+            data_type = self.value_type
+            try:
+                if isinstance(data_type, bv.Primitive):
+                    v = _make_stone_friendly(
+                        data_type, val, alias_validators, strict, True,
+                        for_msgpack)
+                else:
+                    v = _json_compat_obj_decode_helper(
+                        data_type, val, alias_validators, strict, old_style,
+                        for_msgpack)
+                    if isinstance(data_type, bv.List):
+                        # The items of lists are validated on assignment to a
+                        # struct, which is skipped here.
+                        data_type.validate(v)
+            except bv.ValidationError as e:
+                e.add_parent(name)
+                raise
+            self.values.append(v)
+            if self.present is not None:
+                self.present.append(1)
+        elif self.struct_default:
+            self.values.append(self.value_type.get_default())
+        elif self.required:
+            raise bv.ValidationError("missing required field '%s'" % name)
+        elif self.present is not None:
+            self.values.append(self.missing)
+            self.present.append(0)
+        else:
+            self.values.append(self.default)
+
+    def to_numpy(self):
+        import numpy
+        if isinstance(self.values, array.array):
+            if self.values.typecode == 'b':
+                dtype = numpy.bool_
+            else:
+                dtype = numpy.dtype(str(self.values.typecode))
+            self.values = numpy.array(self.values, dtype=dtype)
+        elif isinstance(self.value_type, bv.Timestamp):
+            # Missing timestamps become NaT.
+            self.values = numpy.array(self.values, dtype='datetime64[us]')
+        if self.present is not None:
+            self.present = numpy.array(self.present, dtype=numpy.bool_)
+
+
 try:
     import msgpack
 except ImportError:
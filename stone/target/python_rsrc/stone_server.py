@@ -0,0 +1,202 @@
+"""
+Dispatches requests to the routes of a server made by the python_server
+generator.
+
+It implements the server side of the RPC conventions described in the Network
+Protocol doc: each route is a POST to /<namespace>/<route> with a JSON body,
+and a response with status 409 holds an error of the route's error type. To
+serve routes, implement the abstract methods of the generated class and wrap
+an instance in a Dispatcher:
+
+    class Server(server.Base):
+        def files_get_metadata(self, arg):
+            ...
+
+    app = stone_server.WsgiApp(
+        stone_server.Dispatcher(server.ROUTES, Server()))
+
+The dispatcher looks up each route's handler, decoder and encoders once, so a
+request only costs a dict lookup before the handler is called. Only RPC-style
+routes, whose request and response bodies are JSON, are supported.
+
+This module should be dropped into a project that requires the use of Stone. In
+the future, this could be imported from a pre-installed Python package, rather
+than being added to a project.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import functools
+import json
+
+import six
+
+try:
+    from . import stone_serializers as ss
+    from . import stone_validators as bv
+except (SystemError, ValueError):
+    # Catch errors raised when importing a relative module when not in a package.
+    # This makes testing this file directly (outside of a package) easier.
+    import stone_serializers as ss  # type: ignore
+    import stone_validators as bv  # type: ignore
+
+_JSON_CONTENT_TYPE = 'application/json'
+_TEXT_CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+
+class RouteError(Exception):
+    """
+    Raise this from a handler to respond with an error of the route's error
+    type.
+    """
+
+    def __init__(self, error):
+        super(RouteError, self).__init__(error)
+        self.error = error
+
+
+class _RouteEntry(object):
+    """
+    A route's handler along with the functions that decode its argument and
+    encode its result and error, bound to the route's data types.
+    """
+
+    __slots__ = ['route', 'handler', 'decode_arg', 'encode_result',
+                 'encode_error']
+
+    def __init__(self, route, handler, strict):
+        self.route = route
+        self.handler = handler
+        if isinstance(route.arg_type, bv.Void):
+            self.decode_arg = _decode_void
+        else:
+            self.decode_arg = functools.partial(
+                _decode_json, route.arg_type, strict)
+        self.encode_result = _make_encoder(route.result_type)
+        self.encode_error = _make_encoder(route.error_type)
+
+
+def _decode_void(body):
+    return None
+
+
+def _decode_json(data_type, strict, body):
+    try:
+        obj = json.loads(body.decode('utf-8'))
+    except ValueError:
+        raise bv.ValidationError('could not decode input as JSON')
+    return ss.json_compat_obj_decode(data_type, obj, strict=strict)
+
+
+def _make_encoder(data_type):
+    if isinstance(data_type, bv.Void):
+        return lambda obj: b'null'
+    return lambda obj: ss.json_encode(data_type, obj).encode('utf-8')
+
+
+class Dispatcher(object):
+    """
+    Maps the path of each route to its handler.
+    """
+
+    def __init__(self, routes, impl, strict=True):
+        """
+        Args:
+            routes (dict): The ROUTES table of a module made by the
+                python_server generator.
+            impl: An instance of a subclass of the generated class whose
+                methods handle the routes.
+            strict (bool): Whether unknown struct fields and union tags in
+                arguments are rejected. See stone_serializers.json_decode().
+        """
+        self._table = {}
+        for path, (route, method_name) in six.iteritems(routes):
+            self._table[path] = _RouteEntry(
+                route, getattr(impl, method_name), strict)
+
+    def lookup(self, path):
+        """
+        Returns the entry of the route at path, which must not have a leading
+        slash, or None if there is no such route.
+        """
+        return self._table.get(path)
+
+    def dispatch(self, path, body):
+        """
+        Calls the handler of the route at path with the decoded body.
+
+        Args:
+            path (str): "<namespace>/<route>" without a leading slash.
+            body (bytes): The JSON-encoded argument.
+
+        Returns:
+            A tuple of the HTTP status, content type and body of the response.
+        """
+        entry = self._table.get(path)
+        if entry is None:
+            return _not_found(path)
+        try:
+            arg = entry.decode_arg(body)
+        except bv.ValidationError as e:
+            return _bad_request(e)
+        try:
+            result = entry.handler(arg)
+        except RouteError as e:
+            return 409, _JSON_CONTENT_TYPE, entry.encode_error(e.error)
+        return 200, _JSON_CONTENT_TYPE, entry.encode_result(result)
+
+
+def _not_found(path):
+    return 404, _TEXT_CONTENT_TYPE, (
+        'Unknown route: %s' % path).encode('utf-8')
+
+
+def _bad_request(e):
+    return 400, _TEXT_CONTENT_TYPE, (
+        'Invalid argument: %s' % e).encode('utf-8')
+
+
+_STATUS_LINES = {
+    200: '200 OK',
+    400: '400 Bad Request',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+    409: '409 Conflict',
+}
+
+
+class WsgiApp(object):
+    """
+    A WSGI application that serves the routes of a Dispatcher.
+    """
+
+    def __init__(self, dispatcher, path_prefix=''):
+        """
+        Args:
+            dispatcher (Dispatcher)
+            path_prefix (str): Prefix of the path of every route, for example
+                "/2".
+        """
+        self.dispatcher = dispatcher
+        self.path_prefix = path_prefix.rstrip('/') + '/'
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.path_prefix):
+            status, content_type, body = _not_found(path)
+        elif environ['REQUEST_METHOD'] != 'POST':
+            status, content_type, body = (
+                405, _TEXT_CONTENT_TYPE, b'Routes only accept POST.')
+        else:
+            try:
+                length = int(environ.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                length = 0
+            status, content_type, body = self.dispatcher.dispatch(
+                path[len(self.path_prefix):],
+                environ['wsgi.input'].read(length))
+        start_response(_STATUS_LINES[status], [
+            (str('Content-Type'), str(content_type)),
+            (str('Content-Length'), str(len(body))),
+        ])
+        return [body]
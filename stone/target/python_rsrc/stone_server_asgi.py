@@ -0,0 +1,93 @@
+"""
+An ASGI adapter for the Dispatcher in stone_server.py. Handlers may be plain
+methods or coroutines:
+
+    app = stone_server_asgi.AsgiApp(
+        stone_server.Dispatcher(server.ROUTES, Server()))
+
+This module requires Python 3.5+, so it's kept separate from stone_server.py.
+
+This module should be dropped into a project that requires the use of Stone. In
+the future, this could be imported from a pre-installed Python package, rather
+than being added to a project.
+"""
+
+import inspect
+
+try:
+    from . import stone_server
+    from . import stone_validators as bv
+except (ImportError, SystemError, ValueError):
+    # Catch errors raised when importing a relative module when not in a package.
+    # This makes testing this file directly (outside of a package) easier.
+    import stone_server  # type: ignore
+    import stone_validators as bv  # type: ignore
+
+
+class AsgiApp:
+    """
+    An ASGI application that serves the routes of a stone_server.Dispatcher.
+    """
+
+    def __init__(self, dispatcher, path_prefix=''):
+        """
+        Args:
+            dispatcher (stone_server.Dispatcher)
+            path_prefix (str): Prefix of the path of every route, for example
+                "/2".
+        """
+        self.dispatcher = dispatcher
+        self.path_prefix = path_prefix.rstrip('/') + '/'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        path = scope['path']
+        if not path.startswith(self.path_prefix):
+            status, content_type, body = stone_server._not_found(path)
+        elif scope['method'] != 'POST':
+            status, content_type, body = (
+                405, stone_server._TEXT_CONTENT_TYPE,
+                b'Routes only accept POST.')
+        else:
+            status, content_type, body = await self._dispatch(
+                path[len(self.path_prefix):], await self._read_body(receive))
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode('ascii')),
+                (b'content-length', str(len(body)).encode('ascii')),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _dispatch(self, path, body):
+        """
+        Same as stone_server.Dispatcher.dispatch(), but awaits the result of
+        handlers that are coroutines.
+        """
+        entry = self.dispatcher.lookup(path)
+        if entry is None:
+            return stone_server._not_found(path)
+        try:
+            arg = entry.decode_arg(body)
+        except bv.ValidationError as e:
+            return stone_server._bad_request(e)
+        try:
+            result = entry.handler(arg)
+            if inspect.isawaitable(result):
+                result = await result
+        except stone_server.RouteError as e:
+            return (409, stone_server._JSON_CONTENT_TYPE,
+                    entry.encode_error(e.error))
+        return 200, stone_server._JSON_CONTENT_TYPE, entry.encode_result(result)
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
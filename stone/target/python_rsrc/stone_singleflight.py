@@ -0,0 +1,123 @@
+"""
+Coalesces identical calls that are in flight at the same time, so that one of
+them does the work and the rest share its result. Used by clients made by the
+python_client and python_async_client generators for routes with a coalesce
+or cache_ttl attribute.
+
+This module should be dropped into a project that requires the use of Stone. In
+the future, this could be imported from a pre-installed Python package, rather
+than being added to a project.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import threading
+import time
+
+
+class _Flight(object):
+
+    __slots__ = ['started_at', 'done', 'result', 'error']
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesces calls from multiple threads. Safe to use from multiple threads.
+    """
+
+    def __init__(self, window=None, clock=time.time):
+        """
+        Args:
+            window (float): If set, a call only joins a call in flight with
+                the same key that started less than this many seconds ago.
+                Otherwise it starts its own.
+            clock: Function that returns the current time in seconds.
+        """
+        self.window = window
+        self._clock = clock
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, fn):
+        """
+        Returns the result of fn(), or of the call in flight with the same
+        key, which must be hashable. If that call raises an exception, the
+        same exception is raised to every caller that joined it.
+        """
+        with self._lock:
+            now = self._clock()
+            flight = self._flights.get(key)
+            if flight is not None and (
+                    self.window is None or now - flight.started_at < self.window):
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight(now)
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            # Includes exceptions such as KeyboardInterrupt, so that the
+            # callers that joined don't return None as if fn() succeeded.
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class AsyncSingleFlight(object):
+    """
+    Coalesces coroutines running on one asyncio event loop. Requires Python
+    3.4+.
+    """
+
+    def __init__(self, window=None, clock=time.time):
+        """
+        Args:
+            window (float): See SingleFlight.
+            clock: Function that returns the current time in seconds.
+        """
+        self.window = window
+        self._clock = clock
+        # Maps each key to a tuple of the time its call started at and the
+        # future of its result.
+        self._flights = {}
+
+    def call(self, key, coro_fn):
+        """
+        Returns an awaitable of the result of the coroutine returned by
+        coro_fn(), or of the call in flight with the same key. Cancelling one
+        caller's await does not cancel the call for the others.
+        """
+        import asyncio
+
+        now = self._clock()
+        flight = self._flights.get(key)
+        if flight is not None and (
+                self.window is None or now - flight[0] < self.window):
+            return asyncio.shield(flight[1])
+
+        future = asyncio.ensure_future(coro_fn())
+        flight = self._flights[key] = (now, future)
+
+        def remove(_):
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        future.add_done_callback(remove)
+        return asyncio.shield(future)
@@ -0,0 +1,254 @@
+"""
+A reference HTTP transport for clients made by the python_client generator.
+
+It implements the RPC conventions described in the Network Protocol doc: each
+route is a POST to /<namespace>/<route> with a JSON body, and a response with
+status 409 holds an error of the route's error type. Connections are kept alive
+and reused across requests.
+
+To use it, put it before the generated class in the bases of your client:
+
+    class Client(stone_transport.Transport, base.Base):
+        pass
+
+    client = Client('https://api.example.com', headers={...})
+
+Only RPC-style routes, whose request and response bodies are JSON, are
+supported.
+
+This module should be dropped into a project that requires the use of Stone. In
+the future, this could be imported from a pre-installed Python package, rather
+than being added to a project.
+"""
+
+from __future__ import absolute_import, unicode_literals
+
+import errno
+import json
+import socket
+import threading
+
+import six
+from six.moves import http_client
+from six.moves.urllib.parse import urlsplit
+
+try:
+    from . import stone_serializers as ss
+except (SystemError, ValueError):
+    # Catch errors raised when importing a relative module when not in a package.
+    # This makes testing this file directly (outside of a package) easier.
+    import stone_serializers as ss  # type: ignore
+
+
+class RouteError(Exception):
+    """
+    The server responded to a route with an error of the route's error type.
+    """
+
+    def __init__(self, route, error):
+        super(RouteError, self).__init__(route.name, error)
+        self.route = route
+        self.error = error
+
+
+class HttpError(Exception):
+    """
+    The server responded with a status other than 200 or 409.
+    """
+
+    def __init__(self, status, body):
+        super(HttpError, self).__init__(status, body)
+        self.status = status
+        self.body = body
+
+
+class ConnectionPool(object):
+    """
+    Keeps up to max_size idle connections to one host for reuse. Safe to use
+    from multiple threads.
+    """
+
+    def __init__(self, scheme, host, port=None, max_size=8, timeout=60.0):
+        if scheme == 'https':
+            self._connection_class = http_client.HTTPSConnection
+        elif scheme == 'http':
+            self._connection_class = http_client.HTTPConnection
+        else:
+            raise AssertionError('Unsupported scheme %r.' % scheme)
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        Returns a tuple of a connection and whether it has been used before.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.new_connection(), False
+
+    def new_connection(self):
+        return self._connection_class(
+            self.host, self.port, timeout=self.timeout)
+
+    def put(self, conn):
+        """
+        Returns a connection whose last response has been read to the pool.
+        """
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class Transport(object):
+    """
+    Implements request() and request_batch() of a generated client class.
+    """
+
+    def __init__(self, base_url, headers=None, max_connections=8, timeout=60.0):
+        """
+        Args:
+            base_url (str): Scheme, host and optionally port and path prefix
+                of the server, for example "https://api.example.com/2".
+            headers (dict): Extra headers to send with every request, such as
+                Authorization.
+            max_connections (int): Maximum number of idle connections to keep
+                open.
+            timeout (float): Socket timeout in seconds.
+        """
+        parts = urlsplit(base_url)
+        self._path_prefix = parts.path.rstrip('/')
+        self._headers = dict(headers or {})
+        self._pool = ConnectionPool(
+            parts.scheme, parts.hostname, parts.port, max_connections, timeout)
+
+    def request(self, route, namespace, arg, arg_binary=None):
+        """
+        Calls a route and returns its decoded result.
+
+        Raises:
+            RouteError: If the server responded with the route's error.
+            HttpError: If the server responded with any other error.
+        """
+        assert arg_binary is None, 'Only RPC-style routes are supported.'
+        body = ss.json_encode(route.arg_type, arg)
+        status, res_body = self._post(namespace, route, body)
+        if status == 200:
+            if isinstance(route.result_type, ss.bv.Void):
+                return None
+            return ss.json_decode(
+                route.result_type, res_body.decode('utf-8'), strict=False)
+        elif status == 409:
+            raise RouteError(route, ss.json_decode(
+                route.error_type, res_body.decode('utf-8'), strict=False))
+        else:
+            raise HttpError(status, res_body)
+
+    def request_batch(self, route, namespace, args):
+        """
+        Calls a route once for each JSON-compatible argument in args, reusing
+        connections. Returns a list with a (success, obj) tuple for each call,
+        where obj is the JSON-compatible result or error.
+
+        Raises:
+            HttpError: If the server responded with an error other than the
+                route's error to any of the calls.
+        """
+        results = []
+        for arg in args:
+            status, res_body = self._post(namespace, route, json.dumps(arg))
+            if status not in (200, 409):
+                raise HttpError(status, res_body)
+            obj = json.loads(res_body.decode('utf-8')) if res_body else None
+            results.append((status == 200, obj))
+        return results
+
+    def close(self):
+        """Closes all idle connections."""
+        self._pool.close()
+
+    def _post(self, namespace, route, body):
+        """
+        Sends a JSON body to a route. Returns the status and body of the
+        response.
+        """
+        if isinstance(body, six.text_type):
+            body = body.encode('utf-8')
+        path = '%s/%s/%s' % (self._path_prefix, namespace, route.name)
+        headers = {'Content-Type': 'application/json'}
+        headers.update(self._headers)
+
+        conn, reused = self._pool.get()
+        result = self._send(conn, path, body, headers, reused)
+        if result is None:
+            # The server closed the idle connection before it could have
+            # processed the request, so it's safe to send it again.
+            conn = self._pool.new_connection()
+            result = self._send(conn, path, body, headers, False)
+        res, res_body = result
+
+        if res.will_close:
+            conn.close()
+        else:
+            self._pool.put(conn)
+        return res.status, res_body
+
+    @staticmethod
+    def _send(conn, path, body, headers, reused):
+        """
+        Returns the response to a POST and its body. Closes the connection on
+        failure.
+
+        If reused is True, returns None instead of raising if the connection
+        turns out to have been closed by the server while it was idle. Any
+        other failure, such as a timeout or one while reading the response
+        body, is raised, since the server may have processed the request.
+        """
+        try:
+            try:
+                conn.request('POST', path, body, headers)
+            except socket.error as e:
+                if reused and e.errno in _STALE_SEND_ERRNOS:
+                    conn.close()
+                    return None
+                raise
+            try:
+                res = conn.getresponse()
+            except http_client.BadStatusLine as e:
+                if reused and _is_closed_without_response(e):
+                    conn.close()
+                    return None
+                raise
+            return res, res.read()
+        except Exception:
+            conn.close()
+            raise
+
+
+# Errors from sending a request on a connection that the server has closed.
+_STALE_SEND_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+
+
+def _is_closed_without_response(e):
+    """
+    Returns whether a BadStatusLine was raised because the server closed the
+    connection before sending any part of a response.
+    """
+    remote_disconnected = getattr(http_client, 'RemoteDisconnected', None)
+    if remote_disconnected is not None:
+        return isinstance(e, remote_disconnected)
+    # Python 2 raises a BadStatusLine with the repr of the empty line in older
+    # versions, and with a message instead in newer ones.
+    return e.line == "''" or e.line.startswith('No status line received')
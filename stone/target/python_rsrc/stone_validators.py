@@ -473,6 +473,10 @@ class StructTree(Struct):
 
     def __init__(self, definition):
         super(StructTree, self).__init__(definition)
+        # Maps each Python type that has been serialized with this validator,
+        # including subclasses of generated types, to its entry in the
+        # definition's _pytype_to_tag_and_subtype_.
+        self.pytype_to_tag_and_subtype_cache = {}
 
 
 class Union(Composite):
@@ -491,6 +495,10 @@ class Union(Composite):
                     validator (Validator): Tag value validator.
         """
         self.definition = definition
+        # Maps each tag to the function that decodes its value. Built by the
+        # JSON decoder on first use since _tagmap is set after validators are
+        # constructed.
+        self.decode_tag_handlers = None
 
     def validate(self, val):
         """
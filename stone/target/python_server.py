@@ -0,0 +1,151 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import os
+
+from stone.data_type import (
+    is_void_type,
+)
+from stone.generator import CodeGenerator
+from stone.target.python_helpers import (
+    fmt_doc_ref,
+    fmt_doc_type,
+    fmt_func,
+    fmt_var,
+)
+
+# This will be at the top of the generated file.
+base = """\
+# Auto-generated by Stone, do not modify.
+
+from abc import ABCMeta, abstractmethod
+"""
+
+_cmdline_parser = argparse.ArgumentParser(
+    prog='python-server-generator',
+    description=(
+        'Generates a Python class with an abstract handler method for each '
+        'route, and a table of the routes for stone_server.Dispatcher. '
+        'Implement the handlers in a subclass and serve an instance with '
+        'stone_server.WsgiApp. Upload- and download-style routes are skipped. '
+        'This class assumes that the python_types generator was used with the '
+        'same output directory.'),
+)
+_cmdline_parser.add_argument(
+    '-m',
+    '--module-name',
+    required=True,
+    type=str,
+    help=('The name of the Python module to generate. Please exclude the .py '
+          'file extension.'),
+)
+_cmdline_parser.add_argument(
+    '-c',
+    '--class-name',
+    required=True,
+    type=str,
+    help='The name of the Python class that contains each handler as a method.',
+)
+_cmdline_parser.add_argument(
+    '--asgi',
+    action='store_true',
+    help=('Also copy stone_server_asgi.py, an ASGI adapter that requires '
+          'Python 3.5+.'),
+)
+
+
+class PythonServerGenerator(CodeGenerator):
+
+    cmdline_parser = _cmdline_parser
+
+    def generate(self, api):
+        """
+        Generates a module with a ROUTES table that maps the path of each
+        route to the route and the name of the method that handles it, and a
+        class with an abstract method for each route.
+        """
+        rsrc_folder = os.path.join(os.path.dirname(__file__), 'python_rsrc')
+        rsrc_modules = ['stone_server.py']
+        if self.args.asgi:
+            rsrc_modules.append('stone_server_asgi.py')
+        for module in rsrc_modules:
+            self.copy_file(os.path.join(rsrc_folder, module))
+
+        namespaces = [
+            (namespace, [route for route in namespace.routes
+                         if self._is_rpc_route(route)])
+            for namespace in api.namespaces.values()]
+        with self.output_to_relative_path('%s.py' % self.args.module_name):
+            self.emit_raw(base)
+            self.emit()
+            self._generate_imports(
+                [namespace for namespace, routes in namespaces if routes])
+            self.emit()
+            self._generate_routes_table(namespaces)
+            self.emit()
+            self.emit()
+            self.emit('class %s(object):' % self.args.class_name)
+            with self.indent():
+                self.emit('__metaclass__ = ABCMeta')
+                self.emit()
+                for namespace, routes in namespaces:
+                    if routes:
+                        self.emit('# ------------------------------------------')
+                        self.emit('# Routes in {} namespace'.format(
+                            namespace.name))
+                        self.emit()
+                    for route in routes:
+                        self._generate_handler(namespace, route)
+
+    def _is_rpc_route(self, route):
+        """
+        Whether the route's argument and result are both in the JSON body.
+        """
+        return route.attrs.get('style') not in ('upload', 'download')
+
+    def _generate_imports(self, namespaces):
+        if not namespaces:
+            return
+        self.emit('from . import (')
+        with self.indent():
+            for namespace in namespaces:
+                self.emit(namespace.name + ',')
+        self.emit(')')
+
+    def _generate_routes_table(self, namespaces):
+        with self.block('ROUTES =', delim=('{', '}')):
+            for namespace, routes in namespaces:
+                for route in routes:
+                    self.emit("'{}/{}': ({}.{}, '{}'),".format(
+                        namespace.name,
+                        route.name,
+                        namespace.name,
+                        fmt_var(route.name),
+                        self._handler_name(namespace, route)))
+
+    def _handler_name(self, namespace, route):
+        return '{}_{}'.format(fmt_func(namespace.name), fmt_func(route.name))
+
+    def _generate_handler(self, namespace, route):
+        """Generates the abstract method that handles a route."""
+        self.emit('@abstractmethod')
+        self.emit('def {}(self, arg):'.format(
+            self._handler_name(namespace, route)))
+        with self.indent():
+            self.emit('"""')
+            if route.doc:
+                self.emit_wrapped_text(self.process_doc(route.doc, fmt_doc_ref))
+                self.emit()
+            self.emit(':type arg: {}'.format(
+                fmt_doc_type(route.arg_data_type)))
+            self.emit(':rtype: {}'.format(
+                fmt_doc_type(route.result_data_type)))
+            if not is_void_type(route.error_data_type):
+                self.emit_wrapped_text(
+                    ':raises: :class:`stone_server.RouteError` with an error '
+                    'of type {}.'.format(
+                        fmt_doc_type(route.error_data_type)),
+                    subsequent_prefix='    ')
+            self.emit('"""')
+            self.emit('pass')
+        self.emit()
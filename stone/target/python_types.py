@@ -7,7 +7,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import argparse
 import os
 import re
-import shutil
 from stone.data_type import (
     is_alias,
     is_boolean_type,
@@ -48,6 +47,52 @@ except (SystemError, ValueError):
 
 """
 
+# The top of the route index module, after the header comments.
+route_index_header = """\
+\"\"\"
+Maps the path of each route, "<namespace>/<route>", to the name of the
+namespace module and the variable that define it, and to the route's
+attributes. Use get_route() to look up a route by its path, which imports only
+the module of the route's namespace.
+\"\"\"
+
+import importlib
+
+"""
+
+# The bottom of the route index module.
+route_index_functions = """\
+_routes = {}
+
+
+def get_route(path):
+    \"\"\"
+    Returns the bb.Route at path, importing the module of its namespace if it
+    hasn't been imported yet. Raises KeyError if there is no such route.
+    \"\"\"
+    try:
+        return _routes[path]
+    except KeyError:
+        pass
+    module_name, var_name, _ = ROUTE_INDEX[path]
+    package = __name__.rpartition('.')[0]
+    if package:
+        module = importlib.import_module('.' + module_name, package)
+    else:
+        # Not in a package.
+        module = importlib.import_module(module_name)
+    route = _routes[path] = getattr(module, var_name)
+    return route
+
+
+def get_route_attrs(path):
+    \"\"\"
+    Returns the attributes of the route at path without importing the module
+    of its namespace. Raises KeyError if there is no such route.
+    \"\"\"
+    return ROUTE_INDEX[path][2]
+"""
+
 # Matches format of Stone doc tags
 doc_sub_tag_re = re.compile(':(?P<tag>[A-z]*):`(?P<val>.*?)`')
 
@@ -78,19 +123,25 @@ class PythonTypesGenerator(CodeGenerator):
         Each namespace will have Python classes to represent data types and
         routes in the Stone spec.
         """
-        rsrc_folder = os.path.join(os.path.dirname(__file__), 'python_rsrc')
-        self.logger.info('Copying stone_validators.py to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'stone_validators.py'),
-                    self.target_folder_path)
-        self.logger.info('Copying stone_serializers.py to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'stone_serializers.py'),
-                    self.target_folder_path)
-        self.logger.info('Copying stone_base.py to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'stone_base.py'),
-                    self.target_folder_path)
+        self.generate_common(api)
         for namespace in api.namespaces.values():
-            with self.output_to_relative_path('{}.py'.format(namespace.name)):
-                self._generate_base_namespace_module(api, namespace)
+            self.generate_namespace(api, namespace)
+
+    def generate_common(self, api):
+        """
+        Copies the drop-in modules and generates the route index.
+        """
+        rsrc_folder = os.path.join(os.path.dirname(__file__), 'python_rsrc')
+        self.copy_file(os.path.join(rsrc_folder, 'stone_validators.py'))
+        self.copy_file(os.path.join(rsrc_folder, 'stone_serializers.py'))
+        self.copy_file(os.path.join(rsrc_folder, 'stone_base.py'))
+        if any(namespace.routes for namespace in api.namespaces.values()):
+            with self.output_to_relative_path('stone_route_index.py'):
+                self._generate_route_index(api)
+
+    def generate_namespace(self, api, namespace):
+        with self.output_to_relative_path('{}.py'.format(namespace.name)):
+            self._generate_base_namespace_module(api, namespace)
 
     def _generate_base_namespace_module(self, api, namespace):
         """Creates a module for the namespace. All data types and routes are
@@ -235,11 +286,11 @@ class PythonTypesGenerator(CodeGenerator):
         if data_type.parent_type:
             extends = class_name_for_data_type(data_type.parent_type, ns)
         else:
+            # Use a handwritten base class
             if is_union_type(data_type):
-                # Use a handwritten base class
                 extends = 'bb.Union'
             else:
-                extends = 'object'
+                extends = 'bb.Struct'
         return 'class {}({}):'.format(
             class_name_for_data_type(data_type), extends)
 
@@ -310,26 +361,30 @@ class PythonTypesGenerator(CodeGenerator):
 
     def _generate_struct_class_reflection_attributes(self, ns, data_type):
         """
-        Generates two class attributes:
-          * _all_field_names_: Set of all field names including inherited fields.
-          * _all_fields_: List of tuples, where each tuple is (name, validator).
+        Generates class attributes:
+          * _all_field_names_: Frozenset of all field names including
+            inherited fields.
+          * _all_fields_: Tuple of tuples, where each tuple is (name,
+            validator), including inherited fields.
+          * _all_field_indices_: Dict mapping each field name to its index in
+            _all_fields_.
 
         If a struct has enumerated subtypes, then two additional attributes are
         generated:
-          * _field_names_: Set of all field names excluding inherited fields.
-          * _fields: List of tuples, where each tuple is (name, validator), and
-            excludes inherited fields.
+          * _field_names_: Frozenset of all field names excluding inherited
+            fields.
+          * _fields_: Tuple of tuples, where each tuple is (name, validator),
+            and excludes inherited fields.
 
         These are needed because serializing a struct with enumerated subtypes
         requires knowing the fields defined in each level of the hierarchy.
+
+        The attributes that include inherited fields are written out in full
+        rather than derived from the parent's at import time, so that the
+        depth of the inheritance chain has no cost.
         """
 
         class_name = class_name_for_data_type(data_type)
-        if data_type.parent_type:
-            parent_type_class_name = class_name_for_data_type(
-                data_type.parent_type, ns)
-        else:
-            parent_type_class_name = None
 
         for field in data_type.fields:
             field_name = fmt_var(field.name)
@@ -337,80 +392,74 @@ class PythonTypesGenerator(CodeGenerator):
             self.emit('{}._{}_validator = {}'.format(
                 class_name, field_name, validator_name))
 
+        # Fields paired with the class that defines them, starting with the
+        # fields of the root of the inheritance chain.
+        all_fields = []
+        for ancestor in reversed(self._struct_ancestors(data_type)):
+            ancestor_class_name = class_name_for_data_type(ancestor, ns)
+            all_fields.extend(
+                (field, ancestor_class_name) for field in ancestor.fields)
+
+        def field_items(fields):
+            return [
+                "('{0}', {1}._{0}_validator)".format(
+                    fmt_var(field.name), owner_class_name)
+                for field, owner_class_name in fields]
+
         if data_type.is_member_of_enumerated_subtypes_tree():
             self.generate_multiline_list(
                 ["'%s'" % field.name for field in data_type.fields],
-                before='{}._field_names_ = set('.format(class_name),
+                before='{}._field_names_ = frozenset('.format(class_name),
                 after=')',
                 delim=('[', ']'),
                 compact=False)
-            if parent_type_class_name:
-                self.emit(
-                    '{0}._all_field_names_ = '
-                    '{1}._all_field_names_.union({0}._field_names_)'
-                    .format(class_name, parent_type_class_name))
-            else:
-                self.emit('{0}._all_field_names_ = {0}._field_names_'.format(
-                    class_name))
-        else:
-            if parent_type_class_name:
-                before = (
-                    '{}._all_field_names_ = '
-                    '{}._all_field_names_.union(set(').format(
-                    class_name, parent_type_class_name)
-                after = '))'
-            else:
-                before = '{}._all_field_names_ = set('.format(class_name)
-                after = ')'
             self.generate_multiline_list(
-                ["'%s'" % field.name for field in data_type.fields],
-                before=before,
-                after=after,
+                field_items((field, class_name) for field in data_type.fields),
+                before='{}._fields_ = tuple('.format(class_name),
+                after=')',
                 delim=('[', ']'),
                 compact=False)
 
-        if data_type.is_member_of_enumerated_subtypes_tree():
-            items = []
-            for field in data_type.fields:
-                var_name = fmt_var(field.name)
-                validator_name = '{}._{}_validator'.format(class_name,
-                                                           var_name)
-                items.append("('{}', {})".format(var_name, validator_name))
-            self.generate_multiline_list(
-                items,
-                before='{}._fields_ = '.format(class_name),
-                delim=('[', ']'),
-                compact=False,
-            )
-            if parent_type_class_name:
-                self.emit(
-                    '{0}._all_fields_ = '
-                    '{1}._all_fields_ + {0}._fields_'.format(
-                        class_name, parent_type_class_name))
-            else:
-                self.emit('{0}._all_fields_ = {0}._fields_'.format(class_name))
-        else:
-            if parent_type_class_name:
-                before = '{}._all_fields_ = {}._all_fields_ + '.format(
-                    class_name, parent_type_class_name)
-            else:
-                before = '{}._all_fields_ = '.format(class_name)
-            items = []
-            for field in data_type.fields:
-                var_name = fmt_var(field.name)
-                validator_name = '{}._{}_validator'.format(
-                    class_name, var_name)
-                items.append("('{}', {})".format(var_name, validator_name))
-            self.generate_multiline_list(
-                items, before=before, delim=('[', ']'), compact=False)
+        self.generate_multiline_list(
+            ["'%s'" % field.name for field, _ in all_fields],
+            before='{}._all_field_names_ = frozenset('.format(class_name),
+            after=')',
+            delim=('[', ']'),
+            compact=False)
+        self.generate_multiline_list(
+            field_items(all_fields),
+            before='{}._all_fields_ = tuple('.format(class_name),
+            after=')',
+            delim=('[', ']'),
+            compact=False)
+        self.generate_multiline_list(
+            ["'{}': {}".format(fmt_var(field.name), i)
+             for i, (field, _) in enumerate(all_fields)],
+            before='{}._all_field_indices_ = '.format(class_name),
+            delim=('{', '}'),
+            compact=False)
 
         self.emit()
 
+    def _struct_ancestors(self, data_type):
+        """
+        Returns the struct followed by its parent, grandparent, and so on.
+        """
+        ancestors = []
+        while data_type:
+            ancestors.append(data_type)
+            data_type = data_type.parent_type
+        return ancestors
+
     def _generate_struct_class_init(self, data_type):
         """
         Generates constructor. The constructor takes all possible fields as
         optional arguments. Any argument that is set on construction sets the
         corresponding field for the instance.
+
+        The body is flat: inherited fields are initialized here rather than by
+        calling the parent constructor, and arguments are validated and stored
+        directly into their slots rather than through the property setters.
         """
 
         args = ['self']
@@ -420,33 +469,41 @@ class PythonTypesGenerator(CodeGenerator):
         self.generate_multiline_list(args, before='def __init__', after=':')
 
         with self.indent():
-            lineno = self.lineno
-
-            # Call the parent constructor if a super type exists
-            if data_type.parent_type:
-                class_name = class_name_for_data_type(data_type)
-                self.generate_multiline_list(
-                    [fmt_func(f.name, True)
-                     for f in data_type.parent_type.all_fields],
-                    before='super({}, self).__init__'.format(class_name))
-
-            # initialize each field
-            for field in data_type.fields:
-                field_var_name = fmt_var(field.name)
-                self.emit('self._{}_value = None'.format(field_var_name))
-                self.emit('self._{}_present = False'.format(field_var_name))
+            # Set by the JSON decoder if the instance is decoded lazily.
+            self.emit('self._lazy_ = None')
 
-            # handle arguments that were set
-            for field in data_type.fields:
-                field_var_name = fmt_var(field.name, True)
-                self.emit('if {} is not None:'.format(field_var_name))
+            for field in data_type.all_fields:
+                field_name = fmt_var(field.name)
+                field_name_reserved_check = fmt_var(field.name, True)
+                self.emit('if {} is not None:'.format(field_name_reserved_check))
                 with self.indent():
-                    self.emit('self.{0} = {0}'.format(field_var_name))
-
-            if lineno == self.lineno:
-                self.emit('pass')
+                    if self._field_validates_type_only(field):
+                        self.emit('self._{}_validator.validate_type_only({})'.format(
+                            field_name, field_name_reserved_check))
+                        self.emit('self._{}_value = {}'.format(
+                            field_name, field_name_reserved_check))
+                    else:
+                        self.emit('self._{0}_value = self._{0}_validator.validate({1})'.format(
+                            field_name, field_name_reserved_check))
+                    self.emit('self._{}_present = True'.format(field_name))
+                self.emit('else:')
+                with self.indent():
+                    self.emit('self._{}_value = None'.format(field_name))
+                    self.emit('self._{}_present = False'.format(field_name))
             self.emit()
 
+    def _field_validates_type_only(self, field):
+        """
+        Whether assigning a value to the field only validates its type. This
+        is the case for user-defined types, whose own fields were validated
+        when they were set.
+        """
+        if is_nullable_type(field.data_type):
+            field_dt = field.data_type.data_type
+        else:
+            field_dt = field.data_type
+        return is_user_defined_type(field_dt)
+
     def _generate_python_value(self, ns, value):
         if is_tag_ref(value):
             ref = '{}.{}'.format(
@@ -490,7 +547,10 @@ class PythonTypesGenerator(CodeGenerator):
                 self.emit('if self._{}_present:'.format(field_name))
                 with self.indent():
                     self.emit('return self._{}_value'.format(field_name))
-
+                self.emit("elif self._lazy_ is not None and self._lazy_.load(self, '{}'):"
+                          .format(fmt_var(field.name)))
+                with self.indent():
+                    self.emit('return self._{}_value'.format(field_name))
                 self.emit('else:')
                 with self.indent():
                     if dt_nullable:
@@ -514,13 +574,16 @@ class PythonTypesGenerator(CodeGenerator):
                     with self.indent():
                         self.emit('del self.{}'.format(field_name_reserved_check))
                         self.emit('return')
-                if is_user_defined_type(field_dt):
+                if self._field_validates_type_only(field):
                     self.emit('self._%s_validator.validate_type_only(val)' %
                               field_name)
                 else:
                     self.emit('val = self._{}_validator.validate(val)'.format(field_name))
                 self.emit('self._{}_value = val'.format(field_name))
                 self.emit('self._{}_present = True'.format(field_name))
+                self.emit('if self._lazy_ is not None:')
+                with self.indent():
+                    self.emit("self._lazy_.discard('{}')".format(fmt_var(field.name)))
             self.emit()
 
             # generate deleter for field
@@ -529,6 +592,9 @@ class PythonTypesGenerator(CodeGenerator):
             with self.indent():
                 self.emit('self._{}_value = None'.format(field_name))
                 self.emit('self._{}_present = False'.format(field_name))
+                self.emit('if self._lazy_ is not None:')
+                with self.indent():
+                    self.emit("self._lazy_.discard('{}')".format(fmt_var(field.name)))
             self.emit()
 
     def _generate_struct_class_repr(self, data_type):
@@ -814,6 +880,30 @@ class PythonTypesGenerator(CodeGenerator):
         if lineno != self.lineno:
             self.emit()
 
+    def _generate_route_index(self, api):
+        """
+        Creates a module that maps the path of every route to the namespace
+        module and variable that define it, and to its attributes, so that a
+        route can be found without importing every namespace.
+        """
+        self.emit('# -*- coding: utf-8 -*-')
+        self.emit('# Auto-generated by Stone, do not modify.')
+        self.emit_raw(route_index_header)
+        with self.block('ROUTE_INDEX =', delim=('{', '}')):
+            for namespace in api.namespaces.values():
+                for route in namespace.routes:
+                    attrs = ["'%s': %r" % (field.name, route.attrs.get(field.name))
+                             for field in api.route_schema.fields]
+                    self.emit("'{}/{}': (".format(namespace.name, route.name))
+                    with self.indent():
+                        self.emit("'{}',".format(namespace.name))
+                        self.emit("'{}',".format(fmt_func(route.name)))
+                        self.generate_multiline_list(
+                            attrs, delim=('{', '}'), after=',', compact=True)
+                    self.emit('),')
+        self.emit()
+        self.emit_raw(route_index_functions)
+
     def _generate_routes(self, route_schema, namespace):
 
         for route in namespace.routes:
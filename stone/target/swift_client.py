@@ -2,7 +2,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 
 import argparse
 import json
-import os
 import re
 
 from contextlib import contextmanager
@@ -114,16 +113,20 @@ class SwiftGenerator(SwiftBaseGenerator):
     cmdline_parser = _cmdline_parser
 
     def generate(self, api):
-        rsrc_folder = os.path.join(os.path.dirname(__file__), 'swift_rsrc')
+        self.generate_common(api)
         for namespace in api.namespaces.values():
-            ns_class = fmt_class(namespace.name)
-            if namespace.routes:
-                with self.output_to_relative_path('{}Routes.swift'.format(ns_class)):
-                    self._generate_routes(namespace)
+            self.generate_namespace(api, namespace)
 
+    def generate_common(self, api):
         with self.output_to_relative_path('{}.swift'.format(self.args.module_name)):
             self._generate_client(api)
 
+    def generate_namespace(self, api, namespace):
+        if namespace.routes:
+            ns_class = fmt_class(namespace.name)
+            with self.output_to_relative_path('{}Routes.swift'.format(ns_class)):
+                self._generate_routes(namespace)
+
     def _generate_client(self, api):
         self.emit_raw(base)
         self.emit('import Alamofire')
@@ -3,7 +3,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import argparse
 import json
 import os
-import shutil
 
 from contextlib import contextmanager
 
@@ -107,16 +106,15 @@ class SwiftTypesGenerator(SwiftBaseGenerator):
 
     cmdline_parser = _cmdline_parser
     def generate(self, api):
+        self.generate_common(api)
+        for namespace in api.namespaces.values():
+            self.generate_namespace(api, namespace)
+
+    def generate_common(self, api):
         rsrc_folder = os.path.join(os.path.dirname(__file__), 'swift_rsrc')
-        self.logger.info('Copying StoneValidators.swift to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'StoneValidators.swift'),
-                    self.target_folder_path)
-        self.logger.info('Copying StoneSerializers.swift to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'StoneSerializers.swift'),
-                    self.target_folder_path)
-        self.logger.info('Copying StoneBase.swift to output folder')
-        shutil.copy(os.path.join(rsrc_folder, 'StoneBase.swift'),
-                    self.target_folder_path)
+        self.copy_file(os.path.join(rsrc_folder, 'StoneValidators.swift'))
+        self.copy_file(os.path.join(rsrc_folder, 'StoneSerializers.swift'))
+        self.copy_file(os.path.join(rsrc_folder, 'StoneBase.swift'))
 
         jazzy_cfg_path = os.path.join(rsrc_folder, 'jazzy.json')
         with open(jazzy_cfg_path) as jazzy_file:
@@ -124,8 +122,6 @@ class SwiftTypesGenerator(SwiftBaseGenerator):
 
         for namespace in api.namespaces.values():
             ns_class = fmt_class(namespace.name)
-            with self.output_to_relative_path('{}.swift'.format(ns_class)):
-                self._generate_base_namespace_module(api, namespace)
             jazzy_cfg['custom_categories'][1]['children'].append(ns_class)
 
             if namespace.routes:
@@ -134,6 +130,11 @@ class SwiftTypesGenerator(SwiftBaseGenerator):
         with self.output_to_relative_path('../.jazzy.json'):
             self.emit_raw(json.dumps(jazzy_cfg, indent=2)+'\n')
 
+    def generate_namespace(self, api, namespace):
+        with self.output_to_relative_path(
+                '{}.swift'.format(fmt_class(namespace.name))):
+            self._generate_base_namespace_module(api, namespace)
+
     def _generate_base_namespace_module(self, api, namespace):
         self.emit_raw(base)
 
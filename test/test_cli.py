@@ -1,5 +1,12 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
 from stone.cli_helpers import parse_route_attr_filter
@@ -124,3 +131,237 @@ class TestCLI(unittest.TestCase):
         self.assertTrue(expr.eval(MockRoute({'a': 2, 'b': 3, 'c': 4})))
         self.assertFalse(expr.eval(MockRoute({'a': 1})))
         self.assertFalse(expr.eval(MockRoute({'a': 1, 'b': 3})))
+
+
+parallel_spec = """\
+namespace ns1
+
+alias Name = String
+
+struct A
+    a Name
+    b List(Int64)
+
+route get_a(Void, A, Void)
+
+namespace ns2
+
+import ns1
+
+union U
+    a ns1.A
+    b
+
+namespace ns3
+
+import ns2
+
+struct B
+    u ns2.U
+    c Boolean = false
+"""
+
+exit_generator = """\
+import os
+
+from stone.generator import Generator
+
+
+class ExitGenerator(Generator):
+
+    def generate(self, api):
+        self.generate_common(api)
+        for namespace in api.namespaces.values():
+            self.generate_namespace(api, namespace)
+
+    def generate_namespace(self, api, namespace):
+        if namespace.name == 'ns2':
+            os._exit(3)
+"""
+
+
+class TestParallelGeneration(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+
+    def _run(self, name, args, spec=parallel_spec):
+        """
+        Runs the stone CLI on spec with args, in which "{out}" is replaced by
+        a new folder. Returns a dict of the path relative to that folder and
+        contents of each generated file.
+        """
+        root = os.path.join(self.output, name)
+        args = [sys.executable, '-m', 'stone.cli'] + [
+            arg.replace('{out}', root) for arg in args]
+        p = subprocess.Popen(args, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, stderr = p.communicate(input=spec.encode('utf-8'))
+        if p.wait() != 0:
+            raise AssertionError('Could not execute stone tool: %s' %
+                                 stderr.decode('utf-8'))
+        files = {}
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path, 'rb') as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
+
+    def test_parallel_generation(self):
+        for generator, ns3_file in [('python_types', 'ns3.py'),
+                                    ('swift_types', 'Ns3.swift')]:
+            serial = self._run(generator + '-1',
+                               ['-j', '1', generator, '{out}/out', '-'])
+            self.assertIn(os.path.join('out', ns3_file), serial)
+            self.assertEqual(
+                self._run(generator + '-3',
+                          ['-j', '3', generator, '{out}/out', '-']),
+                serial)
+
+    def test_extra_generators(self):
+        # Run each generator separately. python_types preserves aliases, and
+        # the others don't.
+        separate = {}
+        separate.update(self._run('separate', [
+            'python_types', '{out}/py', '-']))
+        separate.update(self._run('separate', [
+            'python_client', '{out}/py', '-', '--', '-m', 'client', '-c',
+            'Base']))
+        separate.update(self._run('separate', [
+            'swift_types', '{out}/swift/out', '-']))
+        self.assertIn(os.path.join('py', 'client.py'), separate)
+        self.assertIn('Name_validator = bv.String()',
+                      separate[os.path.join('py', 'ns1.py')]
+                      .decode('utf-8'))
+
+        for jobs in ('1', '4'):
+            self.assertEqual(
+                self._run('together-' + jobs, [
+                    '-j', jobs,
+                    '-g', 'python_client {out}/py -m client -c Base',
+                    '-g', 'python_types {out}/py',
+                    'swift_types', '{out}/swift/out', '-']),
+                separate)
+
+    def test_generator_process_exits(self):
+        # A process of a generator that exits without reporting, for example
+        # because it was killed, fails the build instead of hanging. That's
+        # the process of the whole generator when several run in parallel,
+        # and one generating namespaces otherwise.
+        path = os.path.join(self.output, 'exit.stoneg.py')
+        with open(path, 'w') as f:
+            f.write(exit_generator)
+        for extra_args, message in [
+                (['-g', 'python_types %s' % os.path.join(self.output, 'py')],
+                 'Exited with code 3 without reporting a result.'),
+                ([], 'exited with code 3.')]:
+            p = subprocess.Popen(
+                [sys.executable, '-m', 'stone.cli', '-j', '2'] + extra_args +
+                [path, os.path.join(self.output, 'exit'), '-'],
+                stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            timer = threading.Timer(60, p.kill)
+            timer.start()
+            try:
+                _, stderr = p.communicate(input=parallel_spec.encode('utf-8'))
+            finally:
+                timer.cancel()
+            self.assertEqual(p.wait(), 1)
+            stderr = stderr.decode('utf-8')
+            self.assertIn('ExitGenerator raised an exception:\n', stderr)
+            self.assertIn(message, stderr)
+
+    def test_incremental_generation(self):
+        root = os.path.join(self.output, 'incremental')
+        args = ['--incremental', 'python_types', '{out}/out', '-']
+        files = self._run('incremental', args)
+        self.assertIn(
+            os.path.join('out', '.stone_manifest.PythonTypesGenerator.json'),
+            files)
+
+        def mark_untouched():
+            for name in ('ns1.py', 'ns2.py', 'ns3.py'):
+                with open(os.path.join(root, 'out', name), 'wb') as f:
+                    f.write(b'untouched')
+
+        def untouched(files):
+            return sorted(os.path.basename(path) for path, contents
+                          in files.items() if contents == b'untouched')
+
+        # Nothing changed, so no namespace is generated again.
+        mark_untouched()
+        files = self._run('incremental', args)
+        self.assertEqual(untouched(files), ['ns1.py', 'ns2.py', 'ns3.py'])
+
+        # ns3 imports ns2, so both are generated again.
+        changed_spec = parallel_spec.replace('    b\n', '    b\n    c String\n')
+        files = self._run('incremental', args, spec=changed_spec)
+        self.assertEqual(untouched(files), ['ns1.py'])
+        full = self._run('full', ['python_types', '{out}/out', '-'],
+                         spec=changed_spec)
+        for name in ('ns2.py', 'ns3.py'):
+            path = os.path.join('out', name)
+            self.assertEqual(files[path], full[path])
+
+        # Different generator arguments change every namespace.
+        mark_untouched()
+        files = self._run('incremental', args + ['--', '-r', '{ns}.{route}'],
+                          spec=changed_spec)
+        self.assertEqual(untouched(files), [])
+
+        # The files of a removed namespace are deleted.
+        files = self._run('incremental', args,
+                          spec=changed_spec[:changed_spec.index('namespace ns3')])
+        self.assertNotIn(os.path.join('out', 'ns3.py'), files)
+
+        # A generator without namespace units is skipped if nothing changed.
+        client_args = ['--incremental', 'python_client', '{out}/client', '-',
+                       '--', '-m', 'client', '-c', 'Base']
+        self._run('incremental', client_args)
+        client_path = os.path.join(root, 'client', 'client.py')
+        with open(client_path, 'wb') as f:
+            f.write(b'untouched')
+        files = self._run('incremental', client_args)
+        self.assertEqual(files[os.path.join('client', 'client.py')],
+                         b'untouched')
+
+    def test_watch(self):
+        spec_path = os.path.join(self.output, 'ns.stone')
+        out_path = os.path.join(self.output, 'watch', 'ns.py')
+
+        def write_spec(text):
+            with open(spec_path, 'wb') as f:
+                f.write(text.encode('utf-8'))
+
+        def wait_for_output(text):
+            deadline = time.time() + 30
+            while time.time() < deadline:
+                if os.path.exists(out_path):
+                    with open(out_path, 'rb') as f:
+                        if text in f.read().decode('utf-8'):
+                            return
+                time.sleep(0.05)
+            raise AssertionError('%r was not generated.' % text)
+
+        write_spec('namespace ns\n\nstruct A\n    a String\n')
+        p = subprocess.Popen(
+            [sys.executable, '-m', 'stone.cli', '--watch', '--watch-interval',
+             '0.05', 'python_types', os.path.join(self.output, 'watch'),
+             spec_path],
+            stderr=subprocess.PIPE)
+        try:
+            wait_for_output('class A(')
+            # Errors are reported without stopping, and each change is
+            # generated.
+            write_spec('namespace ns\n\nstruct B\n    b Foo\n')
+            while b'error' not in p.stderr.readline():
+                pass
+            self.assertEqual(p.stderr.readline(), b'Watching for changes...\n')
+            write_spec('namespace ns\n\nstruct B\n    b String\n')
+            wait_for_output('class B(')
+        finally:
+            p.terminate()
+            p.wait()
+            p.stderr.close()
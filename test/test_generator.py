@@ -1,6 +1,11 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import argparse
+import imp
+import os
+import shutil
+import sys
+import tempfile
 import unittest
 
 from stone.api import (
@@ -15,6 +20,7 @@ from stone.data_type import (
     StructField,
 )
 from stone.generator import CodeGenerator
+from stone.manifest import generator_fingerprint
 
 class Tester(CodeGenerator):
     """A no-op generator used to test helper methods."""
@@ -213,3 +219,70 @@ int sq(int x) <
     def test_generator_cmdline(self):
         t = TesterCmdline(None, ['-v'])
         self.assertTrue(t.args.verbose)
+
+    def test_write_if_changed(self):
+        target_folder_path = tempfile.mkdtemp()
+        try:
+            t = Tester(target_folder_path, [])
+            path = os.path.join(target_folder_path, 'sub', 'out.txt')
+            source_path = os.path.join(target_folder_path, 'source.txt')
+            with open(source_path, 'wb') as f:
+                f.write(b'source\n')
+
+            def write(text):
+                with t.output_to_relative_path(os.path.join('sub', 'out.txt')):
+                    t.emit(text)
+
+            write('a')
+            t.copy_file(source_path, 'copy.txt')
+            self.assertEqual((t.files_written, t.files_unchanged), (2, 0))
+            mode = os.stat(path).st_mode & 0o777
+            # Back-date the file to see whether it's written again.
+            os.utime(path, (0, 0))
+
+            write('a')
+            t.copy_file(source_path, 'copy.txt')
+            self.assertEqual((t.files_written, t.files_unchanged), (2, 2))
+            self.assertEqual(os.stat(path).st_mtime, 0)
+
+            write('b')
+            self.assertEqual((t.files_written, t.files_unchanged), (3, 2))
+            self.assertNotEqual(os.stat(path).st_mtime, 0)
+            self.assertEqual(os.stat(path).st_mode & 0o777, mode)
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), b'b\n')
+            with open(os.path.join(target_folder_path, 'copy.txt'), 'rb') as f:
+                self.assertEqual(f.read(), b'source\n')
+            # No temporary files are left behind.
+            self.assertEqual(os.listdir(os.path.dirname(path)), ['out.txt'])
+        finally:
+            shutil.rmtree(target_folder_path)
+
+    def test_fingerprint_covers_resources(self):
+        folder = tempfile.mkdtemp()
+        try:
+            module_path = os.path.join(folder, 'fingerprint_generator.py')
+            with open(module_path, 'w') as f:
+                f.write('from stone.generator import Generator\n'
+                        'class FingerprintGenerator(Generator):\n'
+                        '    def generate(self, api):\n'
+                        '        pass\n')
+            rsrc_folder = os.path.join(folder, 'fingerprint_rsrc')
+            os.mkdir(rsrc_folder)
+            rsrc_path = os.path.join(rsrc_folder, 'runtime.py')
+            with open(rsrc_path, 'w') as f:
+                f.write('VERSION = 1\n')
+
+            module = imp.load_source('fingerprint_generator', module_path)
+            generator = module.FingerprintGenerator(folder, None)
+            fingerprint = generator_fingerprint(generator)
+            self.assertEqual(generator_fingerprint(generator), fingerprint)
+
+            # Test that a change to a file the generator may copy to its
+            # output changes the fingerprint
+            with open(rsrc_path, 'w') as f:
+                f.write('VERSION = 2\n')
+            self.assertNotEqual(generator_fingerprint(generator), fingerprint)
+        finally:
+            sys.modules.pop('fingerprint_generator', None)
+            shutil.rmtree(folder)
@@ -0,0 +1,605 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import errno
+import inspect
+import io
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import warnings
+
+from six.moves import BaseHTTPServer, http_client
+
+client_spec = """\
+namespace stone_cfg
+
+struct Route
+    style String?
+    batchable Boolean = false
+    cache_ttl Float64?
+
+namespace files
+
+route get_metadata(GetMetadataArg, Metadata, LookupError)
+    "Returns the metadata for a file."
+    attrs
+        batchable = true
+        cache_ttl = 60
+
+route download(GetMetadataArg, Metadata, Void)
+    attrs
+        style = "download"
+        batchable = true
+
+route upload(GetMetadataArg, Metadata, Void)
+    attrs
+        style = "upload"
+
+route delete(GetMetadataArg, Void, Void) deprecated by get_metadata
+
+struct GetMetadataArg
+    path String
+    include_deleted Boolean = false
+
+struct Metadata
+    name String
+
+union LookupError
+    not_found
+"""
+
+
+class RpcHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Responds to files/get_metadata like a server following the Network
+    Protocol doc would, and records the client's address for each request.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.server.requests.append((self.path, self.client_address))
+        self.server.connection = self.connection
+        body = json.loads(
+            self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        if self.path != '/2/files/get_metadata':
+            self._respond(500, b'unknown route')
+        elif body['path'] == '/missing':
+            self._respond(409, b'{".tag": "not_found"}')
+        else:
+            self._respond(200, json.dumps(
+                {'name': body['path'], 'extra': 1}).encode('utf-8'))
+
+    def _respond(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGeneratedPythonClient(unittest.TestCase):
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        # Generate into a package so that the client's relative imports of
+        # the python_types output work.
+        self.package = os.path.join(self.output, 'pkg')
+
+    def tearDown(self):
+        shutil.rmtree(self.output)
+        for name in list(sys.modules):
+            if name == 'pkg' or name.startswith('pkg.'):
+                del sys.modules[name]
+
+    def _generate(self, generator, class_name=None, module_name='client',
+                  extra_args=()):
+        """
+        Runs the generator on client_spec and returns the generated module as
+        a string.
+        """
+        args = [sys.executable,
+                '-m',
+                'stone.cli',
+                '-a',
+                'style',
+                '-a',
+                'batchable',
+                '-a',
+                'cache_ttl',
+                generator,
+                self.package,
+                '-']
+        if class_name:
+            args += ['--', '-m', module_name, '-c', class_name]
+            args += extra_args
+        p = subprocess.Popen(args, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, stderr = p.communicate(input=client_spec.encode('utf-8'))
+        if p.wait() != 0:
+            raise AssertionError('Could not execute stone tool: %s' %
+                                 stderr.decode('utf-8'))
+        if class_name:
+            with io.open(os.path.join(self.package, module_name + '.py'),
+                         encoding='utf-8') as f:
+                return f.read()
+
+    def _import_client(self):
+        """
+        Generates the types and client for client_spec, and returns the client
+        and files modules.
+        """
+        self._generate('python_types')
+        self._generate('python_client', 'Base')
+        with io.open(os.path.join(self.package, '__init__.py'), 'w'):
+            pass
+        sys.path.insert(0, self.output)
+        try:
+            from pkg import client, files
+        finally:
+            sys.path.remove(self.output)
+        return client, files
+
+    def test_client(self):
+        src = self._generate('python_client', 'Base')
+        self.assertIn('class Base(object):', src)
+        self.assertIn('    def request(self, route, namespace, arg, '
+                      'arg_binary=None):', src)
+        self.assertIn('    def files_get_metadata(self,', src)
+        self.assertIn('        r = self.request(', src)
+        self.assertIn('        self._save_body_to_file(download_path, r[1])',
+                      src)
+        self.assertNotIn('async', src)
+        self.assertNotIn('await', src)
+        compile(src, 'client.py', 'exec')
+
+    def test_async_client(self):
+        src = self._generate('python_async_client', 'AsyncBase')
+        self.assertIn('class AsyncBase(metaclass=ABCMeta):', src)
+        self.assertIn('    @abstractmethod\n'
+                      '    async def request(self, route, namespace, arg, '
+                      'arg_binary=None):', src)
+        self.assertIn('    async def files_get_metadata(self,', src)
+        self.assertIn('    async def files_download_to_file(self,', src)
+        self.assertIn('    async def files_download_stream(self,', src)
+        self.assertIn('    @abstractmethod\n'
+                      '    def _iter_body_chunks(self, response, chunk_size):',
+                      src)
+        self.assertIn('        r = await self.request(', src)
+        self.assertIn('        await self._save_body_to_file(download_path, '
+                      'r[1])', src)
+        self.assertIn('    async def files_get_metadata_batch(self, args):',
+                      src)
+        self.assertIn('        return await self._request_batch_and_decode(',
+                      src)
+        self.assertIn('Returns the metadata for a file.', src)
+        self.assertIn("'delete is deprecated. Use get_metadata.'", src)
+        # Only the async generator's output should be in the module.
+        self.assertEqual(src.count('class '), 1)
+        if sys.version_info >= (3, 5):
+            compile(src, 'client.py', 'exec')
+
+    def test_client_batch(self):
+        client, files = self._import_client()
+        # Routes with binary bodies are not batched.
+        self.assertFalse(hasattr(client.Base, 'files_download_batch'))
+        self.assertFalse(hasattr(client.Base, 'files_delete_batch'))
+
+        calls = []
+
+        class Client(client.Base):
+            def request(self, route, namespace, arg, arg_binary=None):
+                raise AssertionError('Batch methods must use request_batch.')
+
+            def request_batch(self, route, namespace, args):
+                calls.append((route, namespace, args))
+                return [(True, {'name': arg['path']}) if arg['path'] else
+                        (False, {'.tag': 'not_found'}) for arg in args]
+
+        results = Client().files_get_metadata_batch(
+            [files.GetMetadataArg('/a'), files.GetMetadataArg('')])
+        self.assertEqual(
+            calls,
+            [(files.get_metadata, 'files',
+              [{'path': '/a'}, {'path': ''}])])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0], True)
+        self.assertEqual(results[0][1].name, '/a')
+        self.assertEqual(results[1][0], False)
+        self.assertTrue(results[1][1].is_not_found())
+
+    def test_client_cache(self):
+        client, files = self._import_client()
+        # Routes with binary bodies are not cached.
+        self.assertNotIn('_route_cache', inspect.getsource(
+            client.Base.files_download))
+
+        calls = []
+
+        class Client(client.Base):
+            def request(self, route, namespace, arg, arg_binary=None):
+                calls.append(arg.path)
+                return files.Metadata(name=arg.path)
+
+            def request_batch(self, route, namespace, args):
+                pass
+
+        c = Client()
+        # The cache is disabled by default.
+        c.files_get_metadata('/a')
+        c.files_get_metadata('/a')
+        self.assertEqual(calls, ['/a', '/a'])
+
+        now = [0]
+        c.enable_route_cache(max_size=2)
+        c._route_cache._clock = lambda: now[0]
+        del calls[:]
+        first = c.files_get_metadata('/a')
+        self.assertIs(c.files_get_metadata('/a'), first)
+        c.files_get_metadata('/a', include_deleted=True)
+        self.assertEqual(calls, ['/a', '/a'])
+
+        # Test that the least recently used result is evicted
+        c.files_get_metadata('/b')
+        c.files_get_metadata('/a', include_deleted=True)
+        c.files_get_metadata('/a')
+        self.assertEqual(calls, ['/a', '/a', '/b', '/a'])
+
+        # Test that results expire
+        now[0] = 60
+        c.files_get_metadata('/a', include_deleted=True)
+        self.assertEqual(calls[-1:], ['/a'])
+        self.assertEqual(len(calls), 5)
+
+        # Test invalidation
+        c.files_get_metadata('/b')
+        c.invalidate_route_cache(files.get_metadata, files.GetMetadataArg('/b'))
+        c.files_get_metadata('/a', include_deleted=True)
+        c.files_get_metadata('/b')
+        self.assertEqual(calls[5:], ['/b', '/b'])
+        c.invalidate_route_cache(files.get_metadata)
+        c.files_get_metadata('/b')
+        c.invalidate_route_cache()
+        c.files_get_metadata('/b')
+        self.assertEqual(calls[7:], ['/b', '/b'])
+
+        # Test that a missing required field fails validation as it does
+        # without the cache
+        from pkg import stone_validators
+        with self.assertRaises(stone_validators.ValidationError) as cm:
+            c.files_get_metadata(None)
+        self.assertEqual("missing required field 'path'", str(cm.exception))
+        self.assertEqual(len(calls), 9)
+
+        c.disable_route_cache()
+        c.files_get_metadata('/b')
+        self.assertEqual(len(calls), 10)
+
+    def test_client_single_flight(self):
+        client, files = self._import_client()
+        self.assertNotIn('_single_flight', inspect.getsource(
+            client.Base.files_download))
+
+        release = threading.Event()
+        calls = []
+
+        class Client(client.Base):
+            def request(self, route, namespace, arg, arg_binary=None):
+                calls.append(arg.path)
+                release.wait()
+                return files.Metadata(name=arg.path)
+
+            def request_batch(self, route, namespace, args):
+                pass
+
+        c = Client()
+        c.enable_single_flight()
+        # Count calls that have joined or started a flight, which each read
+        # the clock once.
+        clock_reads = []
+        c._single_flight._clock = lambda: clock_reads.append(1) or 0
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(c.files_get_metadata('/a')))
+            for _ in range(3)]
+        threads[0].start()
+        while not calls:
+            time.sleep(0.001)
+        for thread in threads[1:]:
+            thread.start()
+        while len(clock_reads) < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, ['/a'])
+        self.assertEqual([r.name for r in results], ['/a'] * 3)
+
+        c.disable_single_flight()
+        c.files_get_metadata('/a')
+        self.assertEqual(calls, ['/a', '/a'])
+
+    def test_client_stream(self):
+        client, files = self._import_client()
+
+        class Response(object):
+            closed = False
+
+            def iter_content(self, chunk_size):
+                body = b'abcdefg'
+                for i in range(0, len(body), chunk_size):
+                    yield body[i:i + chunk_size]
+
+            def close(self):
+                self.closed = True
+
+        responses = []
+        uploads = []
+
+        class Client(client.Base):
+            def request(self, route, namespace, arg, arg_binary=None):
+                if route is files.upload:
+                    uploads.append(b''.join(arg_binary))
+                    return files.Metadata(name=arg.path)
+                responses.append(Response())
+                return files.Metadata(name=arg.path), responses[-1]
+
+            def request_batch(self, route, namespace, args):
+                pass
+
+        res, chunks = Client().files_download_stream('/a', chunk_size=3)
+        self.assertEqual(res.name, '/a')
+        self.assertFalse(responses[0].closed)
+        self.assertEqual(list(chunks), [b'abc', b'def', b'g'])
+        self.assertTrue(responses[0].closed)
+
+        # Test that closing the iterator early closes the response
+        _, chunks = Client().files_download_stream('/a', chunk_size=3)
+        next(chunks)
+        chunks.close()
+        self.assertTrue(responses[1].closed)
+
+        # Test that an iterable upload body is passed through as is
+        res = Client().files_upload(iter([b'ab', b'c']), '/b')
+        self.assertEqual(res.name, '/b')
+        self.assertEqual(uploads, [b'abc'])
+
+    def test_transport(self):
+        client, files = self._import_client()
+        from pkg import stone_transport
+
+        server = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), RpcHandler)
+        server.requests = []
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        class Client(stone_transport.Transport, client.Base):
+            pass
+
+        c = Client('http://127.0.0.1:%d/2' % server.server_address[1])
+        try:
+            self.assertEqual(c.files_get_metadata('/a').name, '/a')
+            self.assertEqual(c.files_get_metadata('/b').name, '/b')
+            with self.assertRaises(stone_transport.RouteError) as cm:
+                c.files_get_metadata('/missing')
+            self.assertTrue(cm.exception.error.is_not_found())
+            with self.assertRaises(stone_transport.HttpError) as cm, \
+                    warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                c.files_delete('/a')
+            self.assertEqual(cm.exception.status, 500)
+
+            results = c.files_get_metadata_batch(
+                [files.GetMetadataArg('/c'), files.GetMetadataArg('/missing')])
+            self.assertEqual(results[0][1].name, '/c')
+            self.assertEqual(results[1][0], False)
+            self.assertTrue(results[1][1].is_not_found())
+
+            # Test that a single keep-alive connection served every request
+            self.assertEqual(len(server.requests), 6)
+            self.assertEqual(
+                len(set(address for _, address in server.requests)), 1)
+
+            # Test that a connection closed by the server is replaced
+            server.connection.shutdown(socket.SHUT_RDWR)
+            self.assertEqual(c.files_get_metadata('/d').name, '/d')
+            self.assertEqual(len(server.requests), 7)
+        finally:
+            c.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_transport_retries(self):
+        _, files = self._import_client()
+        from pkg import stone_transport
+
+        class Response(object):
+            status = 200
+            will_close = False
+
+            def __init__(self, read_error):
+                self.read_error = read_error
+
+            def read(self):
+                if self.read_error:
+                    raise self.read_error
+                return b'{"name": "/a"}'
+
+        class Connection(object):
+            def __init__(self, request_error=None, response_error=None,
+                         read_error=None):
+                self.request_error = request_error
+                self.response_error = response_error
+                self.read_error = read_error
+                self.requests = 0
+                self.closed = False
+
+            def request(self, method, path, body, headers):
+                self.requests += 1
+                if self.request_error:
+                    raise self.request_error
+
+            def getresponse(self):
+                if self.response_error:
+                    raise self.response_error
+                return Response(self.read_error)
+
+            def close(self):
+                self.closed = True
+
+        def post(conn, reused=True):
+            t = stone_transport.Transport('http://127.0.0.1')
+            new_conn = Connection()
+            t._pool.new_connection = lambda: new_conn
+            if reused:
+                t._pool.put(conn)
+            else:
+                t._pool.get = lambda: (conn, False)
+            t._post('files', files.get_metadata, b'{}')
+            self.assertTrue(conn.closed)
+            return new_conn.requests
+
+        closed = getattr(http_client, 'RemoteDisconnected',
+                         http_client.BadStatusLine)("''")
+
+        # Test that a request is sent again if the server closed the idle
+        # connection before it could have processed the request
+        self.assertEqual(
+            post(Connection(socket.error(errno.EPIPE, 'Broken pipe'))), 1)
+        self.assertEqual(
+            post(Connection(socket.error(errno.ECONNRESET, 'Reset'))), 1)
+        self.assertEqual(post(Connection(response_error=closed)), 1)
+
+        # Test that it isn't if the server may have processed it
+        for conn in [
+                Connection(socket.timeout('timed out')),
+                Connection(response_error=socket.timeout('timed out')),
+                Connection(response_error=socket.error(
+                    errno.ECONNRESET, 'Reset')),
+                Connection(response_error=http_client.BadStatusLine('x')),
+                Connection(read_error=socket.timeout('timed out')),
+                Connection(read_error=http_client.IncompleteRead(b'{', 1))]:
+            error = conn.request_error or conn.response_error or conn.read_error
+            with self.assertRaises(type(error)):
+                post(conn)
+            self.assertEqual(conn.requests, 1)
+
+        # Test that it isn't if the connection is new
+        with self.assertRaises(type(closed)):
+            post(Connection(response_error=closed), reused=False)
+
+    def test_route_index(self):
+        self._generate('python_types')
+        with io.open(os.path.join(self.package, '__init__.py'), 'w'):
+            pass
+        sys.path.insert(0, self.output)
+        try:
+            from pkg import stone_route_index
+        finally:
+            sys.path.remove(self.output)
+
+        self.assertEqual(
+            stone_route_index.get_route_attrs('files/download'),
+            {'style': 'download', 'batchable': True, 'cache_ttl': None})
+        self.assertNotIn('pkg.files', sys.modules)
+        route = stone_route_index.get_route('files/get_metadata')
+        from pkg import files
+        self.assertIs(route, files.get_metadata)
+        self.assertIs(stone_route_index.get_route('files/get_metadata'), route)
+        with self.assertRaises(KeyError):
+            stone_route_index.get_route('files/missing')
+
+    def test_server(self):
+        src = self._generate('python_server', 'Base', module_name='server')
+        self.assertIn("    'files/get_metadata': (files.get_metadata, "
+                      "'files_get_metadata'),", src)
+        # Routes with binary bodies are not served.
+        self.assertNotIn('files/download', src)
+        self.assertNotIn('files/upload', src)
+        self.assertIn('    @abstractmethod\n'
+                      '    def files_get_metadata(self, arg):', src)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.package, 'stone_server.py')))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.package, 'stone_server_asgi.py')))
+
+        self._generate('python_types')
+        with io.open(os.path.join(self.package, '__init__.py'), 'w'):
+            pass
+        sys.path.insert(0, self.output)
+        try:
+            from pkg import files, server, stone_server
+        finally:
+            sys.path.remove(self.output)
+
+        class Server(server.Base):
+            def files_get_metadata(self, arg):
+                if arg.path == '/missing':
+                    raise stone_server.RouteError(files.LookupError.not_found)
+                return files.Metadata(name=arg.path)
+
+            def files_delete(self, arg):
+                pass
+
+        app = stone_server.WsgiApp(
+            stone_server.Dispatcher(server.ROUTES, Server()), '/2')
+
+        def call(path, body, method='POST'):
+            responses = []
+            environ = {
+                'REQUEST_METHOD': method,
+                'PATH_INFO': path,
+                'CONTENT_LENGTH': str(len(body)),
+                'wsgi.input': io.BytesIO(body),
+            }
+            res_body = b''.join(
+                app(environ, lambda *args: responses.append(args)))
+            status, headers = responses[0]
+            self.assertEqual(dict(headers)['Content-Length'],
+                             str(len(res_body)))
+            return status, res_body
+
+        status, body = call('/2/files/get_metadata', b'{"path": "/a"}')
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(json.loads(body.decode('utf-8')), {'name': '/a'})
+        status, body = call('/2/files/get_metadata', b'{"path": "/missing"}')
+        self.assertEqual(status, '409 Conflict')
+        self.assertEqual(json.loads(body.decode('utf-8')),
+                         {'.tag': 'not_found'})
+        status, body = call('/2/files/delete', b'{"path": "/a"}')
+        self.assertEqual((status, body), ('200 OK', b'null'))
+        self.assertEqual(
+            call('/2/files/get_metadata', b'{"path": 1}')[0],
+            '400 Bad Request')
+        self.assertEqual(call('/2/files/get_metadata', b'{')[0],
+                         '400 Bad Request')
+        self.assertEqual(call('/2/files/download', b'{"path": "/a"}')[0],
+                         '404 Not Found')
+        self.assertEqual(call('/files/get_metadata', b'{"path": "/a"}')[0],
+                         '404 Not Found')
+        self.assertEqual(call('/2/files/get_metadata', b'', 'GET')[0],
+                         '405 Method Not Allowed')
+
+    def test_server_asgi(self):
+        self._generate('python_server', 'Base', module_name='server',
+                       extra_args=['--asgi'])
+        path = os.path.join(self.package, 'stone_server_asgi.py')
+        self.assertTrue(os.path.exists(path))
+        if sys.version_info >= (3, 5):
+            with io.open(path, encoding='utf-8') as f:
+                compile(f.read(), path, 'exec')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import array
 import base64
 import datetime
 import imp
@@ -8,8 +9,11 @@ import shutil
 import six
 import subprocess
 import sys
+import threading
+import time
 import unittest
 
+import stone.target.python_rsrc.stone_singleflight as stone_singleflight
 import stone.target.python_rsrc.stone_validators as bv
 
 from stone.target.python_rsrc.stone_serializers import (
@@ -510,6 +514,107 @@ class TestDropInModules(unittest.TestCase):
                 self.assertEqual(prefix, str(e)[:len(prefix)])
                 raise
 
+    def test_single_flight(self):
+        # Counts calls to call(), which each read the clock once
+        clock_reads = []
+
+        def clock():
+            clock_reads.append(1)
+            return 0
+
+        sf = stone_singleflight.SingleFlight(clock=clock)
+        release = threading.Event()
+        calls = []
+
+        def run_coalesced(fn):
+            """
+            Calls fn from 4 threads at once, and returns what each returned
+            or raised.
+            """
+            del clock_reads[:]
+            release.clear()
+            outcomes = []
+
+            def run():
+                try:
+                    outcomes.append(sf.call('k', fn))
+                except BaseException as e:  # pylint: disable=broad-except
+                    outcomes.append(e)
+            threads = [threading.Thread(target=run) for _ in range(4)]
+            threads[0].start()
+            while not calls:
+                time.sleep(0.001)
+            for thread in threads[1:]:
+                thread.start()
+            # A call that has read the clock joins the one in flight, since
+            # that one can't finish before it's released.
+            while len(clock_reads) < 4:
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join()
+            return outcomes
+
+        def fn():
+            calls.append(1)
+            release.wait()
+            return object()
+
+        results = run_coalesced(fn)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(len(set(map(id, results))), 1)
+        self.assertEqual(sf._flights, {})
+
+        # Test that the exception of a call is raised
+        def fail():
+            raise ValueError('failed')
+        self.assertRaises(ValueError, sf.call, 'k', fail)
+        self.assertEqual(sf._flights, {})
+
+        # Test that exceptions that aren't Exceptions, such as
+        # KeyboardInterrupt, are raised to every caller as well
+        class Interrupt(BaseException):
+            pass
+
+        def interrupt():
+            calls.append(1)
+            release.wait()
+            raise Interrupt()
+
+        del calls[:]
+        errors = run_coalesced(interrupt)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(all(isinstance(e, Interrupt) for e in errors))
+        self.assertEqual(sf._flights, {})
+
+        # Test that calls don't join one that started before the window
+        now = [0]
+        sf = stone_singleflight.SingleFlight(window=1, clock=lambda: now[0])
+
+        def nested():
+            now[0] = 1
+            return sf.call('k', lambda: 'inner')
+        self.assertEqual(sf.call('k', nested), 'inner')
+
+    @unittest.skipIf(sys.version_info < (3, 4), 'requires asyncio')
+    def test_async_single_flight(self):
+        import asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            sf = stone_singleflight.AsyncSingleFlight()
+            inner = loop.create_future()
+            a = sf.call('k', lambda: inner)
+            b = sf.call('k', lambda: self.fail('Call must be coalesced.'))
+            b.cancel()
+            inner.set_result(1)
+            self.assertEqual(loop.run_until_complete(a), 1)
+            self.assertTrue(b.cancelled())
+            self.assertEqual(sf._flights, {})
+        finally:
+            loop.close()
+
 
 test_spec = """\
 namespace ns
@@ -619,6 +724,11 @@ struct ContainsAlias
 
 struct S3
     u ns2.BaseU = z
+
+struct Nested
+    s S
+    d D?
+    ss List(S)
 """
 
 test_ns2_spec = """\
@@ -929,6 +1039,28 @@ class TestGeneratedPython(unittest.TestCase):
         self.assertEqual(b.f1, 'hello')
         self.assertEqual(b.f2, 3)
 
+    def test_union_decoding_tag_handlers(self):
+        # Test that the handlers for each tag are built once per validator
+        # and reused
+        v_validator = self.sv.Union(self.ns.V)
+        self.assertIsNone(v_validator.decode_tag_handlers)
+        v = self.compat_obj_decode(v_validator, {'.tag': 't1', 't1': 'a'})
+        self.assertEqual(v.get_t1(), 'a')
+        handlers = v_validator.decode_tag_handlers
+        self.assertEqual(set(handlers), set(self.ns.V._tagmap))
+        v = self.compat_obj_decode(v_validator, {'.tag': 't3', 'f': 'b'})
+        self.assertEqual(v.get_t3().f, 'b')
+        self.assertIs(v_validator.decode_tag_handlers, handlers)
+
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(v_validator, {'.tag': 'other'})
+        self.assertEqual("unexpected use of the catch-all tag 'other'",
+                         str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(
+                v_validator, {'.tag': 't0', 't1': 'a'})
+        self.assertEqual("unexpected key 't1'", str(cm.exception))
+
     def test_struct_decoding_with_optional_struct(self):
         opt_s = self.decode(
             self.sv.Struct(self.ns.OptionalS),
@@ -1040,12 +1172,259 @@ class TestGeneratedPython(unittest.TestCase):
         self.assertEqual(a.c, b'\x00')
         self.assertEqual(a.d, 3.14)
 
+        # Test that inherited fields are validated by the constructor
+        with self.assertRaises(self.sv.ValidationError):
+            self.ns.C(a=123, b=123, c=b'\x00', d=3.14)
+        with self.assertRaises(self.sv.ValidationError):
+            self.ns.C(a='test', b=123, c='not bytes', d=3.14)
+
+        # Test that arguments left as None are absent
+        d = self.ns.D(a='test', c=None)
+        self.assertFalse(d._c_present)
+        self.assertEqual(d.c, None)
+        self.assertEqual(d.b, 10)
+        self.assertRaises(AttributeError, lambda: d.d)
+
+        # Test that composite arguments only have their type validated
+        s2 = self.ns.S2(f1=self.ns.OptionalS())
+        self.assertEqual(s2.f1.f1, 'hello')
+        with self.assertRaises(self.sv.ValidationError):
+            self.ns.S2(f1=self.ns.S(f='test'))
+
         # Test that void union member is available as a class attribute
         self.assertIsInstance(self.ns.U.t0, self.ns.U)
 
         # Test that non-void union member is callable (should be a method)
         self.assertTrue(callable(self.ns.U.t1))
 
+    def test_struct_from_rows(self):
+        rows = [('a', 1, b'\x00', 1.5), ('b', 2, None, 2.5)]
+        cs = self.ns.C.from_rows(['a', 'b', 'c', 'd'], rows)
+        self.assertEqual(len(cs), 2)
+        self.assertIsInstance(cs[0], self.ns.C)
+        self.assertEqual((cs[0].a, cs[0].b, cs[0].c, cs[0].d),
+                         ('a', 1, b'\x00', 1.5))
+        self.assertFalse(cs[1]._c_present)
+
+        # Test that fields missing from the rows are absent
+        ds = self.ns.D.from_rows(['a'], [('x',)])
+        self.assertEqual(ds[0].a, 'x')
+        self.assertEqual(ds[0].b, 10)
+        self.assertFalse(ds[0]._c_present)
+
+        # Test that columns may be in any order
+        ds = self.ns.D.from_rows(['c', 'b', 'd', 'a'], [('y', 3, [1], 'x')])
+        self.assertEqual((ds[0].a, ds[0].b, ds[0].c, ds[0].d),
+                         ('x', 3, 'y', [1]))
+        ds = self.ns.D.from_rows(['c', 'a'], [('y', 'x'), ('z', None)])
+        self.assertEqual((ds[0].a, ds[0].b, ds[0].c), ('x', 10, 'y'))
+        self.assertFalse(ds[0]._d_present)
+        self.assertFalse(ds[1]._a_present)
+        self.assertEqual(ds[1].c, 'z')
+
+        # Test that values are validated
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.ns.D.from_rows(['a', 'b'], [('x', -1)])
+        self.assertIn('b: ', str(cm.exception))
+        self.assertRaises(AssertionError,
+                          lambda: self.ns.D.from_rows(['z'], [(1,)]))
+
+        # Test that released instances are reused once pooling is enabled
+        self.ns.C.enable_pool(max_size=1)
+        try:
+            c = cs[0]
+            c.release()
+            cs[1].release()  # Exceeds the max size of the pool
+            self.assertFalse(c._a_present)
+            self.assertIsNone(self.ns.B.__dict__.get('_pool_'))
+            c2 = self.ns.C.from_rows(['a'], [('z',)])[0]
+            self.assertIs(c2, c)
+            self.assertEqual(c2.a, 'z')
+            self.assertFalse(c2._b_present)
+            self.assertIsNot(self.ns.C.from_rows(['a'], [('z',)])[0], c)
+        finally:
+            self.ns.C.disable_pool()
+
+    def test_struct_list_decoding(self):
+        ds = self.compat_obj_decode(
+            self.sv.List(self.sv.Struct(self.ns.D)),
+            [{'a': 'x', 'd': [1, None]}, {'a': 'y', 'b': 3, 'c': 'z', 'd': []}])
+        self.assertEqual([d.a for d in ds], ['x', 'y'])
+        self.assertEqual([d.b for d in ds], [10, 3])
+        self.assertEqual([d.c for d in ds], [None, 'z'])
+        self.assertEqual(ds[0].d, [1, None])
+
+        # Test that a null item takes the default of a struct
+        es = self.compat_obj_decode(
+            self.sv.List(self.sv.Struct(self.ns.E)), [None, {'c': 1}])
+        self.assertEqual(es[0].a, 'test')
+        self.assertEqual(es[1].c, 1)
+
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(
+                self.sv.List(self.sv.Struct(self.ns.D)), [{'a': 'x'}])
+        self.assertEqual("missing required field 'd'", str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(
+                self.sv.List(self.sv.Struct(self.ns.D)),
+                [{'a': 'x', 'd': [], 'b': 'y'}])
+        self.assertEqual("b: expected integer, got string", str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(
+                self.sv.List(self.sv.Struct(self.ns.D)),
+                [{'a': 'x', 'd': [], 'z': 1}])
+        self.assertEqual("unknown field 'z'", str(cm.exception))
+
+    def test_struct_reflection_attributes(self):
+        C = self.ns.C
+        self.assertEqual(
+            C._all_fields_,
+            (('a', self.ns.A._a_validator),
+             ('b', self.ns.A._b_validator),
+             ('c', self.ns.B._c_validator),
+             ('d', C._d_validator)))
+        self.assertEqual(C._all_field_names_, frozenset(['a', 'b', 'c', 'd']))
+        self.assertEqual(C._all_field_indices_, {'a': 0, 'b': 1, 'c': 2, 'd': 3})
+
+        File = self.ns.File
+        self.assertEqual(File._fields_, (('size', File._size_validator),))
+        self.assertEqual(File._field_names_, frozenset(['size']))
+        self.assertEqual(
+            File._all_fields_,
+            (('name', self.ns.Resource._name_validator),
+             ('size', File._size_validator)))
+
+        # Test that imported parents are referenced through their namespace
+        self.assertEqual(
+            self.ns.ImportTestS._all_fields_,
+            (('z', self.ns2.BaseS._z_validator),
+             ('a', self.ns.ImportTestS._a_validator)))
+
+    def test_struct_lazy_decoding(self):
+        obj = {'s': {'f': 'x'}, 'ss': [{'f': 'y'}], 'd': None}
+        n = self.compat_obj_decode(
+            self.sv.Struct(self.ns.Nested), obj, lazy=True)
+        self.assertFalse(n._s_present)
+        self.assertEqual(sorted(n._lazy_.raw), ['s', 'ss'])
+        self.assertEqual(n.s.f, 'x')
+        self.assertTrue(n._s_present)
+        self.assertEqual(sorted(n._lazy_.raw), ['ss'])
+        self.assertIsNone(n.d)
+        self.assertEqual([s.f for s in n.ss], ['y'])
+        n.validate()
+
+        # Test that encoding decodes fields that haven't been accessed
+        n = self.compat_obj_decode(
+            self.sv.Struct(self.ns.Nested), obj, lazy=True)
+        self.assertEqual(
+            self.compat_obj_encode(self.sv.Struct(self.ns.Nested), n),
+            {'s': {'f': 'x'}, 'ss': [{'f': 'y'}]})
+
+        # Test that deleting a field discards its raw value
+        n = self.compat_obj_decode(
+            self.sv.Struct(self.ns.Nested), obj, lazy=True)
+        del n.s
+        with self.assertRaises(AttributeError):
+            n.s
+
+        # Test that setting a field discards its raw value, so that it isn't
+        # overwritten when the other fields are decoded
+        n = self.compat_obj_decode(
+            self.sv.Struct(self.ns.Nested), obj, lazy=True)
+        n.s = self.ns.S(f='changed')
+        self.assertEqual(sorted(n._lazy_.raw), ['ss'])
+        n.validate()
+        self.assertEqual(n.s.f, 'changed')
+        self.assertEqual(
+            self.compat_obj_encode(self.sv.Struct(self.ns.Nested), n),
+            {'s': {'f': 'changed'}, 'ss': [{'f': 'y'}]})
+
+        # Test that missing and unknown fields are detected up front
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(
+                self.sv.Struct(self.ns.Nested), {'ss': []}, lazy=True)
+        self.assertEqual("missing required field 's'", str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.compat_obj_decode(
+                self.sv.Struct(self.ns.Nested),
+                {'s': {'f': 'x'}, 'ss': [], 'z': 1}, lazy=True)
+        self.assertEqual("unknown field 'z'", str(cm.exception))
+
+        # Test that invalid field values are detected on access or validate()
+        n = self.compat_obj_decode(
+            self.sv.Struct(self.ns.Nested),
+            {'s': {'f': 1}, 'ss': []}, lazy=True)
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            n.validate()
+        self.assertEqual("s.f: '1' expected to be a string, got integer",
+                         str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            n.s.f
+        self.assertEqual("f: '1' expected to be a string, got integer",
+                         str(cm.exception))
+
+        # Test that struct trees decode to their subtype lazily
+        fi = self.compat_obj_decode(
+            self.sv.StructTree(self.ns.Resource),
+            {'.tag': 'file', 'name': 'test.doc', 'size': 100}, lazy=True)
+        self.assertIsInstance(fi, self.ns.File)
+        self.assertEqual(fi.size, 100)
+
+    def test_struct_list_columnar_decoding(self):
+        cols = self.ss.json_compat_obj_decode_columns(
+            self.sv.List(self.sv.Struct(self.ns.D)),
+            [{'a': 'x', 'd': [1, None]}, {'a': 'y', 'b': 3, 'c': 'z', 'd': []}])
+        self.assertEqual(len(cols), 2)
+        self.assertIs(cols.definition, self.ns.D)
+        self.assertEqual(cols.fields, ['a', 'b', 'c', 'd'])
+        self.assertEqual(cols.values['a'], ['x', 'y'])
+        self.assertEqual(list(cols.values['b']), [10, 3])
+        self.assertEqual(cols.values['c'], [None, 'z'])
+        self.assertEqual(cols.values['d'], [[1, None], []])
+        self.assertEqual(list(cols.present['c']), [0, 1])
+        self.assertEqual(sorted(cols.present), ['c'])
+
+        # Test that numeric columns are arrays and that a null item takes
+        # the defaults of a struct
+        cols = self.ss.json_decode_columns(
+            self.sv.List(self.sv.Struct(self.ns.E)),
+            json.dumps([None, {'b': 1, 'c': -5}]))
+        self.assertEqual(cols.values['a'], ['test', 'test'])
+        self.assertIsInstance(cols.values['c'], array.array)
+        self.assertEqual(list(cols.values['c']), [0, -5])
+        self.assertEqual(list(cols.present['c']), [0, 1])
+
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.ss.json_compat_obj_decode_columns(
+                self.sv.List(self.sv.Struct(self.ns.D)), [{'a': 'x'}])
+        self.assertEqual("missing required field 'd'", str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.ss.json_compat_obj_decode_columns(
+                self.sv.List(self.sv.Struct(self.ns.D)),
+                [{'a': 'x', 'd': [], 'b': -1}])
+        self.assertEqual("b: -1 is not within range [0, 18446744073709551615]",
+                         str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.ss.json_compat_obj_decode_columns(
+                self.sv.List(self.sv.Struct(self.ns.D)),
+                [{'a': 'x', 'd': ['y']}])
+        self.assertEqual("d: expected integer, got string", str(cm.exception))
+        with self.assertRaises(self.sv.ValidationError) as cm:
+            self.ss.json_compat_obj_decode_columns(
+                self.sv.List(self.sv.Struct(self.ns.D)),
+                [{'a': 'x', 'd': [], 'z': 1}])
+        self.assertEqual("unknown field 'z'", str(cm.exception))
+
+    def test_array_typecode(self):
+        typecode = self.ss._array_typecode
+        self.assertEqual(typecode(self.sv.Boolean()), 'b')
+        self.assertEqual(typecode(self.sv.Float64()), 'd')
+        self.assertEqual(typecode(self.sv.UInt32(max_value=255)), 'B')
+        self.assertEqual(typecode(self.sv.Int32(min_value=-1, max_value=1)),
+                         'b')
+        self.assertIn(typecode(self.sv.Int32()), ('i', 'l'))
+        self.assertIsNone(typecode(self.sv.String()))
+
     def test_struct_enumerated_subtypes_encoding(self):
         # Test serializing a leaf struct from  the root struct
         fi = self.ns.File(name='test.doc', size=100)
@@ -1062,6 +1441,27 @@ class TestGeneratedPython(unittest.TestCase):
             self.compat_obj_encode(self.sv.Struct(self.ns.File), fi),
             {'name': 'test.doc', 'size': 100})
 
+        # Test serializing subclasses of generated types as the nearest
+        # generated subtype
+        class MyFile(self.ns.File):
+            pass
+        class MyOtherFile(MyFile):
+            pass
+        resource_validator = self.sv.StructTree(self.ns.Resource)
+        for cls in (MyFile, MyOtherFile, MyFile):
+            self.assertEqual(
+                self.compat_obj_encode(
+                    resource_validator, cls(name='test.doc', size=100)),
+                {'.tag': 'file', 'name': 'test.doc', 'size': 100})
+        self.assertEqual(
+            set(resource_validator.pytype_to_tag_and_subtype_cache),
+            {MyFile, MyOtherFile})
+
+        class MyResource(self.ns.Resource):
+            pass
+        with self.assertRaises(AssertionError):
+            self.compat_obj_encode(resource_validator, MyResource(name='x'))
+
     def test_struct_enumerated_subtypes_decoding(self):
         # Test deserializing a leaf struct from  the root struct
         fi = self.compat_obj_decode(
@@ -1,9 +1,16 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import datetime
+import os
+import shutil
+import tempfile
 import textwrap
 import unittest
 
+from stone.cli_helpers import FilterExprParser
+from stone.forking import WorkerError
+from stone.lang.lexer import StoneLexer
+from stone.lang.parse_cache import ParseCache
 from stone.lang.parser import (
     StoneNamespace,
     StoneAlias,
@@ -16,6 +23,7 @@ from stone.lang.tower import (
     TagRef,
     TowerOfStone,
 )
+from stone.parse_tables import parse_tables_are_current
 from stone.data_type import (
     Alias,
     Nullable,
@@ -3389,3 +3397,177 @@ class TestStone(unittest.TestCase):
             cm.exception.msg)
         self.assertEqual(cm.exception.lineno, 9)
         self.assertEqual(cm.exception.path, 'ns1.stone')
+
+    def test_parse_cache(self):
+        text = textwrap.dedent("""\
+            namespace test
+
+            struct Photo
+                "A photo."
+                dimensions Dimensions
+                    struct
+                        height UInt64
+                        width UInt64 = 10
+
+                        example default
+                            height = 5
+                caption String?
+
+                example default
+                    dimensions = default
+                    caption = null
+
+            route r(Photo, Void, Void)
+                "A route."
+            """)
+        invalid_text = textwrap.dedent("""\
+            namespace test
+
+            struct S
+                f String String
+            """)
+        cache_dir = tempfile.mkdtemp()
+        try:
+            cache = ParseCache(os.path.join(cache_dir, '.stone_cache'))
+            api = TowerOfStone([('ns1.stone', text)], parse_cache=cache).parse()
+            self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+            # Specs with errors aren't cached.
+            with self.assertRaises(InvalidSpec):
+                TowerOfStone([('ns2.stone', invalid_text)],
+                             parse_cache=cache).parse()
+            self.assertEqual((cache.hits, cache.misses), (0, 2))
+            self.assertEqual(len(os.listdir(cache.cache_dir)), 1)
+
+            t = TowerOfStone([('ns1.stone', text)], parse_cache=cache)
+
+            def parse(data, path=None):
+                raise AssertionError('Spec was parsed again.')
+            t.parser.parse = parse
+            cached_api = t.parse()
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            ns = api.namespaces['test']
+            cached_ns = cached_api.namespaces['test']
+            self.assertEqual([dt.name for dt in cached_ns.data_types],
+                             [dt.name for dt in ns.data_types])
+            photo = cached_ns.data_type_by_name['Photo']
+            self.assertEqual(photo.doc, 'A photo.')
+            self.assertEqual(photo.all_fields[0].data_type.all_fields[1].default,
+                             10)
+            self.assertEqual(photo.get_examples()['default'].value,
+                             ns.data_type_by_name['Photo']
+                             .get_examples()['default'].value)
+            self.assertEqual(cached_ns.route_by_name['r'].doc, 'A route.')
+
+            # A changed spec or path is parsed again.
+            TowerOfStone([('ns1.stone', text + '\n')], parse_cache=cache).parse()
+            TowerOfStone([('ns3.stone', text)], parse_cache=cache).parse()
+            self.assertEqual((cache.hits, cache.misses), (1, 4))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_parse_tables_are_current(self):
+        # If this fails, run "python -m stone.parse_tables" and commit the
+        # updated tables.
+        self.assertTrue(parse_tables_are_current(StoneParser))
+        self.assertTrue(parse_tables_are_current(FilterExprParser))
+
+    def test_lexer_reuse(self):
+        # The parser's lexer is built once, and its line numbers start over
+        # for each spec.
+        self.parser.parse('namespace a\n\n\nstruct A\n    f String\n')
+        lex = self.parser.lexer.lex
+        out = self.parser.parse('namespace b\nstruct B\n    f String\n')
+        self.assertIs(self.parser.lexer.lex, lex)
+        self.assertEqual(out[1].name, 'B')
+        self.assertEqual(out[1].lineno, 2)
+        self.assertEqual(out[1].fields[0].lineno, 3)
+        self.assertFalse(self.parser.got_errors_parsing())
+
+    def test_lexer_dedent_bursts(self):
+        lexer = StoneLexer()
+        lexer.input(textwrap.dedent("""\
+            namespace n
+            struct A
+                f B
+                    struct
+                        g String
+                            "Doc."
+            struct C
+                h String
+                    "Doc."
+            """))
+        self.assertEqual(
+            [token.type for token in iter(lexer.token, None)],
+            ['KEYWORD', 'ID', 'NEWLINE',
+             'STRUCT', 'ID', 'NEWLINE',
+             'INDENT', 'ID', 'ID', 'NEWLINE',
+             'INDENT', 'STRUCT', 'NEWLINE',
+             'INDENT', 'ID', 'ID', 'NEWLINE',
+             'INDENT', 'STRING', 'NEWLINE',
+             'DEDENT', 'DEDENT', 'DEDENT', 'DEDENT',
+             'STRUCT', 'ID', 'NEWLINE',
+             'INDENT', 'ID', 'ID', 'NEWLINE',
+             'INDENT', 'STRING', 'NEWLINE',
+             # Added at the end of the file.
+             'DEDENT', 'DEDENT'])
+
+    def test_parse_in_parallel(self):
+        specs = [
+            ('ns%d.stone' % i, textwrap.dedent("""\
+                namespace ns{i}
+                {imports}
+                struct S{i}
+                    "Struct {i}."
+                    f String{ref}
+                    g Int64 = {i}
+
+                route r{i}(S{i}, Void, Void)
+                """).format(i=i,
+                            imports='import ns%d\n' % (i - 1) if i else '',
+                            ref='\n    h ns%d.S%d' % (i - 1, i - 1) if i else ''))
+            for i in range(6)]
+        # An empty spec and a namespace split across specs.
+        specs.insert(2, ('empty.stone', ''))
+        specs.append(('ns0b.stone', 'namespace ns0\n\nalias A = String\n'))
+
+        serial_api = TowerOfStone(specs).parse()
+        api = TowerOfStone(specs, jobs=3).parse()
+        self.assertEqual(list(api.namespaces), list(serial_api.namespaces))
+        for name, namespace in api.namespaces.items():
+            serial_namespace = serial_api.namespaces[name]
+            self.assertEqual(repr(namespace.data_types),
+                             repr(serial_namespace.data_types))
+            self.assertEqual(repr(namespace.aliases),
+                             repr(serial_namespace.aliases))
+            self.assertEqual([route.name for route in namespace.routes],
+                             [route.name for route in serial_namespace.routes])
+            self.assertEqual(namespace.data_types[0].doc,
+                             serial_namespace.data_types[0].doc)
+            self.assertEqual(namespace.spec_digests,
+                             serial_namespace.spec_digests)
+
+        # The first error in spec order is reported, as when parsing serially.
+        bad_specs = list(specs)
+        bad_specs[1] = ('bad1.stone', 'namespace bad1\n\nstruct S\n    f A B\n')
+        bad_specs[4] = ('bad4.stone', 'namespace bad4\n\nstruct S\n    g C D\n')
+        for jobs in (1, 3):
+            with self.assertRaises(InvalidSpec) as cm:
+                TowerOfStone(bad_specs, jobs=jobs).parse()
+            self.assertEqual(cm.exception.path, 'bad1.stone')
+            self.assertEqual(cm.exception.lineno, 4)
+            self.assertEqual(cm.exception.msg, "Unexpected ID with value 'B'.")
+
+        # A process that dies while parsing fails the parse instead of
+        # hanging it, as does an exception raised while parsing.
+        for fail in (lambda: os._exit(3), lambda: 1 / 0):
+            tower = TowerOfStone(specs, jobs=3)
+            parse = tower.parser.parse
+
+            def parse_or_fail(text, path=None, fail=fail, parse=parse):
+                if path == 'ns3.stone':
+                    fail()
+                return parse(text, path)
+            tower.parser.parse = parse_or_fail
+            with self.assertRaises(WorkerError):
+                tower.parse()